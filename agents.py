@@ -1,27 +1,151 @@
+import asyncio
 import json
+import queue
+import re
+import threading
 import time
-from typing import List, Dict, Any, Generator
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, AsyncGenerator, Callable, Generator, Iterator, Optional, Tuple, Union
 from api import OpenRouterAPI
+from cache import EMPTY_DIGEST, ResponseCache, chain_digest, completion_key
+from context import ContextPolicy
+from hedging import HedgePolicy, HedgeStats, LatencyTracker, ahedged_call, get_latency_tracker, hedged_call
+from synthesis import DEFAULT_EXCERPT_TOKENS, build_synthesis_prompt, synthesis_summary
+from tokens import TokenEstimator, get_estimator
+from tracing import Span, get_tracer
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+def parse_analysis(text: str) -> Optional[Dict[str, Any]]:
+    """Extract the coordinator's {"selected_roles": [...], "reasoning": ...} JSON
+
+    Tolerates code fences and prose around the object. Returns None if no
+    object with a list of role strings can be found.
+    """
+    candidates = [text]
+    candidates += re.findall(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        candidates.append(text[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate.strip())
+        except (ValueError, TypeError):
+            continue
+        if not isinstance(data, dict):
+            continue
+        roles = data.get("selected_roles")
+        if isinstance(roles, str):
+            roles = [roles]
+        if isinstance(roles, list) and all(isinstance(role, str) for role in roles):
+            return {"selected_roles": roles, "reasoning": str(data.get("reasoning", ""))}
+    return None
+
+class PromptTooLargeError(ValueError):
+    """Raised when a prompt can't be trimmed to fit the model's context budget"""
+
+def _normalize_role(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")
 
 class Agent:
     def __init__(self, 
                  name: str, 
                  role: str, 
                  model: str, 
-                 system_message: str):
+                 system_message: str,
+                 temperature: float = 0.7,
+                 cache_completions: bool = True,
+                 context_length: Optional[int] = None,
+                 context_policy: Optional[ContextPolicy] = None):
         self.name = name
         self.role = role
         self.model = model
         self.system_message = system_message
+        self.temperature = temperature
+        # Whether this agent's calls may be served from the API's completion cache
+        self.cache_completions = cache_completions
+        self.context_policy = context_policy or ContextPolicy(context_length)
+        # Context report for the last prompt and prompt tokens saved so far
+        self.last_context: Dict[str, int] = {}
+        self.prompt_tokens_saved = 0
         self.messages = [{"role": "system", "content": system_message}]
         self.start_time = None
         self.end_time = None
 
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        return self._messages
+
+    @messages.setter
+    def messages(self, messages: List[Dict[str, str]]):
+        self._messages = messages
+        # _digests[i] is the digest of messages[:i]
+        self._digests = [EMPTY_DIGEST]
+        # _token_counts[i] is the estimated size of messages[i]
+        self._token_counts: List[int] = []
+        self._token_total = 0
+        self._counts_estimator: Optional[TokenEstimator] = None
+        self.context_policy.reset()
+
     def add_message(self, role: str, content: str):
         self.messages.append({"role": role, "content": content})
+        self.message_token_counts()
+
+    def pop_message(self) -> Dict[str, str]:
+        """Remove and return the newest message"""
+        message = self._messages.pop()
+        if len(self._token_counts) > len(self._messages):
+            self._token_total -= self._token_counts.pop()
+        del self._digests[len(self._messages) + 1:]
+        return message
 
     def get_messages(self) -> List[Dict[str, str]]:
-        return self.messages
+        """A copy of the history; later turns and resets don't change it"""
+        return [dict(message) for message in self._messages]
+
+    def message_token_counts(self) -> List[int]:
+        """Per-message token estimates, counting only messages added since the last call"""
+        estimator = get_estimator(self.model)
+        if estimator is not self._counts_estimator:
+            # The model (and so the tokenizer family) changed; recount everything
+            self._token_counts = []
+            self._token_total = 0
+            self._counts_estimator = estimator
+        while len(self._token_counts) < len(self._messages):
+            count = estimator.count_message(self._messages[len(self._token_counts)])
+            self._token_counts.append(count)
+            self._token_total += count
+        return self._token_counts
+
+    def prompt_tokens(self) -> int:
+        """Estimated prompt size of the full history, before any trimming"""
+        self.message_token_counts()
+        return self._token_total
+
+    def prompt_messages(self) -> List[Dict[str, str]]:
+        """The messages to send: the history fitted to the context budget
+
+        Raises PromptTooLargeError if even the trimmed prompt doesn't fit, so
+        oversized requests are rejected before they reach the API.
+        """
+        prompt, report = self.context_policy.build(
+            self.messages, self.message_token_counts(), get_estimator(self.model)
+        )
+        self.last_context = report
+        self.prompt_tokens_saved += report["saved_tokens"]
+        if report["prompt_tokens"] > report["token_budget"]:
+            raise PromptTooLargeError(
+                f"Prompt for {self.name} is about {report['prompt_tokens']} tokens, "
+                f"over the {report['token_budget']} token budget for {self.model}"
+            )
+        return prompt
+
+    def history_digest(self) -> str:
+        """Digest of the current history, extended only by messages added since the last call"""
+        while len(self._digests) <= len(self._messages):
+            self._digests.append(chain_digest(self._digests[-1], self._messages[len(self._digests) - 1]))
+        return self._digests[len(self._messages)]
 
     def start_processing(self):
         self.start_time = time.time()
@@ -31,40 +155,35 @@ class Agent:
         return self.end_time - self.start_time
 
 class CoordinatorAgent(Agent):
-    def __init__(self, name: str, model: str, system_message: str):
-        super().__init__(name, "coordinator", model, system_message)
-
-    def analyze_task(self, user_input: str, api: OpenRouterAPI) -> Dict[str, Any]:
-        """Analyze user input to determine which agents should respond"""
-        self.start_processing()
-
-        analysis_prompt = f"""User message: {user_input}
+    def __init__(self, name: str, model: str, system_message: str, **options):
+        super().__init__(name, "coordinator", model, system_message, **options)
 
+    @staticmethod
+    def _analysis_prompt(user_input: str, available_roles: Optional[Dict[str, str]] = None) -> str:
+        roster = ""
+        if available_roles:
+            roster = "\n        Available agents (role: name):\n" + "\n".join(
+                f"        - {role}: {name}" for role, name in available_roles.items()
+            ) + "\n"
+        return f"""User message: {user_input}
+{roster}
         Analyze this message and determine which types of agents should respond.
-        Response format: JSON with 'selected_roles' list and 'reasoning'"""
-
-        self.add_message("user", analysis_prompt)
-        response = api.generate_completion(
-            model=self.model,
-            messages=self.get_messages()
-        )
-
-        process_time = self.end_processing()
+        Respond with a single JSON object only, no other text:
+        {{"selected_roles": ["<role>", ...], "reasoning": "<why these agents>"}}"""
 
+    def _analysis_result(self, response: Dict[str, Any], process_time: float) -> Dict[str, Any]:
         if response["success"]:
             self.add_message("assistant", response["response"])
-            try:
-                return {
-                    "success": True,
-                    "analysis": response["response"],
-                    "time": process_time
-                }
-            except Exception as e:
-                return {
-                    "success": False,
-                    "error": f"Failed to parse analysis: {str(e)}",
-                    "time": process_time
-                }
+            parsed = parse_analysis(response["response"])
+            return {
+                "success": True,
+                "analysis": response["response"],
+                # None means the reply couldn't be parsed; callers fall back to all agents
+                "selected_roles": parsed["selected_roles"] if parsed else None,
+                "reasoning": parsed.get("reasoning", "") if parsed else "",
+                "tokens": response.get("tokens", 0),
+                "time": process_time
+            }
         else:
             return {
                 "success": False,
@@ -72,12 +191,78 @@ class CoordinatorAgent(Agent):
                 "time": process_time
             }
 
+    def analyze_task(self,
+                     user_input: str,
+                     api: OpenRouterAPI,
+                     available_roles: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Analyze user input to determine which agents should respond"""
+        self.start_processing()
+
+        self.add_message("user", self._analysis_prompt(user_input, available_roles))
+        try:
+            prompt = self.prompt_messages()
+        except PromptTooLargeError as e:
+            return self._analysis_result({"success": False, "error": str(e)}, self.end_processing())
+        response = api.generate_completion(
+            model=self.model,
+            messages=prompt,
+            temperature=self.temperature,
+            cache=self.cache_completions,
+            response_format={"type": "json_object"}
+        )
+
+        process_time = self.end_processing()
+        return self._analysis_result(response, process_time)
+
+    async def aanalyze_task(self,
+                            user_input: str,
+                            api: OpenRouterAPI,
+                            available_roles: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Async counterpart of analyze_task"""
+        self.start_processing()
+
+        self.add_message("user", self._analysis_prompt(user_input, available_roles))
+        try:
+            prompt = self.prompt_messages()
+        except PromptTooLargeError as e:
+            return self._analysis_result({"success": False, "error": str(e)}, self.end_processing())
+        response = await api.agenerate_completion(
+            model=self.model,
+            messages=prompt,
+            temperature=self.temperature,
+            cache=self.cache_completions,
+            response_format={"type": "json_object"}
+        )
+
+        process_time = self.end_processing()
+        return self._analysis_result(response, process_time)
+
 class AgentGroup:
-    def __init__(self, api: OpenRouterAPI):
+    def __init__(self,
+                 api: OpenRouterAPI,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 response_cache: Optional[ResponseCache] = None,
+                 hedge_policies: Optional[Dict[str, HedgePolicy]] = None,
+                 latency_tracker: Optional[LatencyTracker] = None,
+                 hedge_stats: Optional[HedgeStats] = None):
         self.api = api
         self.agents = {}
         self.coordinator = None
-        self.response_cache = {}
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.max_concurrency = max_concurrency
+        # Token budget for each agent's reply in the coordinator's synthesis prompt
+        self.synthesis_excerpt_tokens = DEFAULT_EXCERPT_TOKENS
+        # Per-role hedging; latencies are shared process-wide by default
+        self.hedge_policies: Dict[str, HedgePolicy] = {}
+        self.latency_tracker = latency_tracker or get_latency_tracker()
+        self.hedge_stats = hedge_stats if hedge_stats is not None else HedgeStats()
+        # The latest claimed turn of each agent, by agent name, until it finishes.
+        # A new turn waits for it, so a turn left running past a quorum/deadline
+        # cut still lands in the agent's history before the next one
+        self._unfinished_turns: Dict[str, Future] = {}
+        self._turns_lock = threading.Lock()
+        for role, policy in (hedge_policies or {}).items():
+            self.set_hedge_policy(role, policy)
 
     def add_agent(self, agent: Agent):
         if isinstance(agent, CoordinatorAgent):
@@ -85,36 +270,558 @@ class AgentGroup:
         else:
             self.agents[agent.name] = agent
 
+    def set_hedge_policy(self, role: str, policy: Optional[HedgePolicy]):
+        """Hedge and fail over calls to agents with ``role``; None removes the policy"""
+        if policy is None:
+            self.hedge_policies.pop(role, None)
+            return
+        self.hedge_policies[role] = policy
+
+    def hedge_report(self) -> Dict[str, Dict[str, Any]]:
+        """Per-role calls, hedges, hedge wins and failovers with hedge and win rates"""
+        return self.hedge_stats.report()
+
     def remove_agent(self, agent_name: str):
         if agent_name in self.agents:
             del self.agents[agent_name]
 
-    def get_response(self, agent_name: str) -> Dict[str, Any]:
+    def available_roles(self) -> Dict[str, str]:
+        """Roles of the specialist agents, mapped to their display names"""
+        return {agent.role: agent.name for agent in self.agents.values()}
+
+    def select_agents(self, selected_roles: Optional[List[str]]) -> Tuple[List[str], List[str], bool]:
+        """Resolve the coordinator's selected roles to agent names
+
+        Roles match an agent's role or name, case- and punctuation-insensitively.
+        Returns (selected, skipped, fallback); when nothing could be parsed or
+        matched, every agent is selected and fallback is True.
+        """
+        wanted = {_normalize_role(role) for role in selected_roles or []}
+        selected = [
+            agent_name for agent_name, agent in self.agents.items()
+            if _normalize_role(agent.role) in wanted or _normalize_role(agent.name) in wanted
+        ]
+        if not selected:
+            return list(self.agents), [], True
+        skipped = [agent_name for agent_name in self.agents if agent_name not in selected]
+        return selected, skipped, False
+
+    def _prompt_tokens_saved(self) -> Dict[str, int]:
+        agents = list(self.agents.values()) + ([self.coordinator] if self.coordinator else [])
+        return {agent.name: agent.prompt_tokens_saved for agent in agents}
+
+    def _prompt_tokens_saved_since(self, before: Dict[str, int]) -> int:
+        """Prompt tokens the context policy trimmed since the ``before`` snapshot"""
+        return sum(saved - before.get(name, 0) for name, saved in self._prompt_tokens_saved().items())
+
+    def _routing(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        selected, skipped, fallback = self.select_agents(analysis.get("selected_roles"))
+        return {
+            "selected_agents": selected,
+            "skipped_agents": skipped,
+            "routing_fallback": fallback
+        }
+
+    def _cache_key(self, agent_name: str) -> str:
+        agent = self.agents[agent_name]
+        return completion_key(agent.model, agent.history_digest(), agent.temperature, namespace=agent_name)
+
+    def _cache_lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        with get_tracer().span("cache.lookup", layer="response_cache") as span:
+            cached = self.response_cache.get(cache_key)
+            span.set_attribute("hit", cached is not None)
+        return cached
+
+    def _cache_store(self, cache_key: str, response: Dict[str, Any]):
+        self.response_cache.put(cache_key, response)
+
+    def _cached_response(self, agent_name: str, span: Span) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Look the agent's reply up in the response cache
+
+        A hit is reported with the lookup's own time rather than the time the
+        original call took.
+        """
+        lookup_start = time.time()
+        cache_key = self._cache_key(agent_name)
+        cached = self._cache_lookup(cache_key)
+        span.set_attribute("cached", cached is not None)
+        if cached is None:
+            return cache_key, None
+        return cache_key, {**cached, "cached": True, "time": time.time() - lookup_start}
+
+    def _record_attempt(self, model: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        response["model"] = model
+        if response["success"] and not response.get("cached") and not response.get("coalesced"):
+            self.latency_tracker.record(model, response["time"])
+        return response
+
+    def _attempt(self,
+                 agent: Agent,
+                 prompt: List[Dict[str, str]],
+                 model: str,
+                 span: Span,
+                 coalesce: bool = True) -> Dict[str, Any]:
+        # Hedged attempts run on pool threads, which don't inherit the current span
+        with get_tracer().use_span(span):
+            response = self.api.generate_completion(
+                model=model,
+                messages=prompt,
+                temperature=agent.temperature,
+                cache=agent.cache_completions,
+                coalesce=coalesce
+            )
+        return self._record_attempt(model, response)
+
+    async def _aattempt(self,
+                        agent: Agent,
+                        prompt: List[Dict[str, str]],
+                        model: str,
+                        coalesce: bool = True) -> Dict[str, Any]:
+        response = await self.api.agenerate_completion(
+            model=model,
+            messages=prompt,
+            temperature=agent.temperature,
+            cache=agent.cache_completions,
+            coalesce=coalesce
+        )
+        return self._record_attempt(model, response)
+
+    def _hedge_plan(self, agent: Agent) -> Optional[Tuple[str, Optional[float], bool]]:
+        """(backup model, hedge delay, failover) for the agent's role, if it has a policy"""
+        policy = self.hedge_policies.get(agent.role)
+        if policy is None:
+            return None
+        backup_model = policy.fallback_model or agent.model
+        # Failing over to the model that just failed would only repeat the scheduler's retries
+        failover = policy.failover and backup_model != agent.model
+        return backup_model, policy.hedge_delay(agent.model, self.latency_tracker), failover
+
+    def _hedge_outcome(self, agent: Agent, span: Span, response: Dict[str, Any]) -> Dict[str, Any]:
+        self.hedge_stats.record(agent.role, response)
+        for key in ("hedged", "hedge_won", "failover"):
+            span.set_attribute(key, response[key])
+        return response
+
+    def _complete(self, agent: Agent, prompt: List[Dict[str, str]], span: Span) -> Dict[str, Any]:
+        """One completion for the agent, hedged per its role's policy
+
+        A blocking request can't be interrupted, so a losing sync attempt runs
+        to completion in the background and its result is discarded.
+        """
+        plan = self._hedge_plan(agent)
+        if plan is None:
+            return self._attempt(agent, prompt, agent.model, span)
+        backup_model, delay, failover = plan
+        response = hedged_call(
+            lambda: self._attempt(agent, prompt, agent.model, span),
+            # A duplicate to the same model must not just join the slow request
+            lambda: self._attempt(agent, prompt, backup_model, span, coalesce=backup_model != agent.model),
+            delay,
+            failover
+        )
+        return self._hedge_outcome(agent, span, response)
+
+    async def _acomplete(self, agent: Agent, prompt: List[Dict[str, str]], span: Span) -> Dict[str, Any]:
+        """Async counterpart of _complete; the losing attempt is cancelled"""
+        plan = self._hedge_plan(agent)
+        if plan is None:
+            return await self._aattempt(agent, prompt, agent.model)
+        backup_model, delay, failover = plan
+        response = await ahedged_call(
+            lambda: self._aattempt(agent, prompt, agent.model),
+            lambda: self._aattempt(agent, prompt, backup_model, coalesce=backup_model != agent.model),
+            delay,
+            failover
+        )
+        return self._hedge_outcome(agent, span, response)
+
+    def get_response(self,
+                     agent_name: str,
+                     stream: bool = False) -> Union[Dict[str, Any], Iterator[Dict[str, Any]]]:
+        """Get the agent's reply to its current history
+
+        With ``stream=True`` this returns an iterator of ``delta`` chunks followed
+        by a final ``done`` chunk carrying ``tokens``, ``time`` and ``ttft``.
+
+        If the agent's role has a HedgePolicy the reply also carries ``model``
+        (the model that answered), ``hedged``, ``hedge_won`` and ``failover``.
+        """
+        if stream:
+            return self._stream_response(agent_name)
+
         if agent_name not in self.agents:
             return {"success": False, "error": "Agent not found"}
-            
-        # Check cache first
-        cache_key = f"{agent_name}_{str(self.agents[agent_name].messages)}"
-        if cache_key in self.response_cache:
-            return self.response_cache[cache_key]
 
         agent = self.agents[agent_name]
+        with get_tracer().span("agent.call", agent=agent_name, model=agent.model) as span:
+            # Check cache first
+            cache_key, cached = self._cached_response(agent_name, span)
+            if cached is not None:
+                return cached
+
+            try:
+                prompt = agent.prompt_messages()
+            except PromptTooLargeError as e:
+                span.set_error(str(e))
+                return {"success": False, "error": str(e)}
+            agent.start_processing()
+            response = self._complete(agent, prompt, span)
+            process_time = agent.end_processing()
+
+            if response["success"]:
+                response["time"] = process_time
+                response["context"] = agent.last_context
+                self._cache_store(cache_key, response)
+            else:
+                span.set_error(response.get("error", "Unknown error"))
+            return response
+
+    def _stream_response(self, agent_name: str) -> Iterator[Dict[str, Any]]:
+        if agent_name not in self.agents:
+            yield {"success": False, "done": True, "error": "Agent not found"}
+            return
+
+        tracer = get_tracer()
+        span = tracer.start_span("agent.call", agent=agent_name,
+                                 model=self.agents[agent_name].model, stream=True)
+        try:
+            yield from tracer.iterate_in(span, self._stream_agent(agent_name, span))
+        finally:
+            span.end()
+
+    def _stream_completion(self, agent: Agent, prompt: List[Dict[str, str]], span: Span) -> Iterator[Dict[str, Any]]:
+        """Stream a completion, failing over to the role's fallback model on an early error
+
+        Streams aren't hedged: once deltas have been shown they can't be taken
+        back, so only a failure before the first delta fails over.
+        """
+        plan = self._hedge_plan(agent)
+        models = [agent.model] + ([plan[0]] if plan and plan[2] else [])
+        for attempt, model in enumerate(models):
+            streamed = False
+            for chunk in self.api.generate_completion(
+                model=model,
+                messages=prompt,
+                temperature=agent.temperature,
+                cache=agent.cache_completions,
+                stream=True
+            ):
+                if not chunk["done"]:
+                    streamed = True
+                    yield chunk
+                    continue
+                if not chunk["success"] and not streamed and attempt + 1 < len(models):
+                    break
+                chunk["model"] = model
+                if plan:
+                    chunk.update({"hedged": False, "hedge_won": False, "failover": attempt > 0})
+                    self._hedge_outcome(agent, span, chunk)
+                yield chunk
+                return
+
+    def _stream_agent(self, agent_name: str, span: Span) -> Iterator[Dict[str, Any]]:
+        cache_key, cached = self._cached_response(agent_name, span)
+        if cached is not None:
+            yield {"success": True, "done": False, "delta": cached["response"]}
+            yield {**cached, "done": True, "ttft": 0.0}
+            return
+
+        agent = self.agents[agent_name]
+        try:
+            prompt = agent.prompt_messages()
+        except PromptTooLargeError as e:
+            span.set_error(str(e))
+            yield {"success": False, "done": True, "error": str(e)}
+            return
         agent.start_processing()
-        response = self.api.generate_completion(
-            model=agent.model,
-            messages=agent.get_messages()
-        )
-        process_time = agent.end_processing()
+        for chunk in self._stream_completion(agent, prompt, span):
+            if chunk["done"]:
+                process_time = agent.end_processing()
+                if chunk["success"]:
+                    chunk["time"] = process_time
+                    chunk["context"] = agent.last_context
+                    self._cache_store(cache_key, {
+                        key: value for key, value in chunk.items() if key not in ("done", "ttft")
+                    })
+                else:
+                    span.set_error(chunk.get("error", "Unknown error"))
+            yield chunk
 
-        if response["success"]:
-            response["time"] = process_time
-            self.response_cache[cache_key] = response
+    async def aget_response(self, agent_name: str) -> Dict[str, Any]:
+        """Async counterpart of get_response"""
+        if agent_name not in self.agents:
+            return {"success": False, "error": "Agent not found"}
+
+        agent = self.agents[agent_name]
+        with get_tracer().span("agent.call", agent=agent_name, model=agent.model) as span:
+            cache_key, cached = self._cached_response(agent_name, span)
+            if cached is not None:
+                return cached
+
+            try:
+                prompt = agent.prompt_messages()
+            except PromptTooLargeError as e:
+                span.set_error(str(e))
+                return {"success": False, "error": str(e)}
+            agent.start_processing()
+            response = await self._acomplete(agent, prompt, span)
+            process_time = agent.end_processing()
+
+            if response["success"]:
+                response["time"] = process_time
+                response["context"] = agent.last_context
+                self._cache_store(cache_key, response)
+            else:
+                span.set_error(response.get("error", "Unknown error"))
             return response
+
+    def _claim_turn(self, agent_name: str) -> Tuple[Optional[Future], Future]:
+        """Queue a turn for the agent: (the turn it has to wait for, a future for this one)
+
+        Everything that changes an agent's history claims a turn first, so
+        turns for one agent run one at a time, in the order they were claimed.
+        """
+        turn: Future = Future()
+        with self._turns_lock:
+            previous = self._unfinished_turns.get(agent_name)
+            self._unfinished_turns[agent_name] = turn
+        return previous, turn
+
+    def _finish_turn(self, agent_name: str, turn: Future, previous: Optional[Future] = None):
+        """Mark a claimed turn finished, but never before the turn it waited for"""
+        if previous is not None and not previous.done():
+            # Cancelled while still waiting; the next turn must still wait for ``previous``
+            previous.add_done_callback(lambda _: self._finish_turn(agent_name, turn))
+            return
+        with self._turns_lock:
+            if self._unfinished_turns.get(agent_name) is turn:
+                del self._unfinished_turns[agent_name]
+        turn.set_result(None)
+
+    def _finish_turn_after(self, work: Any, agent_name: str, turn: Future, previous: Optional[Future]):
+        """Finish a claimed turn once ``work`` (a Future or asyncio Task) is done or cancelled"""
+        work.add_done_callback(lambda _: self._finish_turn(agent_name, turn, previous))
+
+    @staticmethod
+    async def _await_turn(previous: Optional[Future]):
+        if previous is not None:
+            # Shielded: a cancelled waiter must not cancel the turn it waits for
+            await asyncio.shield(asyncio.wrap_future(previous))
+
+    def run_agent_turn(self,
+                       agent_name: str,
+                       user_input: str,
+                       on_delta: Optional[Callable[[str], None]] = None) -> Tuple[Dict[str, Any], float]:
+        """Send user input to one agent and record its reply in that agent's history
+
+        Waits for the agent's previous turn first, including one still running
+        after a collective turn's quorum/deadline cut, so the history keeps its
+        user/assistant order. If ``on_delta`` is given the reply is streamed and
+        each token delta is passed to it as it arrives. The returned time is the
+        reply's own time: the completion call, or the lookup for a cached reply.
+        """
+        if agent_name not in self.agents:
+            return {"success": False, "error": "Agent not found"}, 0.0
+        previous, turn = self._claim_turn(agent_name)
+        try:
+            if previous is not None:
+                wait([previous])
+            return self._run_agent_turn(agent_name, user_input, on_delta)
+        finally:
+            self._finish_turn(agent_name, turn)
+
+    async def arun_agent_turn(self, agent_name: str, user_input: str) -> Tuple[Dict[str, Any], float]:
+        """Async counterpart of run_agent_turn"""
+        if agent_name not in self.agents:
+            return {"success": False, "error": "Agent not found"}, 0.0
+        previous, turn = self._claim_turn(agent_name)
+        try:
+            await self._await_turn(previous)
+            return await self._arun_agent_turn(agent_name, user_input)
+        finally:
+            self._finish_turn(agent_name, turn, previous)
+
+    def _run_agent_turn(self,
+                        agent_name: str,
+                        user_input: str,
+                        on_delta: Optional[Callable[[str], None]] = None) -> Tuple[Dict[str, Any], float]:
+        """run_agent_turn for a turn that has already been claimed"""
+        agent = self.agents[agent_name]
+        agent.add_message("user", user_input)
+        if on_delta is None:
+            response = self.get_response(agent_name)
         else:
-            return response
+            for response in self.get_response(agent_name, stream=True):
+                if not response["done"]:
+                    on_delta(response["delta"])
+        if response["success"]:
+            agent.add_message("assistant", response["response"])
+        return response, response.get("time", 0.0)
+
+    async def _arun_agent_turn(self, agent_name: str, user_input: str) -> Tuple[Dict[str, Any], float]:
+        """Async counterpart of _run_agent_turn"""
+        agent = self.agents[agent_name]
+        agent.add_message("user", user_input)
+        response = await self.aget_response(agent_name)
+        if response["success"]:
+            agent.add_message("assistant", response["response"])
+        return response, response.get("time", 0.0)
+
+    def _reset_agent(self, agent_name: str, turn: Future):
+        agent = self.agents.get(agent_name)
+        if agent is not None:
+            agent.messages = [{"role": "system", "content": agent.system_message}]
+        self._finish_turn(agent_name, turn)
+
+    def reset_histories(self):
+        """Clear every agent's history, and the coordinator's, back to the system message
+
+        Doesn't block: an agent with a turn still running (say, a straggler
+        from a collective turn) is cleared as soon as that turn finishes, and
+        any turn sent in the meantime waits for the reset, so a late reply
+        never lands in the new conversation.
+        """
+        for agent_name in list(self.agents):
+            previous, turn = self._claim_turn(agent_name)
+            if previous is None:
+                self._reset_agent(agent_name, turn)
+            else:
+                previous.add_done_callback(
+                    lambda _, agent_name=agent_name, turn=turn: self._reset_agent(agent_name, turn)
+                )
+        if self.coordinator:
+            self.coordinator.messages = [{"role": "system", "content": self.coordinator.system_message}]
+
+    def _final_evaluation_prompt(self, user_input: str, responses: List[Dict[str, Any]]) -> str:
+        return build_synthesis_prompt(user_input, responses, self.synthesis_excerpt_tokens,
+                                      get_estimator(self.coordinator.model))
+
+    def _synthesis_messages(self, user_input: str, responses: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """The coordinator's synthesis prompt; the full prompt is not kept in its history"""
+        self.coordinator.add_message("user", self._final_evaluation_prompt(user_input, responses))
+        try:
+            return list(self.coordinator.prompt_messages())
+        finally:
+            self.coordinator.pop_message()
+
+    def _record_synthesis(self,
+                          user_input: str,
+                          responses: List[Dict[str, Any]],
+                          final_eval: Optional[Dict[str, Any]]):
+        """Keep a short summary of the synthesis in the coordinator's history"""
+        final_text = final_eval.get("response") if final_eval and final_eval.get("success") else None
+        for message in synthesis_summary(user_input, responses, final_text):
+            self.coordinator.add_message(message["role"], message["content"])
+
+    def _agent_response(self, agent_name: str, response: Dict[str, Any], process_time: float) -> Dict[str, Any]:
+        """An agent's successful reply as reported in collective events, with the model that answered it"""
+        return {
+            "agent": agent_name,
+            "model": response.get("model", self.agents[agent_name].model),
+            "response": response["response"],
+            "time": process_time
+        }
 
-    def get_collective_response(self, user_input: str) -> Generator[Dict[str, Any], None, None]:
-        """Get coordinated responses from multiple agents, yielding intermediate results"""
+    @staticmethod
+    def _final_evaluation_event(final_eval: Dict[str, Any],
+                                responses: List[Dict[str, Any]],
+                                analysis: Dict[str, Any],
+                                total_tokens: int,
+                                coordinator_time: float,
+                                agent_times: Dict[str, float],
+                                agent_ttft: Optional[Dict[str, float]] = None,
+                                extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if final_eval["success"]:
+            # Final complete result with coordinator's evaluation
+            return {
+                "phase": "complete",
+                "success": True,
+                "responses": responses,
+                "coordinator_analysis": analysis["analysis"],
+                "final_evaluation": final_eval["response"],
+                "tokens": total_tokens + final_eval.get("tokens", 0),
+                "coordinator_time": coordinator_time,
+                "agent_times": agent_times,
+                "agent_ttft": agent_ttft or {},
+                "coordinator_tokens": analysis.get("tokens", 0),
+                "final_tokens": final_eval.get("tokens", 0),
+                "final_ttft": final_eval.get("ttft"),
+                "time": max(agent_times.values()) if agent_times else coordinator_time,
+                **(extra or {})
+            }
+        return {
+            "phase": "complete",
+            "success": False,
+            "error": f"Final evaluation failed: {final_eval.get('error', 'Unknown error')}",
+            "responses": responses
+        }
+
+    @staticmethod
+    def _cutoff(responses: List[Dict[str, Any]],
+                pending: int,
+                quorum: Optional[int],
+                deadline_at: Optional[float]) -> Optional[str]:
+        """Why synthesis should start before the remaining agents answer, if it should
+
+        Synthesis never starts on an empty set of responses, so the deadline
+        only applies once at least one agent has answered.
+        """
+        if not pending or not responses:
+            return None
+        if quorum and len(responses) >= quorum:
+            return "quorum"
+        if deadline_at is not None and time.time() >= deadline_at:
+            return "deadline"
+        return None
+
+    @staticmethod
+    def _follow_up_event(complete: Dict[str, Any],
+                         late_responses: List[Dict[str, Any]],
+                         late_tokens: Dict[str, int],
+                         late_errors: Dict[str, str],
+                         late_error_models: Dict[str, str]) -> Dict[str, Any]:
+        """The complete event updated with the agents that answered after synthesis started"""
+        return {
+            **complete,
+            "phase": "follow_up",
+            "responses": complete["responses"] + late_responses,
+            "late_responses": late_responses,
+            "tokens": complete["tokens"] + sum(late_tokens.values()),
+            "agent_times": {**complete["agent_times"],
+                            **{response["agent"]: response["time"] for response in late_responses}},
+            "agent_tokens": {**complete["agent_tokens"], **late_tokens},
+            "agent_errors": {**complete["agent_errors"], **late_errors},
+            "agent_error_models": {**complete["agent_error_models"], **late_error_models},
+            "straggler_agents": []
+        }
+
+    def get_collective_response(self,
+                                user_input: str,
+                                max_concurrency: Optional[int] = None,
+                                stream: bool = False,
+                                deadline: Optional[float] = None,
+                                quorum: Optional[int] = None,
+                                follow_up: bool = False) -> Generator[Dict[str, Any], None, None]:
+        """Get coordinated responses from multiple agents, yielding intermediate results
+
+        Specialist agents are queried concurrently (at most ``max_concurrency`` at a
+        time) and an ``agent_response`` event is yielded as each one finishes.
+        With ``stream=True`` token deltas are yielded as they arrive, as
+        ``agent_delta`` events per agent and ``final_delta`` events for the
+        coordinator's synthesis.
+
+        By default synthesis waits for every selected agent. With ``quorum`` it
+        starts once that many have answered, and with ``deadline`` once that
+        many seconds have passed since the turn started (given at least one
+        answer). The complete event lists the agents that made the cut
+        (``included_agents``) and the ``straggler_agents`` that didn't, with
+        ``cutoff`` set to "quorum" or "deadline". Stragglers that already
+        started keep running and land in their own history before the agent's
+        next turn (run_agent_turn and later collective turns wait for them); with
+        ``follow_up=True`` the generator waits for them after the complete
+        event, yielding a ``late_response`` event for each and a final
+        ``follow_up`` event: the complete event with their replies added.
+        """
         if not self.coordinator:
             yield {
                 "success": False,
@@ -122,110 +829,447 @@ class AgentGroup:
             }
             return
 
-        # Get task analysis from coordinator
-        self.coordinator.start_processing()
-        analysis = self.coordinator.analyze_task(user_input, self.api)
-        coordinator_time = self.coordinator.end_processing()
+        saved_before = self._prompt_tokens_saved()
+        deadline_at = time.time() + deadline if deadline is not None else None
+        tracer = get_tracer()
+        turn = tracer.start_span("collective_turn", coordinator=self.coordinator.model, stream=stream)
+        try:
+            yield from tracer.iterate_in(turn, self._collective_turn(user_input, turn, saved_before,
+                                                                     max_concurrency, stream,
+                                                                     deadline_at, quorum, follow_up))
+        finally:
+            turn.end()
+
+    def _collective_turn(self,
+                         user_input: str,
+                         turn: Span,
+                         saved_before: Dict[str, int],
+                         max_concurrency: Optional[int],
+                         stream: bool,
+                         deadline_at: Optional[float] = None,
+                         quorum: Optional[int] = None,
+                         follow_up: bool = False) -> Generator[Dict[str, Any], None, None]:
+        tracer = get_tracer()
+
+        # Get task analysis from coordinator (analyze_task times itself)
+        with tracer.span("coordinator.analyze", model=self.coordinator.model) as span:
+            analysis = self.coordinator.analyze_task(user_input, self.api, self.available_roles())
+            if not analysis["success"]:
+                span.set_error(analysis.get("error", "Unknown error"))
+        coordinator_time = analysis["time"]
 
         if not analysis["success"]:
+            turn.set_error(analysis.get("error", "Unknown error"))
             yield {
                 **analysis,
                 "coordinator_time": coordinator_time
             }
             return
 
+        # Only dispatch to the agents the coordinator selected
+        routing = self._routing(analysis)
+
         # Yield coordinator results first
         yield {
             "phase": "coordinator",
             "success": True,
             "analysis": analysis["analysis"],
-            "coordinator_time": coordinator_time
+            "coordinator_time": coordinator_time,
+            **routing
         }
 
         responses = []
         total_tokens = 0
         agent_times = {}
+        agent_tokens = {}
+        agent_errors = {}
+        agent_error_models = {}
+        agent_ttft = {}
 
-        # Get responses from selected agents
-        for agent_name, agent in self.agents.items():
-            agent.start_processing()
-            agent.add_message("user", user_input)
-            response = self.get_response(agent_name)
-            process_time = agent.end_processing()
+        # Get responses from selected agents concurrently. Workers report deltas
+        # and results through a queue so events come out in arrival order; each
+        # agent is only touched by its own task, so its history stays ordered.
+        events: "queue.Queue[Tuple[str, str, Any]]" = queue.Queue()
 
-            if response["success"]:
-                agent_response = {
-                    "agent": agent_name,
-                    "response": response["response"],
-                    "time": process_time
-                }
-                responses.append(agent_response)
-                total_tokens += response["tokens"]
-                agent_times[agent_name] = process_time
-
-                # Yield intermediate result after each agent
-                yield {
-                    "phase": "agent_response",
-                    "success": True,
-                    "current_agent": agent_name,
-                    "agent_response": agent_response,
-                    "responses": responses,
-                    "tokens": total_tokens,
-                    "coordinator_analysis": analysis["analysis"],
-                    "coordinator_time": coordinator_time,
-                    "agent_times": agent_times,
-                    "time": max(agent_times.values()) if agent_times else coordinator_time
-                }
+        def run_agent(agent_name: str, previous: Optional[Future]):
+            on_delta = (lambda delta: events.put(("delta", agent_name, delta))) if stream else None
+            try:
+                if previous is not None:
+                    # E.g. the agent's last turn outlived its cut; its history must be complete first
+                    wait([previous])
+                # Worker threads don't inherit the turn's context
+                with tracer.use_span(turn):
+                    result = self._run_agent_turn(agent_name, user_input, on_delta)
+            except Exception as e:
+                result = ({"success": False, "error": str(e)}, 0.0)
+            events.put(("done", agent_name, result))
 
-        try:
-            # Get final evaluation from coordinator
-            final_evaluation_prompt = f"""Here are all agent responses for the user input: {user_input}
+        selected = routing["selected_agents"]
+        limit = max(1, min(max_concurrency or self.max_concurrency, len(selected) or 1))
+        executor = ThreadPoolExecutor(max_workers=limit)
+        futures = {}
+        for agent_name in selected:
+            # Claimed here rather than in the worker, so the agent's turns keep the order they were sent in
+            previous, agent_turn = self._claim_turn(agent_name)
+            futures[agent_name] = executor.submit(run_agent, agent_name, previous)
+            self._finish_turn_after(futures[agent_name], agent_name, agent_turn, previous)
+        # Agents still running (or queued) get no new work, so the pool can wind down on its own
+        executor.shutdown(wait=False)
 
-            Agent responses:
-            {json.dumps(responses, indent=2)}
+        unanswered = set(selected)
+        cutoff = None
+        try:
+            while unanswered:
+                cutoff = self._cutoff(responses, len(unanswered), quorum, deadline_at)
+                if cutoff:
+                    break
+                try:
+                    timeout = max(0.0, deadline_at - time.time()) if deadline_at is not None and responses else None
+                    kind, agent_name, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if kind == "delta":
+                    yield {
+                        "phase": "agent_delta",
+                        "success": True,
+                        "current_agent": agent_name,
+                        "delta": payload
+                    }
+                    continue
 
-            Please provide a final evaluation and synthesis of these responses.
-            If the user is requesting code, you MUST include the final, optimized code implementation after your analysis.
-            Your response should follow this format:
+                unanswered.discard(agent_name)
+                response, process_time = payload
+                if response["success"]:
+                    agent_response = self._agent_response(agent_name, response, process_time)
+                    responses.append(agent_response)
+                    total_tokens += response["tokens"]
+                    agent_times[agent_name] = process_time
+                    agent_tokens[agent_name] = response["tokens"]
+                    if response.get("ttft") is not None:
+                        agent_ttft[agent_name] = response["ttft"]
 
-            1. Analysis: A clear, concise summary of the different approaches and their pros/cons
-            2. Final Implementation: If code was requested, provide the complete, optimized code that combines the best aspects of all responses
-            
-            Make sure to include actual code, not just descriptions of what the code should do."""
+                    # Yield intermediate result as each agent finishes
+                    yield {
+                        "phase": "agent_response",
+                        "success": True,
+                        "current_agent": agent_name,
+                        "agent_response": agent_response,
+                        "responses": responses,
+                        "tokens": total_tokens,
+                        "coordinator_analysis": analysis["analysis"],
+                        "coordinator_time": coordinator_time,
+                        "agent_times": agent_times,
+                        "agent_tokens": agent_tokens,
+                        "agent_ttft": agent_ttft,
+                        "time": max(agent_times.values()) if agent_times else coordinator_time
+                    }
+                else:
+                    agent_errors[agent_name] = response.get("error", "Unknown error")
+                    agent_error_models[agent_name] = response.get("model", self.agents[agent_name].model)
+        except GeneratorExit:
+            # The consumer stopped early: don't start agents nobody will hear from
+            for future in futures.values():
+                future.cancel()
+            raise
 
-            self.coordinator.add_message("user", final_evaluation_prompt)
-            final_eval = self.api.generate_completion(
-                model=self.coordinator.model,
-                messages=self.coordinator.get_messages()
-            )
+        # Agents that haven't started yet are dropped unless a follow-up will wait for them
+        stragglers = [agent_name for agent_name in selected if agent_name in unanswered]
+        if not follow_up:
+            for agent_name in stragglers:
+                futures[agent_name].cancel()
+        cut = {
+            "included_agents": [response["agent"] for response in responses],
+            "straggler_agents": stragglers,
+            "cutoff": cutoff
+        }
+        turn.set_attribute("cutoff", cutoff)
+        turn.set_attribute("stragglers", len(stragglers))
 
-            if final_eval["success"]:
-                # Yield final complete result with coordinator's evaluation
-                yield {
-                    "phase": "complete",
-                    "success": True,
-                    "responses": responses,
-                    "coordinator_analysis": analysis["analysis"],
-                    "final_evaluation": final_eval["response"],
-                    "tokens": total_tokens + final_eval.get("tokens", 0),
-                    "coordinator_time": coordinator_time,
-                    "agent_times": agent_times,
-                    "time": max(agent_times.values()) if agent_times else coordinator_time
-                }
+        synthesis = tracer.start_span("coordinator.synthesis", model=self.coordinator.model, responses=len(responses))
+        final_start = time.time()
+        try:
+            # Get final evaluation from coordinator
+            messages = self._synthesis_messages(user_input, responses)
+            if stream:
+                for final_eval in tracer.iterate_in(synthesis, self.api.generate_completion(
+                    model=self.coordinator.model,
+                    messages=messages,
+                    temperature=self.coordinator.temperature,
+                    cache=self.coordinator.cache_completions,
+                    stream=True
+                )):
+                    if not final_eval["done"]:
+                        yield {
+                            "phase": "final_delta",
+                            "success": True,
+                            "delta": final_eval["delta"]
+                        }
             else:
-                yield {
-                    "phase": "complete",
-                    "success": False,
-                    "error": f"Final evaluation failed: {final_eval.get('error', 'Unknown error')}",
-                    "responses": responses
+                with tracer.use_span(synthesis):
+                    final_eval = self.api.generate_completion(
+                        model=self.coordinator.model,
+                        messages=messages,
+                        temperature=self.coordinator.temperature,
+                        cache=self.coordinator.cache_completions
+                    )
+            if not final_eval["success"]:
+                synthesis.set_error(final_eval.get("error", "Unknown error"))
+            synthesis.end()
+            self._record_synthesis(user_input, responses, final_eval)
+            complete = self._final_evaluation_event(
+                final_eval, responses, analysis, total_tokens, coordinator_time, agent_times, agent_ttft,
+                {
+                    **routing,
+                    **cut,
+                    "prompt_tokens_saved": self._prompt_tokens_saved_since(saved_before),
+                    "agent_tokens": agent_tokens,
+                    "agent_errors": agent_errors,
+                    "agent_error_models": agent_error_models,
+                    "final_time": time.time() - final_start,
+                    "trace_id": turn.trace_id
                 }
+            )
         except Exception as e:
+            synthesis.set_error(str(e))
+            synthesis.end()
+            self._record_synthesis(user_input, responses, None)
+            complete = {
+                "phase": "complete",
+                "success": False,
+                "error": f"Error in final evaluation: {str(e)}",
+                "responses": responses
+            }
+        yield complete
+        if not (follow_up and stragglers and complete["success"]):
+            return
+
+        late_responses = []
+        late_tokens = {}
+        late_errors = {}
+        late_error_models = {}
+        while unanswered:
+            kind, agent_name, payload = events.get()
+            if kind == "delta":
+                continue
+            unanswered.discard(agent_name)
+            response, process_time = payload
+            if not response["success"]:
+                late_errors[agent_name] = response.get("error", "Unknown error")
+                late_error_models[agent_name] = response.get("model", self.agents[agent_name].model)
+                continue
+            agent_response = self._agent_response(agent_name, response, process_time)
+            late_responses.append(agent_response)
+            late_tokens[agent_name] = response["tokens"]
+            yield {
+                "phase": "late_response",
+                "success": True,
+                "current_agent": agent_name,
+                "agent_response": agent_response
+            }
+        yield self._follow_up_event(complete, late_responses, late_tokens, late_errors, late_error_models)
+
+    async def aget_collective_response(self,
+                                       user_input: str,
+                                       max_concurrency: Optional[int] = None,
+                                       deadline: Optional[float] = None,
+                                       quorum: Optional[int] = None,
+                                       follow_up: bool = False) -> AsyncGenerator[Dict[str, Any], None]:
+        """Async counterpart of get_collective_response, yielding the same events"""
+        if not self.coordinator:
+            yield {
+                "success": False,
+                "error": "No coordinator agent available"
+            }
+            return
+
+        saved_before = self._prompt_tokens_saved()
+        deadline_at = time.time() + deadline if deadline is not None else None
+        tracer = get_tracer()
+        turn = tracer.start_span("collective_turn", coordinator=self.coordinator.model, stream=False)
+        try:
+            async for event in self._acollective_turn(user_input, turn, saved_before, max_concurrency,
+                                                      deadline_at, quorum, follow_up):
+                yield event
+        finally:
+            turn.end()
+
+    async def _acollective_turn(self,
+                                user_input: str,
+                                turn: Span,
+                                saved_before: Dict[str, int],
+                                max_concurrency: Optional[int],
+                                deadline_at: Optional[float] = None,
+                                quorum: Optional[int] = None,
+                                follow_up: bool = False) -> AsyncGenerator[Dict[str, Any], None]:
+        tracer = get_tracer()
+
+        with tracer.span("coordinator.analyze", parent=turn, model=self.coordinator.model) as span:
+            analysis = await self.coordinator.aanalyze_task(user_input, self.api, self.available_roles())
+            if not analysis["success"]:
+                span.set_error(analysis.get("error", "Unknown error"))
+        coordinator_time = analysis["time"]
+
+        if not analysis["success"]:
+            turn.set_error(analysis.get("error", "Unknown error"))
             yield {
+                **analysis,
+                "coordinator_time": coordinator_time
+            }
+            return
+
+        routing = self._routing(analysis)
+
+        yield {
+            "phase": "coordinator",
+            "success": True,
+            "analysis": analysis["analysis"],
+            "coordinator_time": coordinator_time,
+            **routing
+        }
+
+        responses = []
+        total_tokens = 0
+        agent_times = {}
+        agent_tokens = {}
+        agent_errors = {}
+        agent_error_models = {}
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or self.max_concurrency))
+        started = set()
+
+        async def run_agent(agent_name: str, previous: Optional[Future]):
+            try:
+                # E.g. the agent's last turn outlived its cut; its history must be complete first
+                await self._await_turn(previous)
+                async with semaphore:
+                    started.add(agent_name)
+                    with tracer.use_span(turn):
+                        response, process_time = await self._arun_agent_turn(agent_name, user_input)
+            except Exception as e:
+                # One failing agent counts as an error, as in the sync path; the others still answer
+                response, process_time = {"success": False, "error": str(e)}, 0.0
+            return agent_name, response, process_time
+
+        selected = routing["selected_agents"]
+        tasks = {}
+        for agent_name in selected:
+            previous, agent_turn = self._claim_turn(agent_name)
+            tasks[agent_name] = asyncio.ensure_future(run_agent(agent_name, previous))
+            self._finish_turn_after(tasks[agent_name], agent_name, agent_turn, previous)
+
+        pending = set(tasks.values())
+        cutoff = None
+        try:
+            while pending:
+                cutoff = self._cutoff(responses, len(pending), quorum, deadline_at)
+                if cutoff:
+                    break
+                timeout = max(0.0, deadline_at - time.time()) if deadline_at is not None and responses else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for next_done in done:
+                    agent_name, response, process_time = next_done.result()
+                    if not response["success"]:
+                        agent_errors[agent_name] = response.get("error", "Unknown error")
+                        agent_error_models[agent_name] = response.get("model", self.agents[agent_name].model)
+                        continue
+                    agent_response = self._agent_response(agent_name, response, process_time)
+                    responses.append(agent_response)
+                    total_tokens += response["tokens"]
+                    agent_times[agent_name] = process_time
+                    agent_tokens[agent_name] = response["tokens"]
+
+                    yield {
+                        "phase": "agent_response",
+                        "success": True,
+                        "current_agent": agent_name,
+                        "agent_response": agent_response,
+                        "responses": responses,
+                        "tokens": total_tokens,
+                        "coordinator_analysis": analysis["analysis"],
+                        "coordinator_time": coordinator_time,
+                        "agent_times": agent_times,
+                        "agent_tokens": agent_tokens,
+                        "time": max(agent_times.values()) if agent_times else coordinator_time
+                    }
+        except BaseException:
+            # Don't leave agent calls running if the consumer stops early
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        stragglers = [agent_name for agent_name in selected if tasks[agent_name] in pending]
+        if not follow_up:
+            # Started stragglers finish in the background; the rest are dropped
+            for agent_name in stragglers:
+                if agent_name not in started:
+                    tasks[agent_name].cancel()
+        cut = {
+            "included_agents": [response["agent"] for response in responses],
+            "straggler_agents": stragglers,
+            "cutoff": cutoff
+        }
+        turn.set_attribute("cutoff", cutoff)
+        turn.set_attribute("stragglers", len(stragglers))
+
+        final_start = time.time()
+        try:
+            messages = self._synthesis_messages(user_input, responses)
+            with tracer.span("coordinator.synthesis", parent=turn, model=self.coordinator.model,
+                             responses=len(responses)) as span:
+                final_eval = await self.api.agenerate_completion(
+                    model=self.coordinator.model,
+                    messages=messages,
+                    temperature=self.coordinator.temperature,
+                    cache=self.coordinator.cache_completions
+                )
+                if not final_eval["success"]:
+                    span.set_error(final_eval.get("error", "Unknown error"))
+            self._record_synthesis(user_input, responses, final_eval)
+            complete = self._final_evaluation_event(
+                final_eval, responses, analysis, total_tokens, coordinator_time, agent_times,
+                extra={
+                    **routing,
+                    **cut,
+                    "prompt_tokens_saved": self._prompt_tokens_saved_since(saved_before),
+                    "agent_tokens": agent_tokens,
+                    "agent_errors": agent_errors,
+                    "agent_error_models": agent_error_models,
+                    "final_time": time.time() - final_start,
+                    "trace_id": turn.trace_id
+                }
+            )
+        except Exception as e:
+            self._record_synthesis(user_input, responses, None)
+            complete = {
                 "phase": "complete",
                 "success": False,
                 "error": f"Error in final evaluation: {str(e)}",
                 "responses": responses
             }
+        yield complete
+        if not (follow_up and stragglers and complete["success"]):
+            return
+
+        late_responses = []
+        late_tokens = {}
+        late_errors = {}
+        late_error_models = {}
+        for next_done in asyncio.as_completed([tasks[agent_name] for agent_name in stragglers]):
+            agent_name, response, process_time = await next_done
+            if not response["success"]:
+                late_errors[agent_name] = response.get("error", "Unknown error")
+                late_error_models[agent_name] = response.get("model", self.agents[agent_name].model)
+                continue
+            agent_response = self._agent_response(agent_name, response, process_time)
+            late_responses.append(agent_response)
+            late_tokens[agent_name] = response["tokens"]
+            yield {
+                "phase": "late_response",
+                "success": True,
+                "current_agent": agent_name,
+                "agent_response": agent_response
+            }
+        yield self._follow_up_event(complete, late_responses, late_tokens, late_errors, late_error_models)
 
     def get_agents(self) -> Dict[str, Agent]:
         return self.agents
\ No newline at end of file
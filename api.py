@@ -1,71 +1,699 @@
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+import json
+import threading
 import time
-from typing import Dict, Any
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Dict, Any, Awaitable, Callable, Iterator, Optional, Tuple, Union
 import os
+from cache import CompletionCache, completion_key, get_completion_cache, messages_digest
+from request_logging import completion_logging_enabled, log_completion, log_payload, redact, should_log_payload
+from scheduler import RETRYABLE_STATUSES, RequestScheduler, get_scheduler, parse_retry_after
+from prompt_cache import add_cache_breakpoints, prompt_cache_usage
+from singleflight import AsyncSingleFlight, SingleFlight, get_async_single_flight, get_single_flight
+from tracing import Span, get_tracer
+
+if TYPE_CHECKING:
+    # aiohttp is imported on first async use; sync-only callers never load it
+    import aiohttp
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+DEFAULT_POOL_SIZE = 10
+DEFAULT_ASYNC_POOL_SIZE = 100
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 120.0
+
+DOTENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+
+_environment_loaded = False
+_environment_lock = threading.Lock()
+
+def load_environment():
+    """Load the .env file next to this module into os.environ, once per process
+
+    Variables already set in the environment are kept, as with load_dotenv.
+    """
+    global _environment_loaded
+    with _environment_lock:
+        if _environment_loaded:
+            return
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path=DOTENV_PATH)
+        _environment_loaded = True
+
+# Pooled sessions shared by every OpenRouterAPI in the process, keyed by pool size
+_shared_sessions: Dict[int, requests.Session] = {}
+_shared_sessions_lock = threading.Lock()
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Create a keep-alive session with a connection pool of the given size"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+def get_shared_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Return the process-wide pooled session for this pool size"""
+    with _shared_sessions_lock:
+        session = _shared_sessions.get(pool_size)
+        if session is None:
+            session = create_session(pool_size)
+            _shared_sessions[pool_size] = session
+        return session
 
 class OpenRouterAPI:
-    def __init__(self, api_key: str):
-        # Load environment variables
-        load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+    def __init__(self,
+                 api_key: str,
+                 base_url: Optional[str] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 session: Optional[requests.Session] = None,
+                 async_pool_size: int = DEFAULT_ASYNC_POOL_SIZE,
+                 completion_cache: Optional[CompletionCache] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 async_single_flight: Optional[AsyncSingleFlight] = None,
+                 prompt_caching: bool = True):
+        load_environment()
         self.api_key = api_key
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = base_url or os.getenv("OPENROUTER_BASE_URL", DEFAULT_BASE_URL)
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "HTTP-Referer": "http://localhost:8501",
             "X-Title": "AutogenAssistant",
             "Content-Type": "application/json"
         }
+        # The session is only read after construction (headers and timeouts are
+        # passed per request), so a single instance can be shared across threads.
+        self.session = session or get_shared_session(pool_size)
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        # The aiohttp session is bound to an event loop, so it is created lazily
+        self.async_pool_size = async_pool_size
+        self._async_session: Optional["aiohttp.ClientSession"] = None
+        self._async_session_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Optional on-disk completion cache, enabled by COMPLETION_CACHE_PATH
+        cache_path = os.getenv("COMPLETION_CACHE_PATH")
+        if completion_cache is None and cache_path:
+            completion_cache = get_completion_cache(
+                cache_path,
+                preload=int(os.getenv("COMPLETION_CACHE_PRELOAD", "0"))
+            )
+        self.completion_cache = completion_cache
+        # Retries and per-model limits, shared process-wide unless one is passed
+        self.scheduler = scheduler or get_scheduler()
+        # Identical concurrent completions share one upstream request, process-wide by default
+        self.single_flight = single_flight or get_single_flight()
+        self.async_single_flight = async_single_flight or get_async_single_flight()
+        # Mark stable prompt prefixes as cacheable for providers that need explicit breakpoints
+        self.prompt_caching = prompt_caching
+
+    def close(self):
+        """Close the underlying session if it is not the shared one"""
+        if self.session not in _shared_sessions.values():
+            self.session.close()
+
+    def _get_async_session(self) -> "aiohttp.ClientSession":
+        """Return the aiohttp session for the running loop, creating it if needed"""
+        import aiohttp
+        loop = asyncio.get_running_loop()
+        if (self._async_session is None or self._async_session.closed
+                or self._async_session_loop is not loop):
+            connector = aiohttp.TCPConnector(limit=self.async_pool_size)
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=self.timeout[0],
+                sock_read=self.timeout[1]
+            )
+            self._async_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._async_session_loop = loop
+        return self._async_session
+
+    async def aclose(self):
+        """Close the aiohttp session and its connector"""
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+        self._async_session_loop = None
+
+    def _finish_request(self,
+                        span: Span,
+                        model: str,
+                        start_time: float,
+                        status: Optional[int],
+                        result: Dict[str, Any],
+                        stream: bool = False):
+        """End the request's span and log it"""
+        if status is not None:
+            span.set_attribute("status", status)
+        span.set_attribute("tokens", result.get("tokens", 0))
+        if "cached_prompt_tokens" in result:
+            span.set_attribute("cached_prompt_tokens", result["cached_prompt_tokens"])
+        span.set_attribute("retries", result.get("retries", 0))
+        span.set_attribute("throttled_ms", round(result.get("throttled_time", 0.0) * 1000, 3))
+        if result.get("cancelled"):
+            span.set_attribute("cancelled", True)
+        if not result.get("success"):
+            span.set_error(str(result.get("error", "")))
+        span.end()
+        self._log_completion(model, start_time, status, result, stream)
+
+    def _log_completion(self,
+                        model: str,
+                        start_time: float,
+                        status: Optional[int],
+                        result: Dict[str, Any],
+                        stream: bool = False):
+        """Emit the one-line INFO record for a completion (no-op when INFO is off)"""
+        if not completion_logging_enabled():
+            return
+        usage = result.get("usage") or {}
+        record = {
+            "event": "completion",
+            "model": model,
+            "status": status,
+            "success": result.get("success", False),
+            "latency_ms": round((time.time() - start_time) * 1000, 1),
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "cached_prompt_tokens": result.get("cached_prompt_tokens"),
+            "total_tokens": result.get("tokens"),
+            "retries": result.get("retries", 0),
+            "throttled_ms": round(result.get("throttled_time", 0.0) * 1000, 1),
+            "stream": stream,
+            "cached": result.get("cached", False)
+        }
+        if result.get("cancelled"):
+            record["cancelled"] = True
+        if not result.get("success"):
+            record["error"] = redact(str(result.get("error", "")))[:500]
+        log_completion(record)
+
+    @staticmethod
+    def _parse_completion(result: Dict[str, Any], completion_time: float) -> Dict[str, Any]:
+        """Turn a /chat/completions response body into our result dict"""
+        if "choices" not in result or not result["choices"]:
+            return {
+                "success": False,
+                "error": "Invalid API response: missing choices",
+                "raw_response": result
+            }
+        if "usage" not in result:
+            return {
+                "success": True,
+                "response": result["choices"][0]["message"]["content"],
+                "tokens": 0,
+                "time": completion_time
+            }
+        return {
+            "success": True,
+            "response": result["choices"][0]["message"]["content"],
+            "tokens": result["usage"]["total_tokens"],
+            "usage": result["usage"],
+            **prompt_cache_usage(result["usage"]),
+            "time": completion_time
+        }
+
+    def _payload_messages(self, model: str, messages: list) -> list:
+        """The messages as sent: with prompt-cache breakpoints where the model supports them"""
+        if not self.prompt_caching:
+            return messages
+        return add_cache_breakpoints(model, messages)
+
+    def _completion_cache_key(self,
+                              model: str,
+                              messages: list,
+                              temperature: float,
+                              response_format: Optional[Dict[str, Any]] = None,
+                              cache: bool = True) -> Optional[str]:
+        if not cache or self.completion_cache is None:
+            return None
+        return self._request_key(model, messages, temperature, response_format)
+
+    @staticmethod
+    def _request_key(model: str,
+                     messages: list,
+                     temperature: float,
+                     response_format: Optional[Dict[str, Any]] = None) -> str:
+        namespace = json.dumps(response_format, sort_keys=True) if response_format else ""
+        return completion_key(model, messages_digest(messages), temperature, namespace=namespace)
+
+    def _flight_key(self,
+                    model: str,
+                    messages: list,
+                    temperature: float,
+                    response_format: Optional[Dict[str, Any]] = None) -> Tuple[str, str, str]:
+        # Calls to another endpoint or with another key are never merged
+        return (self.base_url, self.api_key, self._request_key(model, messages, temperature, response_format))
+
+    def _coalesced(self, model: str, start_time: float, result: Dict[str, Any], shared: bool) -> Dict[str, Any]:
+        """A caller's own copy of a possibly shared result"""
+        if not shared:
+            return dict(result)
+        result = {**result, "coalesced": True, "time": time.time() - start_time}
+        self._log_completion(model, start_time, None, result)
+        return result
+
+    def _cached_completion(self, cache_key: Optional[str], start_time: float) -> Optional[Dict[str, Any]]:
+        if cache_key is None:
+            return None
+        with get_tracer().span("cache.lookup", layer="completion_cache") as span:
+            value = self.completion_cache.get(cache_key)
+            span.set_attribute("hit", value is not None)
+        if value is None:
+            return None
+        return {**value, "cached": True, "time": time.time() - start_time}
+
+    def _store_completion(self, cache_key: Optional[str], model: str, result: Dict[str, Any]):
+        if cache_key is None or not result.get("success"):
+            return
+        self.completion_cache.put(cache_key, model, {
+            "success": True,
+            "response": result["response"],
+            "tokens": result.get("tokens", 0)
+        })
+
+    # The completion cache's SQLite tier can wait up to its busy timeout for a
+    # lock, so the async path runs it on a worker thread rather than the loop
+
+    async def _acached_completion(self, cache_key: Optional[str], start_time: float) -> Optional[Dict[str, Any]]:
+        if cache_key is None:
+            return None
+        return await asyncio.to_thread(self._cached_completion, cache_key, start_time)
+
+    async def _astore_completion(self, cache_key: Optional[str], model: str, result: Dict[str, Any]):
+        if cache_key is None or not result.get("success"):
+            return
+        await asyncio.to_thread(self._store_completion, cache_key, model, result)
+
+    def _send(self, model: str, send: Callable[[], requests.Response], meta: Dict[str, Any]) -> requests.Response:
+        """Send a completion request through the scheduler, retrying transient failures
+
+        Retries 408/429/5xx responses and connection errors with backoff,
+        counting them in ``meta["retries"]`` and the time spent waiting in
+        ``meta["throttled_time"]``. The returned response still holds its
+        concurrency slot; the caller must ``self.scheduler.release(model)``.
+        """
+        policy = self.scheduler.policy
+        while True:
+            meta["throttled_time"] += self.scheduler.acquire(model)
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout):
+                self.scheduler.release(model)
+                if meta["retries"] >= policy.max_retries:
+                    raise
+                retry_after = None
+            except BaseException:
+                self.scheduler.release(model)
+                raise
+            else:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                self.scheduler.observe(model, response.status_code, retry_after)
+                if response.status_code not in RETRYABLE_STATUSES or meta["retries"] >= policy.max_retries:
+                    return response
+                response.close()
+                self.scheduler.release(model)
+            delay = policy.backoff(meta["retries"], retry_after)
+            meta["retries"] += 1
+            meta["throttled_time"] += delay
+            time.sleep(delay)
+
+    async def _asend(self,
+                     model: str,
+                     send: Callable[[], Awaitable["aiohttp.ClientResponse"]],
+                     meta: Dict[str, Any]) -> "aiohttp.ClientResponse":
+        """Async counterpart of _send"""
+        import aiohttp
+        policy = self.scheduler.policy
+        while True:
+            meta["throttled_time"] += await self.scheduler.aacquire(model)
+            try:
+                response = await send()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self.scheduler.release(model)
+                if meta["retries"] >= policy.max_retries:
+                    raise
+                retry_after = None
+            except BaseException:
+                # Includes cancellation, which must not leak the slot
+                self.scheduler.release(model)
+                raise
+            else:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                self.scheduler.observe(model, response.status, retry_after)
+                if response.status not in RETRYABLE_STATUSES or meta["retries"] >= policy.max_retries:
+                    return response
+                response.release()
+                self.scheduler.release(model)
+            delay = policy.backoff(meta["retries"], retry_after)
+            meta["retries"] += 1
+            meta["throttled_time"] += delay
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _parse_sse_line(line: str) -> Optional[Dict[str, Any]]:
+        """Parse one server-sent-event line; None for comments, keep-alives and [DONE]"""
+        if not line or not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if not data or data == "[DONE]":
+            return None
+        return json.loads(data)
 
     def generate_completion(self, 
                           model: str, 
                           messages: list, 
-                          temperature: float = 0.7) -> Dict[str, Any]:
+                          temperature: float = 0.7,
+                          stream: bool = False,
+                          response_format: Optional[Dict[str, Any]] = None,
+                          cache: bool = True,
+                          coalesce: bool = True) -> Union[Dict[str, Any], Iterator[Dict[str, Any]]]:
         """
         Generate completion using OpenRouter API
+
+        With ``stream=True`` this returns an iterator of chunks instead (see
+        ``stream_completion``). ``response_format`` (e.g. ``{"type": "json_object"}``)
+        is passed through for models that support structured output. When a
+        completion cache is configured, ``cache=False`` bypasses it for this call.
+
+        Identical calls (model, messages, temperature, response_format) made
+        while one is in flight wait for it and share its result, marked
+        ``coalesced``; ``coalesce=False`` always sends a request of its own.
+
+        For models whose provider supports prompt caching (see prompt_cache),
+        the system message and the end of the prompt are sent as cache
+        breakpoints, and the result reports ``cached_prompt_tokens`` and
+        ``uncached_prompt_tokens`` from the usage block.
         """
+        if stream:
+            return self.stream_completion(model, messages, temperature, cache=cache)
+
+        start_time = time.time()
+        cache_key = self._completion_cache_key(model, messages, temperature, response_format, cache)
+        cached = self._cached_completion(cache_key, start_time)
+        if cached is not None:
+            self._log_completion(model, start_time, None, cached)
+            return cached
+
+        if not coalesce:
+            return self._request_completion(model, messages, temperature, response_format, cache_key, start_time)
+        result, shared = self.single_flight.do(
+            self._flight_key(model, messages, temperature, response_format),
+            lambda: self._request_completion(model, messages, temperature, response_format, cache_key, start_time)
+        )
+        return self._coalesced(model, start_time, result, shared)
+
+    def _request_completion(self,
+                            model: str,
+                            messages: list,
+                            temperature: float,
+                            response_format: Optional[Dict[str, Any]],
+                            cache_key: Optional[str],
+                            start_time: float) -> Dict[str, Any]:
+        """Send one completion request and store a successful result in the completion cache"""
         url = f"{self.base_url}/chat/completions"
         
         payload = {
             "model": model,
-            "messages": messages,
+            "messages": self._payload_messages(model, messages),
             "temperature": temperature
         }
+        if response_format:
+            payload["response_format"] = response_format
+
+        sampled = should_log_payload()
+        if sampled:
+            log_payload("request", url, payload, self.headers)
+
+        span = get_tracer().start_span("http.completion", model=model, stream=False)
+        status = None
+        meta = {"retries": 0, "throttled_time": 0.0}
+        try:
+            response = self._send(
+                model,
+                lambda: self.session.post(url, headers=self.headers, json=payload, timeout=self.timeout),
+                meta
+            )
+            try:
+                status = response.status_code
+                # requests measures elapsed up to the response headers, i.e. time to first byte
+                span.set_attribute("ttfb_ms", round(response.elapsed.total_seconds() * 1000, 3))
+                if sampled:
+                    log_payload("response", url, response.text)
 
-        print(f"Debug - API Request:")
-        print(f"URL: {url}")
-        print(f"Headers: {self.headers}")
-        print(f"Payload: {payload}")
+                response.raise_for_status()
+                completion_time = time.time() - start_time
+
+                result = self._parse_completion(response.json(), completion_time)
+                self._store_completion(cache_key, model, result)
+            finally:
+                self.scheduler.release(model)
+        except Exception as e:
+            result = {
+                "success": False,
+                "error": str(e)
+            }
+        result.update(meta)
+        self._finish_request(span, model, start_time, status, result)
+        return result
+
+    def stream_completion(self,
+                          model: str,
+                          messages: list,
+                          temperature: float = 0.7,
+                          cache: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a completion as server-sent events.
 
+        Yields ``{"success": True, "done": False, "delta": text}`` for each token
+        delta, then one final chunk shaped like a generate_completion result with
+        ``done: True`` and ``ttft`` (seconds until the first delta arrived).
+        """
         start_time = time.time()
+        cache_key = self._completion_cache_key(model, messages, temperature, cache=cache)
+        cached = self._cached_completion(cache_key, start_time)
+        if cached is not None:
+            self._log_completion(model, start_time, None, cached, stream=True)
+            yield {"success": True, "done": False, "delta": cached["response"]}
+            yield {**cached, "done": True, "ttft": cached["time"]}
+            return
+
+        url = f"{self.base_url}/chat/completions"
+
+        payload = {
+            "model": model,
+            "messages": self._payload_messages(model, messages),
+            "temperature": temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+
+        sampled = should_log_payload()
+        if sampled:
+            log_payload("request", url, payload, self.headers)
+
+        span = get_tracer().start_span("http.completion", model=model, stream=True)
+        status = None
+        ttft = None
+        parts = []
+        usage = {}
+        meta = {"retries": 0, "throttled_time": 0.0}
+        result = None
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
-            print(f"Debug - API Response:")
-            print(f"Status Code: {response.status_code}")
-            print(f"Response Text: {response.text}")
-            
-            response.raise_for_status()
-            completion_time = time.time() - start_time
-            
-            result = response.json()
-            if "choices" not in result or not result["choices"]:
-                return {
+            try:
+                # Only the request is retried; once deltas have been yielded a failure is final
+                response = self._send(
+                    model,
+                    lambda: self.session.post(url, headers=self.headers, json=payload,
+                                              timeout=self.timeout, stream=True),
+                    meta
+                )
+                # try/finally rather than except: the consumer may close us mid-stream
+                try:
+                    status = response.status_code
+                    span.set_attribute("ttfb_ms", round((time.time() - start_time) * 1000, 3))
+                    response.raise_for_status()
+
+                    for line in response.iter_lines(decode_unicode=True):
+                        chunk = self._parse_sse_line(line)
+                        if chunk is None:
+                            continue
+                        if "error" in chunk:
+                            raise RuntimeError(chunk["error"].get("message", str(chunk["error"])))
+                        if chunk.get("usage"):
+                            usage = chunk["usage"]
+                        for choice in chunk.get("choices", []):
+                            delta = choice.get("delta", {}).get("content")
+                            if delta:
+                                if ttft is None:
+                                    ttft = time.time() - start_time
+                                parts.append(delta)
+                                yield {"success": True, "done": False, "delta": delta}
+                finally:
+                    response.close()
+                    self.scheduler.release(model)
+
+                result = {
+                    "success": True,
+                    "done": True,
+                    "response": "".join(parts),
+                    "tokens": usage.get("total_tokens", 0),
+                    "usage": usage,
+                    **prompt_cache_usage(usage),
+                    "time": time.time() - start_time,
+                    "ttft": ttft
+                }
+                if sampled:
+                    log_payload("response", url, result["response"])
+                self._store_completion(cache_key, model, result)
+            except Exception as e:
+                result = {
                     "success": False,
-                    "error": "Invalid API response: missing choices",
-                    "raw_response": result
+                    "done": True,
+                    "error": str(e)
                 }
-            if "usage" not in result:
+        finally:
+            # Closed by the consumer mid-stream (GeneratorExit): the request still ends its span and is logged
+            if result is None:
+                result = {
+                    "success": False,
+                    "done": True,
+                    "error": "Stream closed before the reply finished",
+                    "cancelled": True
+                }
+            result.update(meta)
+            if ttft is not None:
+                span.set_attribute("ttft_ms", round(ttft * 1000, 3))
+            self._finish_request(span, model, start_time, status, result, stream=True)
+        yield result
+
+    async def agenerate_completion(self,
+                                   model: str,
+                                   messages: list,
+                                   temperature: float = 0.7,
+                                   response_format: Optional[Dict[str, Any]] = None,
+                                   cache: bool = True,
+                                   coalesce: bool = True) -> Dict[str, Any]:
+        """
+        Async counterpart of generate_completion, sharing one connector per event loop
+
+        Cancelling one of several coalesced callers leaves the shared request
+        running for the others.
+        """
+        start_time = time.time()
+        cache_key = self._completion_cache_key(model, messages, temperature, response_format, cache)
+        cached = await self._acached_completion(cache_key, start_time)
+        if cached is not None:
+            self._log_completion(model, start_time, None, cached)
+            return cached
+
+        if not coalesce:
+            return await self._arequest_completion(model, messages, temperature, response_format,
+                                                   cache_key, start_time)
+        result, shared = await self.async_single_flight.do(
+            self._flight_key(model, messages, temperature, response_format),
+            lambda: self._arequest_completion(model, messages, temperature, response_format, cache_key, start_time)
+        )
+        return self._coalesced(model, start_time, result, shared)
+
+    async def _arequest_completion(self,
+                                   model: str,
+                                   messages: list,
+                                   temperature: float,
+                                   response_format: Optional[Dict[str, Any]],
+                                   cache_key: Optional[str],
+                                   start_time: float) -> Dict[str, Any]:
+        """Async counterpart of _request_completion"""
+        url = f"{self.base_url}/chat/completions"
+
+        payload = {
+            "model": model,
+            "messages": self._payload_messages(model, messages),
+            "temperature": temperature
+        }
+        if response_format:
+            payload["response_format"] = response_format
+
+        sampled = should_log_payload()
+        if sampled:
+            log_payload("request", url, payload, self.headers)
+
+        span = get_tracer().start_span("http.completion", model=model, stream=False)
+        status = None
+        meta = {"retries": 0, "throttled_time": 0.0}
+        result = None
+        try:
+            try:
+                session = self._get_async_session()
+                response = await self._asend(
+                    model,
+                    lambda: session.post(url, headers=self.headers, json=payload),
+                    meta
+                )
+                try:
+                    status = response.status
+                    span.set_attribute("ttfb_ms", round((time.time() - start_time) * 1000, 3))
+                    text = await response.text()
+                    if sampled:
+                        log_payload("response", url, text)
+
+                    response.raise_for_status()
+                    completion_time = time.time() - start_time
+
+                    result = self._parse_completion(json.loads(text), completion_time)
+                finally:
+                    response.release()
+                    self.scheduler.release(model)
+                await self._astore_completion(cache_key, model, result)
+            except Exception as e:
+                result = {
+                    "success": False,
+                    "error": str(e)
+                }
+        finally:
+            # Cancelled mid-request (e.g. the service's client disconnected): the span still ends and is logged
+            if result is None:
+                result = {
+                    "success": False,
+                    "error": "Request cancelled",
+                    "cancelled": True
+                }
+            result.update(meta)
+            self._finish_request(span, model, start_time, status, result)
+        return result
+
+    def get_models(self,
+                   etag: Optional[str] = None,
+                   last_modified: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get available models from OpenRouter
+
+        Passing the ``etag``/``last_modified`` of a previous response makes the
+        request conditional; if the list is unchanged the result has
+        ``not_modified: True`` and no ``models``.
+        """
+        url = f"{self.base_url}/models"
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
                 return {
                     "success": True,
-                    "response": result["choices"][0]["message"]["content"],
-                    "tokens": 0,
-                    "time": completion_time
+                    "not_modified": True
                 }
+            response.raise_for_status()
             return {
                 "success": True,
-                "response": result["choices"][0]["message"]["content"],
-                "tokens": result["usage"]["total_tokens"],
-                "time": completion_time
+                "models": response.json()["data"],
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
             }
         except Exception as e:
             return {
@@ -73,18 +701,19 @@ class OpenRouterAPI:
                 "error": str(e)
             }
 
-    def get_models(self) -> Dict[str, Any]:
+    async def aget_models(self) -> Dict[str, Any]:
         """
-        Get available models from OpenRouter
+        Async counterpart of get_models
         """
         url = f"{self.base_url}/models"
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            return {
-                "success": True,
-                "models": response.json()["data"]
-            }
+            session = self._get_async_session()
+            async with session.get(url, headers=self.headers) as response:
+                response.raise_for_status()
+                return {
+                    "success": True,
+                    "models": (await response.json())["data"]
+                }
         except Exception as e:
             return {
                 "success": False,
@@ -0,0 +1,296 @@
+"""Run JSONL prompt workloads through the agent pipeline without the dashboard.
+
+Each input line is a JSON object: {"id": ..., "prompt": ..., "mode": ..., "agent": ...}.
+Only "prompt" is required; "id" defaults to the line number, "mode" to --mode
+("collective" or "single") and "agent" to --agent (a role such as "coder").
+Every prompt starts from a fresh roster, so prompts don't see each other's
+history.
+
+Results are appended to the output JSONL as they complete. The output doubles
+as the checkpoint: rerunning with the same output skips ids already written
+(failed ones too, unless --retry-failed). A line cut off by an interrupted
+run is dropped and its prompt runs again.
+
+Usage: python batch.py prompts.jsonl results.jsonl [--workers 8] [--mode single --agent coder]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from api import OpenRouterAPI, load_environment
+from cache import ResponseCache
+from catalog import CatalogSnapshot, get_model_catalog
+from hedging import DEFAULT_HEDGE_POLICIES_PATH, HedgePolicy, HedgeStats, load_hedge_policies
+from metrics import MetricsStore, SeriesStats
+from roster import DEFAULT_SELECTIONS_PATH, build_agent_group, load_model_selections
+
+DEFAULT_WORKERS = 4
+MODES = ("collective", "single")
+
+def read_prompts(path: str, default_mode: str, default_agent: str) -> Iterator[Dict[str, Any]]:
+    """Yield normalized prompt records, reading the file lazily"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "prompt" not in record:
+                raise ValueError(f"{path}:{line_number}: missing \"prompt\"")
+            mode = record.get("mode", default_mode)
+            if mode not in MODES:
+                raise ValueError(f"{path}:{line_number}: unknown mode {mode!r}")
+            yield {
+                "id": str(record.get("id", line_number)),
+                "prompt": record["prompt"],
+                "mode": mode,
+                "agent": record.get("agent", default_agent)
+            }
+
+def load_checkpoint(path: str, retry_failed: bool = False) -> Set[str]:
+    """Ids already written to the output file
+
+    With ``retry_failed`` failed ids are left out so they run again; the
+    output then holds both attempts and the later line wins.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get("success") or not retry_failed:
+                done.add(str(result["id"]))
+    return done
+
+def trim_partial_line(path: str):
+    """Drop an unterminated last line left by an interrupted run"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+class BatchRunner:
+    """Runs prompt records on a bounded worker pool, one fresh roster per prompt"""
+
+    def __init__(self,
+                 api: OpenRouterAPI,
+                 selected_models: Dict[str, Optional[str]],
+                 catalog: Optional[CatalogSnapshot] = None,
+                 workers: int = DEFAULT_WORKERS,
+                 agent_concurrency: Optional[int] = None,
+                 hedge_policies: Optional[Dict[str, HedgePolicy]] = None,
+                 deadline: Optional[float] = None,
+                 quorum: Optional[int] = None):
+        self.api = api
+        self.selected_models = selected_models
+        self.catalog = catalog
+        self.workers = workers
+        self.agent_concurrency = agent_concurrency
+        self.hedge_policies = hedge_policies
+        self.deadline = deadline
+        self.quorum = quorum
+        # Shared across prompts, so repeated prompts are answered from cache
+        self.response_cache = ResponseCache()
+        # Every agent and coordinator call, by the model that made it and its role
+        self.metrics = MetricsStore()
+        # Whole prompts, start to finish
+        self.prompts = SeriesStats()
+        self._prompts_lock = threading.Lock()
+        self.hedge_stats = HedgeStats()
+
+    def _resolve_agent(self, group, agent: str) -> Optional[str]:
+        """Find an agent by role or name"""
+        for agent_name, candidate in group.get_agents().items():
+            if agent in (candidate.role, agent_name):
+                return agent_name
+        return None
+
+    def run_one(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a single prompt record and return its result record"""
+        start = time.time()
+        result: Dict[str, Any] = {"id": record["id"], "mode": record["mode"]}
+        try:
+            group = build_agent_group(self.api, self.selected_models, self.catalog,
+                                      self.response_cache, self.agent_concurrency,
+                                      self.hedge_policies, self.hedge_stats)
+            if record["mode"] == "single":
+                result.update(self._run_single(group, record))
+            else:
+                result.update(self._run_collective(group, record))
+        except Exception as e:
+            result.update({"success": False, "error": str(e)})
+        result["time"] = time.time() - start
+        with self._prompts_lock:
+            self.prompts.record(result["time"], result.get("tokens", 0), result["success"], start)
+        return result
+
+    def _run_single(self, group, record: Dict[str, Any]) -> Dict[str, Any]:
+        agent_name = self._resolve_agent(group, record["agent"])
+        if agent_name is None:
+            return {"success": False, "error": f"Unknown agent: {record['agent']}"}
+        response, process_time = group.run_agent_turn(agent_name, record["prompt"])
+        agent = group.agents[agent_name]
+        # With a hedge policy the reply may have come from the fallback model
+        self.metrics.record(response.get("model", agent.model), agent.role, process_time,
+                            response.get("tokens", 0), response["success"])
+        if not response["success"]:
+            return {"success": False, "agent": agent_name, "error": response.get("error", "Unknown error")}
+        return {
+            "success": True,
+            "agent": agent_name,
+            "model": response.get("model", agent.model),
+            "response": response["response"],
+            "tokens": response.get("tokens", 0)
+        }
+
+    def _run_collective(self, group, record: Dict[str, Any]) -> Dict[str, Any]:
+        event: Dict[str, Any] = {"success": False, "error": "No events"}
+        for event in group.get_collective_response(record["prompt"], deadline=self.deadline, quorum=self.quorum):
+            if not event["success"]:
+                break
+        if not event["success"]:
+            # The coordinator's analysis or synthesis failed
+            self.metrics.record(group.coordinator.model, group.coordinator.role, event.get("coordinator_time", 0.0),
+                                success=False)
+            return {"success": False, "error": event.get("error", "Unknown error")}
+        self.metrics.record_collective(event, group.agents, group.coordinator)
+        return {
+            "success": True,
+            "final_evaluation": event["final_evaluation"],
+            "responses": event["responses"],
+            "selected_agents": event.get("selected_agents", []),
+            "skipped_agents": event.get("skipped_agents", []),
+            "straggler_agents": event.get("straggler_agents", []),
+            "tokens": event["tokens"],
+            "coordinator_time": event["coordinator_time"],
+            "agent_times": event["agent_times"],
+            "final_time": event.get("final_time")
+        }
+
+    def run(self, records: Iterator[Dict[str, Any]], output) -> Tuple[int, float]:
+        """Run records, writing each result line to ``output`` as it completes
+
+        At most ``2 * workers`` prompts are in flight, so large inputs are
+        never read into memory at once. Returns (completed, wall time).
+        """
+        completed = 0
+        start = time.time()
+        in_flight: Set[Future] = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                for record in records:
+                    if len(in_flight) >= 2 * self.workers:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        completed += self._write(finished, output)
+                    in_flight.add(executor.submit(self.run_one, record))
+                while in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    completed += self._write(finished, output)
+            except KeyboardInterrupt:
+                # Keep what has finished; unfinished prompts rerun on resume
+                for future in in_flight:
+                    future.cancel()
+                raise
+        return completed, time.time() - start
+
+    @staticmethod
+    def _write(finished: Set[Future], output) -> int:
+        for future in finished:
+            output.write(json.dumps(future.result(), ensure_ascii=False) + "\n")
+        output.flush()
+        return len(finished)
+
+def print_summary(prompts: SeriesStats,
+                  metrics: MetricsStore,
+                  completed: int,
+                  skipped: int,
+                  wall_time: float,
+                  hedge_stats: Optional[HedgeStats] = None):
+    summary = prompts.summary()
+    print(f"completed={completed} skipped={skipped} errors={summary['errors']} "
+          f"wall={wall_time:.1f}s throughput={completed / wall_time if wall_time else 0.0:.2f} prompts/s "
+          f"tokens={summary['tokens']}")
+    if summary["p50"] is not None:
+        print(f"latency p50={summary['p50']:.2f}s p95={summary['p95']:.2f}s p99={summary['p99']:.2f}s")
+    for row in metrics.summary("model"):
+        p95 = f"{row['p95']:.2f}s" if row["p95"] is not None else "-"
+        print(f"  {row['model']:<40} calls={row['requests']} errors={row['errors']} p95={p95}")
+    for role, stats in (hedge_stats.report() if hedge_stats else {}).items():
+        print(f"  hedging {role:<10} calls={stats['calls']} hedged={stats['hedged']} ({stats['hedge_rate']:.1%}) "
+              f"wins={stats['hedge_wins']} failovers={stats['failovers']}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a JSONL prompt workload through the agent pipeline")
+    parser.add_argument("input", help="Prompts JSONL")
+    parser.add_argument("output", help="Results JSONL; also the checkpoint for resuming")
+    parser.add_argument("--mode", choices=MODES, default="collective", help="Default mode for prompts without one")
+    parser.add_argument("--agent", default="coder", help="Default role or agent name for single-agent prompts")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Prompts processed concurrently")
+    parser.add_argument("--agent-concurrency", type=int, default=None,
+                        help="Specialists queried concurrently within a collective turn")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Seconds into a collective turn after which synthesis starts with the replies in so far")
+    parser.add_argument("--quorum", type=int, default=None,
+                        help="Start synthesis once this many specialists have replied")
+    parser.add_argument("--selections", default=DEFAULT_SELECTIONS_PATH, help="Per-role model selections JSON")
+    parser.add_argument("--hedge-policies", default=DEFAULT_HEDGE_POLICIES_PATH,
+                        help="Per-role hedging/fallback policies JSON (optional)")
+    parser.add_argument("--retry-failed", action="store_true", help="Rerun prompts whose earlier result failed")
+    args = parser.parse_args(argv)
+
+    load_environment()
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        print("OPENROUTER_API_KEY is not set", file=sys.stderr)
+        return 2
+    try:
+        selected_models = load_model_selections(args.selections)
+    except (OSError, ValueError) as e:
+        print(f"Could not read model selections from {args.selections}: {str(e)}", file=sys.stderr)
+        return 2
+    try:
+        hedge_policies = load_hedge_policies(args.hedge_policies)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Could not read hedge policies from {args.hedge_policies}: {str(e)}", file=sys.stderr)
+        return 2
+
+    api = OpenRouterAPI(api_key, pool_size=max(args.workers * 4, 10))
+    # Context lengths are optional; without a catalog agents use the default window
+    catalog = get_model_catalog().get(api)
+    runner = BatchRunner(api, selected_models, catalog, args.workers, args.agent_concurrency, hedge_policies,
+                         args.deadline, args.quorum)
+
+    trim_partial_line(args.output)
+    done = load_checkpoint(args.output, args.retry_failed)
+    skipped = 0
+
+    def pending() -> Iterator[Dict[str, Any]]:
+        nonlocal skipped
+        for record in read_prompts(args.input, args.mode, args.agent):
+            if record["id"] in done:
+                skipped += 1
+                continue
+            yield record
+
+    completed, wall_time = 0, 0.0
+    with open(args.output, "a", encoding="utf-8") as output:
+        try:
+            completed, wall_time = runner.run(pending(), output)
+        except KeyboardInterrupt:
+            print("Interrupted; rerun the same command to resume", file=sys.stderr)
+            return 130
+    print_summary(runner.prompts, runner.metrics, completed, skipped, wall_time, runner.hedge_stats)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
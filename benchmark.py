@@ -0,0 +1,578 @@
+"""Benchmarks against the local OpenRouter stand-in (no API credits needed).
+
+Usage: python benchmark.py <benchmark> [--calls N], e.g. python benchmark.py transport --calls 200
+
+The load benchmarks (api, agent, collective) take the mock server's flags too,
+e.g. python benchmark.py collective --calls 50 --concurrency 4 --latency 0.2 \
+--latency-distribution lognormal --error-rate 0.02
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from api import OpenRouterAPI
+from mock_openrouter import add_server_arguments, server_options, start_mock_server
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Summarize a list of latencies (seconds) in milliseconds"""
+    ordered = sorted(latencies)
+    return {
+        "calls": len(ordered),
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+    }
+
+def time_calls(call: Callable[[], None], calls: int) -> List[float]:
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def _peak_rss_kib() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform == "darwin" else float(peak)
+
+def run_load(call: Callable[[int], bool],
+             calls: int,
+             concurrency: int,
+             trace_memory: bool = False) -> Dict[str, Any]:
+    """Run ``call(i)`` for i in range(calls) on ``concurrency`` threads
+
+    ``call`` returns whether it succeeded. Reports latencies, throughput and
+    peak RSS growth; with ``trace_memory`` also the Python heap still held
+    after the run (tracemalloc slows every allocation, so latencies suffer).
+    """
+    def timed(i: int) -> Tuple[float, bool]:
+        start = time.perf_counter()
+        ok = call(i)
+        return time.perf_counter() - start, ok
+
+    if trace_memory:
+        tracemalloc.start()
+        heap_before = tracemalloc.get_traced_memory()[0]
+    rss_before = _peak_rss_kib()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(calls)))
+    wall_time = time.perf_counter() - start
+    rss_after = _peak_rss_kib()
+
+    summary = {
+        **summarize([latency for latency, _ in results]),
+        "errors": sum(1 for _, ok in results if not ok),
+        "throughput": calls / wall_time,
+        "peak_rss_growth_kib": rss_after - rss_before if rss_before is not None else None
+    }
+    if trace_memory:
+        gc.collect()
+        heap_after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        summary["heap_growth_kib"] = (heap_after - heap_before) / 1024
+    return summary
+
+def print_summary(label: str, summary: Dict[str, float]):
+    print(f"{label:<28} calls={summary['calls']:<6} mean={summary['mean_ms']:.3f}ms "
+          f"p50={summary['p50_ms']:.3f}ms p95={summary['p95_ms']:.3f}ms p99={summary['p99_ms']:.3f}ms")
+
+def print_load(label: str, summary: Dict[str, Any]):
+    print_summary(label, summary)
+    line = f"{'':<28} throughput={summary['throughput']:.1f}/s errors={summary['errors']}"
+    if summary["peak_rss_growth_kib"] is not None:
+        line += f" peak RSS growth={summary['peak_rss_growth_kib']:.0f}KiB"
+    if "heap_growth_kib" in summary:
+        line += f" heap growth={summary['heap_growth_kib']:.1f}KiB"
+    print(line)
+
+def bench_transport(args):
+    """Per-call latency of a fresh connection per request vs the pooled session"""
+    server = start_mock_server()
+    messages = [{"role": "user", "content": "Say hello"}]
+    payload = {"model": "mock/model", "messages": messages, "temperature": 0.7}
+    url = f"{server.base_url}/chat/completions"
+
+    def unpooled():
+        # What generate_completion did before: module-level requests.post
+        requests.post(url, json=payload).raise_for_status()
+
+    api = OpenRouterAPI("mock-key", base_url=server.base_url)
+
+    def pooled():
+        result = api.generate_completion("mock/model", messages)
+        assert result["success"], result
+
+    print_summary("unpooled (requests.post)", summarize(time_calls(unpooled, args.calls)))
+    print_summary("pooled (OpenRouterAPI)", summarize(time_calls(pooled, args.calls)))
+    server.shutdown()
+
+def bench_tokens(args):
+    """Cost of sizing a 100-turn history with the cached per-message token counts"""
+    from agents import Agent
+
+    agent = Agent("Bench", "coder", "mistralai/mistral-small-24b-instruct-2501:free", "You are a helpful assistant.")
+    turn = "Please refactor this function so it streams results instead of building a list. " * 6
+    start = time.perf_counter()
+    for i in range(100):
+        agent.add_message("user", f"{i}: {turn}")
+        agent.add_message("assistant", f"{i}: def f(items):\n    for item in items:\n        yield item\n" * 4)
+    append_ms = (time.perf_counter() - start) * 1000
+
+    print(f"history: {len(agent.messages)} messages, ~{agent.prompt_tokens()} tokens "
+          f"(counted while appending: {append_ms / len(agent.messages):.3f}ms per message)")
+    print_summary("Agent.prompt_tokens()", summarize(time_calls(agent.prompt_tokens, args.calls)))
+    print_summary("Agent.prompt_messages()", summarize(time_calls(agent.prompt_messages, args.calls)))
+
+_SYNTHESIS_CODE = """```python
+import csv
+
+def read_rows(path, delimiter=","):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f, delimiter=delimiter):
+            yield row
+```"""
+
+def _synthesis_replies(turn: int) -> List[Dict[str, Any]]:
+    """Three specialist replies of typical length that share code and caveats"""
+    caveat = "Use the csv module rather than str.split so quoted fields and embedded commas are handled."
+    prose = f"For question {turn}, the approach streams rows instead of loading the file. " * 12
+    return [
+        {"agent": "Code Assistant", "response": f"{prose}\n\n{_SYNTHESIS_CODE}\n\n{caveat}", "time": 3.2},
+        {"agent": "Critic", "response": f"The implementation is reasonable.\n\n{_SYNTHESIS_CODE}\n\n{caveat}\n\n"
+                                        + "Edge cases: empty files, BOMs and very long lines. " * 20, "time": 5.1},
+        {"agent": "User Proxy", "response": f"{caveat}\n\n" + "The user mainly wants something simple. " * 30,
+         "time": 2.4},
+    ]
+
+def bench_synthesis(args):
+    """Coordinator input tokens per synthesis call: pretty-printed JSON vs the compact builder"""
+    from agents import AgentGroup, CoordinatorAgent
+    from config import DEFAULT_AGENT_ROLES
+    from synthesis import SYNTHESIS_INSTRUCTIONS
+    from tokens import get_estimator
+
+    model = "mistralai/mistral-small-24b-instruct-2501:free"
+    estimator = get_estimator(model)
+    system_message = DEFAULT_AGENT_ROLES["coordinator"]["system_message"]
+
+    def legacy_prompt(user_input: str, responses: List[Dict[str, Any]]) -> str:
+        # What the final evaluation sent before: every field, pretty-printed
+        return (f"Here are all agent responses for the user input: {user_input}\n\n"
+                f"Agent responses:\n{json.dumps(responses, indent=2)}\n\n{SYNTHESIS_INSTRUCTIONS}")
+
+    group = AgentGroup(None)
+    group.add_agent(CoordinatorAgent("Coordinator", model, system_message))
+    legacy_history = [{"role": "system", "content": system_message}]
+    turns = 10
+    legacy_tokens, compact_tokens = [], []
+    for turn in range(turns):
+        user_input = f"Question {turn}: write a streaming CSV reader"
+        responses = _synthesis_replies(turn)
+
+        legacy_history.append({"role": "user", "content": legacy_prompt(user_input, responses)})
+        legacy_tokens.append(estimator.count_messages(legacy_history))
+
+        messages = group._synthesis_messages(user_input, responses)
+        compact_tokens.append(estimator.count_messages(messages))
+        group._record_synthesis(user_input, responses, {"success": True, "response": "Final answer. " * 200})
+
+    print(f"synthesis input tokens over {turns} turns (first/last/mean):")
+    for label, counts in (("json.dumps prompt", legacy_tokens), ("compact prompt", compact_tokens)):
+        print(f"  {label:<20} {counts[0]:>6} {counts[-1]:>6} {statistics.mean(counts):>8.0f}")
+    print(f"  reduction: {1 - sum(compact_tokens) / sum(legacy_tokens):.0%}")
+
+def _mock_api(args) -> Tuple[Any, OpenRouterAPI]:
+    server = start_mock_server(**server_options(args))
+    api = OpenRouterAPI("mock-key", base_url=server.base_url, pool_size=max(args.concurrency, 10))
+    return server, api
+
+def _bench_agents(api: OpenRouterAPI, count: int):
+    from agents import Agent, AgentGroup, CoordinatorAgent
+
+    group = AgentGroup(api)
+    group.add_agent(CoordinatorAgent("Coordinator", "mock/coordinator", "You coordinate.", cache_completions=False))
+    for i in range(count):
+        group.add_agent(Agent(f"Agent {i}", f"role_{i}", f"mock/model-{i}", "You help.", cache_completions=False))
+    return group
+
+def bench_api(args):
+    """OpenRouterAPI.generate_completion under concurrent load"""
+    server, api = _mock_api(args)
+    messages = [{"role": "user", "content": "Say hello"}]
+
+    def call(i: int) -> bool:
+        if args.stream:
+            for chunk in api.generate_completion("mock/model", messages, stream=True, cache=False):
+                pass
+            return chunk["success"]
+        return api.generate_completion("mock/model", messages, cache=False, coalesce=False)["success"]
+
+    summary = run_load(call, args.calls, args.concurrency, args.trace_memory)
+    print_load(f"api (concurrency={args.concurrency})", summary)
+    server.shutdown()
+
+def bench_coalesce(args):
+    """The same prompt sent by every worker at once, with and without in-flight coalescing"""
+    server, api = _mock_api(args)
+    messages = [{"role": "user", "content": "Say hello"}]
+    for coalesce in (False, True):
+        upstream_before = server.request_count
+
+        def call(i: int) -> bool:
+            # Rounds of identical prompts: each round is one distinct question
+            round_messages = messages + [{"role": "user", "content": f"Round {i // args.concurrency}"}]
+            return api.generate_completion("mock/model", round_messages, cache=False, coalesce=coalesce)["success"]
+
+        summary = run_load(call, args.calls, args.concurrency, args.trace_memory)
+        print_load(f"{'coalesced' if coalesce else 'independent'} (concurrency={args.concurrency})", summary)
+        print(f"{'':<28} upstream requests={server.request_count - upstream_before}")
+    server.shutdown()
+
+def bench_agent(args):
+    """AgentGroup.get_response turns under concurrent load, one agent per worker thread"""
+    server, api = _mock_api(args)
+    group = _bench_agents(api, args.concurrency)
+    # Agents aren't shared across threads: each worker claims one on its first call
+    free_agents = iter(group.agents)
+    claim_lock = threading.Lock()
+    worker = threading.local()
+
+    def call(i: int) -> bool:
+        if not hasattr(worker, "agent_name"):
+            with claim_lock:
+                worker.agent_name = next(free_agents)
+        on_delta = (lambda delta: None) if args.stream else None
+        response, _ = group.run_agent_turn(worker.agent_name, f"Question {i}", on_delta)
+        return response["success"]
+
+    summary = run_load(call, args.calls, args.concurrency, args.trace_memory)
+    print_load(f"agent (concurrency={args.concurrency})", summary)
+    server.shutdown()
+
+def bench_hedge(args):
+    """Agent turns without and with a hedging policy; run with a skewed --latency-distribution"""
+    from hedging import HedgePolicy, LatencyTracker
+
+    server, api = _mock_api(args)
+    for label, policy in (("no hedging", None),
+                          ("hedged at p95", HedgePolicy(fallback_model="mock/fallback", min_samples=20))):
+        group = _bench_agents(api, args.concurrency)
+        # A fresh tracker per run, so the hedged run learns its own p95
+        group.latency_tracker = LatencyTracker()
+        for agent in group.agents.values():
+            group.set_hedge_policy(agent.role, policy)
+        free_agents = iter(group.agents)
+        claim_lock = threading.Lock()
+        worker = threading.local()
+
+        def call(i: int) -> bool:
+            if not hasattr(worker, "agent_name"):
+                with claim_lock:
+                    worker.agent_name = next(free_agents)
+            response, _ = group.run_agent_turn(worker.agent_name, f"Question {i}")
+            return response["success"]
+
+        summary = run_load(call, args.calls, args.concurrency, args.trace_memory)
+        print_load(f"agent, {label}", summary)
+        report = group.hedge_report()
+        if report:
+            calls = sum(stats["calls"] for stats in report.values())
+            hedged = sum(stats["hedged"] for stats in report.values())
+            wins = sum(stats["hedge_wins"] for stats in report.values())
+            failovers = sum(stats["failovers"] for stats in report.values())
+            print(f"{'':<28} hedged={hedged}/{calls} ({hedged / calls:.1%}) hedge wins={wins} failovers={failovers} "
+                  f"({server.request_count} upstream calls so far)")
+    server.shutdown()
+
+def bench_collective(args):
+    """Full collective turns: coordinator analysis, agents fanned out, synthesis"""
+    server, api = _mock_api(args)
+    group = _bench_agents(api, args.agents)
+
+    def call(i: int) -> bool:
+        for event in group.get_collective_response(f"Question {i}", max_concurrency=args.concurrency,
+                                                   stream=args.stream, deadline=args.deadline, quorum=args.quorum):
+            pass
+        return event["success"]
+
+    # Turns share the group's agent histories, so they run one after another
+    summary = run_load(call, args.calls, 1, args.trace_memory)
+    print_load(f"collective ({args.agents} agents, concurrency={args.concurrency})", summary)
+    print(f"mock server: {server.request_count} requests, {server.error_count} errors, "
+          f"{server.rate_limited_count} rate limited")
+    server.shutdown()
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _process_cpu_seconds(pid: int) -> Optional[float]:
+    """CPU time used so far by a running process (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def bench_service(args):
+    """service.py under concurrent multi-turn load, with its CPU use measured
+
+    The service runs in its own process, so requests per CPU-second of that
+    process is the sustainable requests/sec per core.
+    """
+    import aiohttp
+    import signal
+    import subprocess
+    import tempfile
+
+    server = start_mock_server(**server_options(args))
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump({role: f"mock/{role}" for role in ("coordinator", "user_proxy", "coder", "critic")}, f)
+        selections_path = f.name
+    port = _free_port()
+    env = {**os.environ, "OPENROUTER_API_KEY": "mock-key", "OPENROUTER_BASE_URL": server.base_url}
+    service = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "service.py"),
+         "--port", str(port), "--selections", selections_path, "--no-catalog"],
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    endpoint = f"{base_url}/v1/{args.service_mode}"
+
+    async def load():
+        latencies: List[float] = []
+        errors = 0
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            for _ in range(100):
+                try:
+                    async with session.get(f"{base_url}/healthz") as response:
+                        if response.status == 200:
+                            break
+                except aiohttp.ClientError:
+                    await asyncio.sleep(0.1)
+
+            async def client(c: int, turns: int):
+                nonlocal errors
+                conversation_id = None
+                for turn in range(turns):
+                    body = {"prompt": f"Client {c} question {turn}", "stream": args.stream}
+                    if conversation_id:
+                        body["conversation_id"] = conversation_id
+                    start = time.perf_counter()
+                    async with session.post(endpoint, json=body, headers={"X-Tenant-Id": f"tenant-{c % 8}"}) as response:
+                        lines = (await response.text()).strip().splitlines()
+                    latencies.append(time.perf_counter() - start)
+                    final = json.loads(lines[-1]) if lines else {}
+                    if response.status != 200 or not final.get("success"):
+                        errors += 1
+                    conversation_id = final.get("conversation_id", conversation_id)
+
+            turns = max(1, args.calls // args.concurrency)
+            # Leave the service's startup (imports, roster check) out of its CPU time
+            cpu_before = _process_cpu_seconds(service.pid)
+            start = time.perf_counter()
+            await asyncio.gather(*(client(c, turns) for c in range(args.concurrency)))
+            wall_time = time.perf_counter() - start
+            cpu_after = _process_cpu_seconds(service.pid)
+            cpu_seconds = cpu_after - cpu_before if cpu_before is not None else None
+            return latencies, errors, wall_time, cpu_seconds
+
+    try:
+        latencies, errors, wall_time, cpu_seconds = asyncio.run(load())
+    finally:
+        service.send_signal(signal.SIGINT)
+        _, _, usage = os.wait4(service.pid, 0)
+        os.unlink(selections_path)
+        server.shutdown()
+
+    if cpu_seconds is None:
+        # No /proc: fall back to the whole process lifetime, startup included
+        cpu_seconds = usage.ru_utime + usage.ru_stime
+    summary = summarize(latencies)
+    print_summary(f"service {args.service_mode} (clients={args.concurrency})", summary)
+    print(f"{'':<28} throughput={len(latencies) / wall_time:.1f} req/s errors={errors} "
+          f"service CPU={cpu_seconds:.2f}s -> {len(latencies) / cpu_seconds:.1f} req/s per core "
+          f"({server.request_count} upstream calls)")
+
+def _store_session(store, turns: int) -> str:
+    """A session of alternating collective and single-agent turns with replies of typical length"""
+    from conversations import new_session_id
+
+    session_id = new_session_id()
+    for turn in range(turns):
+        if turn % 2:
+            store.append(session_id, {"mode": "single", "agent": "Code Assistant", "messages": [
+                {"role": "user", "content": f"Question {turn}: write a streaming CSV reader"},
+                {"role": "assistant", "content": _synthesis_replies(turn)[0]["response"]}
+            ]})
+        else:
+            store.append(session_id, {
+                "mode": "collective",
+                "user_input": f"Question {turn}: write a streaming CSV reader",
+                "coordinator_analysis": "The coder writes it, the critic reviews it. " * 5,
+                "responses": _synthesis_replies(turn)
+            })
+    return session_id
+
+def _history_script(store_path: str, session_id: str):
+    # Runs as its own Streamlit script: exactly what a rerun of the history fragment executes
+    from conversations import get_conversation_store
+    from utils import render_conversation_history
+
+    render_conversation_history(get_conversation_store(store_path), session_id)
+
+def bench_rerun(args):
+    """Streamlit rerun time of the chat page with a long stored session, drawing every turn vs one page"""
+    import tempfile
+    from streamlit.testing.v1 import AppTest
+
+    import catalog
+    import utils
+    from agents import Agent
+    from conversations import get_conversation_store
+
+    server = start_mock_server(**server_options(args))
+    workdir = tempfile.mkdtemp(prefix="rerun-bench-")
+    store_path = os.path.join(workdir, "conversations.sqlite3")
+    os.environ.update(OPENROUTER_API_KEY="mock-key", OPENROUTER_BASE_URL=server.base_url,
+                      CONVERSATION_STORE_PATH=store_path)
+    # Keep the mock's model list out of the real catalog file (AppTest runs main.py in this process)
+    catalog._catalogs[catalog.DEFAULT_CATALOG_PATH] = catalog.ModelCatalog(os.path.join(workdir, "catalog.json"))
+    session_id = _store_session(get_conversation_store(store_path), args.turns)
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    cwd = os.getcwd()
+    # main.py reads .model_selections.json from the working directory
+    os.chdir(workdir)
+    try:
+        app = AppTest.from_file(main_path, default_timeout=60)
+        app.session_state["conversation_session"] = session_id
+        app.run()
+        app.session_state["agent_group"].add_agent(
+            Agent("Code Assistant", "coder", "mistralai/mistral-small-24b-instruct-2501:free", "You write code.")
+        )
+        history = AppTest.from_function(_history_script, args=(store_path, session_id), default_timeout=60)
+
+        results = []
+        for label, page_size in ((f"all {args.turns} turns", args.turns),
+                                 (f"{utils.DEFAULT_PAGE_SIZE}-turn page", utils.DEFAULT_PAGE_SIZE)):
+            utils.HISTORY_PAGE_SIZE = page_size
+            for script in (app, history):
+                script.run()  # warm up
+                if script.exception:
+                    raise RuntimeError(script.exception[0].message)
+            results.append((f"page, {label}", summarize(time_calls(app.run, args.calls))))
+            results.append((f"history, {label}", summarize(time_calls(history.run, args.calls))))
+    finally:
+        utils.HISTORY_PAGE_SIZE = utils.DEFAULT_PAGE_SIZE
+        os.chdir(cwd)
+        server.shutdown()
+
+    print(f"Streamlit rerun time, {args.turns}-turn session (server side, AppTest):")
+    for label, summary in results:
+        print_summary(label, summary)
+    print("Chat widgets and Send rerun only the chat fragment, paging only the history fragment; "
+          "the sidebar and metrics are not redrawn.")
+
+# Modules whose import dominates cold start, reported as loaded or not after each probe.
+# Headless imports should load none but requests; main.py's first run loads numpy
+# too, which Streamlit itself and the metrics store depend on.
+HEAVY_MODULES = ("pandas", "plotly.express", "aiohttp", "numpy", "requests")
+
+_IMPORT_PROBE = """
+import json, sys, time
+{setup}
+start = time.perf_counter()
+{action}
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def bench_imports(args):
+    """Cold-start time in fresh interpreters: a headless agents import and main.py's first Streamlit run"""
+    import subprocess
+    import tempfile
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix="import-bench-")
+    env = dict(os.environ, PYTHONPATH=root, CONVERSATION_STORE_PATH=os.path.join(workdir, "conversations.sqlite3"),
+               # No key: the page stops before fetching models, so only imports and setup are timed
+               OPENROUTER_API_KEY="")
+    probes = {
+        "import agents": ("", "import agents"),
+        # The headless roster path (batch.py, service.py) goes through config.py
+        "import roster": ("", "import roster"),
+        # Streamlit itself is loaded by the server before the first run, so it is imported up front here too
+        "main.py first run": ("from streamlit.testing.v1 import AppTest\n"
+                              f"app = AppTest.from_file({os.path.join(root, 'main.py')!r}, default_timeout=60)",
+                              "app.run()"),
+    }
+    # Every run starts a new interpreter, so keep the count small
+    runs = min(args.calls, 20)
+    for label, (setup, action) in probes.items():
+        code = _IMPORT_PROBE.format(setup=setup, action=action, heavy=HEAVY_MODULES)
+        timings, loaded = [], []
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                                    capture_output=True, text=True, check=True)
+            report = json.loads(result.stdout.strip().splitlines()[-1])
+            timings.append(report["seconds"])
+            loaded = report["loaded"]
+        print_summary(label, summarize(timings))
+        print(f"{'':<28} loaded: {', '.join(loaded) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+
+BENCHMARKS = {
+    "transport": bench_transport,
+    "tokens": bench_tokens,
+    "api": bench_api,
+    "coalesce": bench_coalesce,
+    "agent": bench_agent,
+    "hedge": bench_hedge,
+    "collective": bench_collective,
+    "synthesis": bench_synthesis,
+    "rerun": bench_rerun,
+    "imports": bench_imports,
+    "service": bench_service,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for AutogenAssistant")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Worker threads (api, agent) or agents in flight (collective)")
+    parser.add_argument("--agents", type=int, default=3, help="Specialist agents in the collective benchmark")
+    parser.add_argument("--stream", action="store_true", help="Stream completions in the load benchmarks")
+    parser.add_argument("--deadline", type=float, default=None, help="Collective turn deadline in seconds")
+    parser.add_argument("--quorum", type=int, default=None, help="Replies a collective turn waits for")
+    parser.add_argument("--turns", type=int, default=200, help="Stored turns in the rerun benchmark's session")
+    parser.add_argument("--service-mode", choices=("collective", "single"), default="collective",
+                        help="Endpoint driven by the service benchmark")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Report Python heap growth with tracemalloc (slows the run)")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
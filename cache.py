@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlite_connections import ThreadLocalConnections
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_TTL = 3600.0
+
+EMPTY_DIGEST = hashlib.sha256(b"").hexdigest()
+
+def chain_digest(previous: str, message: Dict[str, Any]) -> str:
+    """Extend a history digest with one more message"""
+    h = hashlib.sha256(previous.encode("ascii"))
+    h.update(str(message.get("role", "")).encode("utf-8"))
+    h.update(b"\0")
+    h.update(str(message.get("content", "")).encode("utf-8"))
+    return h.hexdigest()
+
+def messages_digest(messages: List[Dict[str, Any]]) -> str:
+    """Digest of a whole message list, equal to chaining chain_digest over it"""
+    digest = EMPTY_DIGEST
+    for message in messages:
+        digest = chain_digest(digest, message)
+    return digest
+
+def completion_key(model: str, history_digest: str, temperature: float, namespace: str = "") -> str:
+    """Fixed-size cache key for a completion request"""
+    return hashlib.sha256(
+        f"{namespace}\0{model}\0{temperature!r}\0{history_digest}".encode("utf-8")
+    ).hexdigest()
+
+class ResponseCache:
+    """Thread-safe LRU cache with an entry cap, a byte-size cap and a TTL"""
+
+    def __init__(self,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: Optional[float] = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (expires_at, size, value)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _size_of(value: Dict[str, Any]) -> int:
+        return len(json.dumps(value, default=str))
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, _, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        size = self._size_of(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+DEFAULT_DISK_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Eviction trims to this fraction of max_bytes, so it runs once per batch of puts rather than on every put
+EVICT_TO = 0.9
+# Pending accessed_at updates are written back once this many pile up or the oldest is this old
+TOUCH_BATCH = 64
+TOUCH_INTERVAL = 5.0
+
+class CompletionCache:
+    """On-disk completion cache shared by every process that opens the same file
+
+    Backed by SQLite in WAL mode, so concurrent readers and writers in other
+    processes are safe. Rows are evicted least-recently-used first once the
+    stored values exceed ``max_bytes``. ``preload`` warms an in-memory
+    ResponseCache with the most recently used rows so hot prompts skip disk.
+
+    Puts keep a running byte total instead of summing the table; only when it
+    passes ``max_bytes`` is the real total read and the table trimmed. Hits
+    from either tier queue an ``accessed_at`` update, written back in batches.
+    """
+
+    def __init__(self,
+                 path: str,
+                 max_bytes: int = DEFAULT_DISK_CACHE_MAX_BYTES,
+                 preload: int = 0,
+                 memory: Optional[ResponseCache] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory = memory if memory is not None else ResponseCache(ttl=None)
+        self._connections = ThreadLocalConnections(path)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Pending accessed_at write-backs, by key
+        self._touched: Dict[str, float] = {}
+        self._touched_since = 0.0
+        self._touch_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute("""CREATE TABLE IF NOT EXISTS completions (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed_at ON completions (accessed_at)")
+        # Approximate: rows other processes add are only counted at the next eviction
+        self._bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        if preload:
+            self.preload(preload)
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def preload(self, limit: int) -> int:
+        """Load the most recently used rows into memory; returns how many were loaded"""
+        rows = self._connection().execute(
+            "SELECT key, value FROM completions ORDER BY accessed_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        # Insert oldest first so the most recent rows end up most recently used
+        for key, value in reversed(rows):
+            self.memory.put(key, json.loads(value))
+        return len(rows)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("hits")
+            self._touch(key)
+            return value
+        row = self._connection().execute("SELECT value FROM completions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        value = json.loads(row[0])
+        self.memory.put(key, value)
+        self._count("hits")
+        self._touch(key)
+        return value
+
+    def _touch(self, key: str):
+        """Queue an accessed_at update for ``key``; write the queue back once it is due"""
+        now = time.time()
+        with self._touch_lock:
+            if not self._touched:
+                self._touched_since = now
+            self._touched[key] = now
+            due = len(self._touched) >= TOUCH_BATCH or now - self._touched_since >= TOUCH_INTERVAL
+        if due:
+            self.flush_access_times()
+
+    def flush_access_times(self):
+        """Write pending accessed_at updates in one statement"""
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            self._connection().executemany(
+                "UPDATE completions SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in touched.items()]
+            )
+
+    def put(self, key: str, model: str, value: Dict[str, Any]):
+        data = json.dumps(value, default=str)
+        now = time.time()
+        conn = self._connection()
+        replaced = conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO completions (key, model, value, size, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, data, len(data), now, now)
+        )
+        self.memory.put(key, value)
+        with self._stats_lock:
+            self._bytes += len(data) - (replaced[0] if replaced else 0)
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Recent hits must be on disk before picking the least recently used rows
+        self.flush_access_times()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # The running total misses other processes' writes, so trim against the real one
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+            target = self.max_bytes * EVICT_TO if total > self.max_bytes else total
+            for key, size in conn.execute(
+                "SELECT key, size FROM completions ORDER BY accessed_at ASC"
+            ).fetchall():
+                if total <= target:
+                    break
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                total -= size
+                self._count("evictions")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._stats_lock:
+            self._bytes = total
+
+    def clear(self):
+        with self._touch_lock:
+            self._touched = {}
+        self._connection().execute("DELETE FROM completions")
+        self.memory.clear()
+        with self._stats_lock:
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+_completion_caches: Dict[str, CompletionCache] = {}
+_completion_caches_lock = threading.Lock()
+
+def get_completion_cache(path: str, **options) -> CompletionCache:
+    """Return the process-wide CompletionCache for this file"""
+    path = os.path.abspath(path)
+    with _completion_caches_lock:
+        cache = _completion_caches.get(path)
+        if cache is None:
+            cache = CompletionCache(path, **options)
+            _completion_caches[path] = cache
+        return cache
@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from api import DEFAULT_BASE_URL, OpenRouterAPI
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_catalog.json")
+
+def default_ttl() -> float:
+    """Catalog TTL in seconds, from MODEL_CACHE_DURATION (hours)"""
+    return float(os.getenv("MODEL_CACHE_DURATION", "24")) * 3600
+
+class CatalogSnapshot:
+    """An immutable view of the model list with lookups precomputed for the UI"""
+
+    def __init__(self,
+                 models: List[Dict[str, Any]],
+                 fetched_at: float,
+                 etag: Optional[str] = None,
+                 last_modified: Optional[str] = None,
+                 base_url: Optional[str] = None):
+        self.models = models
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+        # The API the list was fetched from
+        self.base_url = base_url
+        self.ids = [model["id"] for model in models]
+        self.index = {model_id: i for i, model_id in enumerate(self.ids)}
+        self.available = {model_id: model_id for model_id in self.ids}
+        self.by_id = {model["id"]: model for model in models}
+
+    def index_of(self, model_id: Optional[str], default: int = 0) -> int:
+        return self.index.get(model_id, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "models": self.models,
+            "fetched_at": self.fetched_at,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "base_url": self.base_url
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CatalogSnapshot":
+        return cls(data["models"], data["fetched_at"], data.get("etag"), data.get("last_modified"),
+                   data.get("base_url"))
+
+class ModelCatalog:
+    """Process-wide, disk-persisted cache of OpenRouter's /models list
+
+    ``get`` returns the current snapshot immediately. Once it is older than
+    ``ttl`` a background thread revalidates it with a conditional request,
+    so reruns never wait on the network after the first load.
+
+    Snapshots are kept per API base URL, so a run against a mock server or
+    another endpoint never replaces the OpenRouter list in the shared file.
+    The file holds at most that list and the last other endpoint's.
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = default_ttl() if ttl is None else ttl
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._refreshing: Set[str] = set()
+        self._snapshots = self._load()
+
+    def _load(self) -> Dict[str, CatalogSnapshot]:
+        """Snapshots on disk by base URL; files written before they were keyed are ignored"""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            return {
+                base_url: CatalogSnapshot.from_dict(snapshot)
+                for base_url, snapshot in data["catalogs"].items()
+                if snapshot.get("base_url") == base_url
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return {}
+
+    def _save(self, snapshot: CatalogSnapshot):
+        # Besides this base URL's snapshot, only OpenRouter's own survives (it may have been written by another
+        # process since we loaded); other endpoints' entries, e.g. mock servers on ephemeral ports, are dropped
+        snapshots = {base_url: entry for base_url, entry in self._load().items() if base_url == DEFAULT_BASE_URL}
+        snapshots[snapshot.base_url] = snapshot
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"catalogs": {base_url: entry.to_dict() for base_url, entry in snapshots.items()}}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.last_error = f"Failed to persist model catalog: {str(e)}"
+
+    def snapshot(self, base_url: str) -> Optional[CatalogSnapshot]:
+        return self._snapshots.get(base_url)
+
+    def is_stale(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        return snapshot is None or time.time() - snapshot.fetched_at >= self.ttl
+
+    def refresh(self, api: OpenRouterAPI) -> bool:
+        """Revalidate the catalog for ``api``'s base URL now; returns False if the request failed"""
+        current = self._snapshots.get(api.base_url)
+        result = api.get_models(
+            etag=current.etag if current else None,
+            last_modified=current.last_modified if current else None
+        )
+        if not result["success"]:
+            self.last_error = result["error"]
+            return False
+        if result.get("not_modified") and current is not None:
+            snapshot = CatalogSnapshot(current.models, time.time(), current.etag, current.last_modified,
+                                       api.base_url)
+        else:
+            snapshot = CatalogSnapshot(result["models"], time.time(), result.get("etag"),
+                                       result.get("last_modified"), api.base_url)
+        self._snapshots[api.base_url] = snapshot
+        self.last_error = None
+        self._save(snapshot)
+        return True
+
+    def refresh_in_background(self, api: OpenRouterAPI):
+        """Start a refresh thread unless one is already running"""
+        with self._lock:
+            if api.base_url in self._refreshing:
+                return
+            self._refreshing.add(api.base_url)
+
+        def run():
+            try:
+                self.refresh(api)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(api.base_url)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get(self, api: OpenRouterAPI) -> Optional[CatalogSnapshot]:
+        """Return the catalog for ``api``'s base URL, fetching synchronously only if there is nothing cached"""
+        snapshot = self._snapshots.get(api.base_url)
+        if snapshot is None:
+            self.refresh(api)
+            return self._snapshots.get(api.base_url)
+        if self.is_stale(snapshot):
+            self.refresh_in_background(api)
+        return snapshot
+
+_catalogs: Dict[str, ModelCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+def get_model_catalog(path: str = DEFAULT_CATALOG_PATH, ttl: Optional[float] = None) -> ModelCatalog:
+    """Return the ModelCatalog shared by all sessions in this process"""
+    with _catalogs_lock:
+        catalog = _catalogs.get(path)
+        if catalog is None:
+            catalog = ModelCatalog(path, ttl)
+            _catalogs[path] = catalog
+        return catalog
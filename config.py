@@ -1,5 +1,3 @@
-import streamlit as st
-
 # Default agent roles
 DEFAULT_AGENT_ROLES = {
     "coordinator": {
@@ -11,39 +9,47 @@ DEFAULT_AGENT_ROLES = {
 3. Combining and summarizing agent responses
 4. Ensuring coherent multi-agent conversations
 
-Always explain your reasoning when delegating tasks to agents."""
+Always explain your reasoning when delegating tasks to agents.""",
+        "cache_completions": True
     },
     "user_proxy": {
         "name": "Human Assistant",
         "description": "Represents the user's interests and manages task delegation",
-        "system_message": "You are a helpful assistant representing the user's interests."
+        "system_message": "You are a helpful assistant representing the user's interests.",
+        "cache_completions": True
     },
     "coder": {
         "name": "Code Assistant",
         "description": "Specialized in writing and reviewing code",
-        "system_message": "You are an expert programmer focused on writing clean, efficient code."
+        "system_message": "You are an expert programmer focused on writing clean, efficient code.",
+        "cache_completions": True
     },
     "critic": {
         "name": "Critic Assistant",
         "description": "Reviews and provides constructive feedback",
-        "system_message": "You are a thoughtful critic who provides detailed analysis and feedback."
+        "system_message": "You are a thoughtful critic who provides detailed analysis and feedback.",
+        "cache_completions": True
     }
 }
 
 def init_session_state():
     """Initialize session state variables"""
+    # Imported here so that headless users of DEFAULT_AGENT_ROLES (batch.py, service.py) don't load Streamlit,
+    # nor the metrics store, which loads numpy
+    import streamlit as st
+
+    from conversations import new_session_id
+    from metrics import MetricsStore
+
     if 'api_key' not in st.session_state:
         st.session_state.api_key = ""
-    if 'conversations' not in st.session_state:
-        st.session_state.conversations = []
+    # Turns are kept in the conversation store under this id, not in session state
+    if 'conversation_session' not in st.session_state:
+        st.session_state.conversation_session = new_session_id()
     if 'current_agents' not in st.session_state:
         st.session_state.current_agents = []
     if 'metrics' not in st.session_state:
-        st.session_state.metrics = {
-            'total_tokens': 0,
-            'response_times': [],
-            'model_usage': {}
-        }
+        st.session_state.metrics = MetricsStore()
     if 'available_models' not in st.session_state:
         st.session_state.available_models = {}
     if 'coordinator' not in st.session_state:
@@ -0,0 +1,131 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tokens import DEFAULT_ESTIMATOR, TokenEstimator
+
+DEFAULT_CONTEXT_LENGTH = 32768
+DEFAULT_MAX_COMPLETION_TOKENS = 2048
+DEFAULT_SUMMARY_TOKENS = 512
+SUMMARY_LINE_CHARS = 160
+MEMORY_HEADER = "Summary of earlier conversation (older turns were trimmed):"
+
+class ContextPolicy:
+    """Keeps an agent's prompt inside its model's context window
+
+    The system message is always sent. When the history exceeds the token
+    budget, the oldest turns are dropped (sliding window) and, if
+    ``summarize`` is on, folded into one compact memory message placed right
+    after the system message. ``summarizer`` can replace the built-in
+    extractive summary (first line of each dropped turn).
+    """
+
+    def __init__(self,
+                 context_length: Optional[int] = None,
+                 max_completion_tokens: int = DEFAULT_MAX_COMPLETION_TOKENS,
+                 token_budget: Optional[int] = None,
+                 summarize: bool = True,
+                 summary_tokens: int = DEFAULT_SUMMARY_TOKENS,
+                 summarizer: Optional[Callable[[List[Dict[str, Any]]], str]] = None):
+        self.context_length = context_length or DEFAULT_CONTEXT_LENGTH
+        self.max_completion_tokens = max_completion_tokens
+        self._token_budget = token_budget
+        self.summarize = summarize
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.reset()
+
+    @property
+    def token_budget(self) -> int:
+        """Tokens available for the prompt once the completion is reserved"""
+        if self._token_budget is not None:
+            return self._token_budget
+        return max(self.context_length - self.max_completion_tokens, 256)
+
+    def reset(self):
+        """Forget the memory built from dropped turns (e.g. after a chat reset)"""
+        self._summarized_upto = 0
+        self._summary_lines: List[str] = []
+
+    @staticmethod
+    def _summary_line(message: Dict[str, Any]) -> str:
+        text = re.sub(r"\s+", " ", str(message.get("content", ""))).strip()
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS - 1] + "…"
+        return f"- {message.get('role', 'user')}: {text}"
+
+    def _memory_message(self,
+                        dropped: List[Dict[str, Any]],
+                        estimator: TokenEstimator) -> Optional[Dict[str, str]]:
+        if not dropped:
+            return None
+        if self.summarizer is not None:
+            content = self.summarizer(dropped)
+        else:
+            # Extend the summary with turns dropped since the last call only
+            if len(dropped) < self._summarized_upto:
+                self.reset()
+            self._summary_lines.extend(self._summary_line(m) for m in dropped[self._summarized_upto:])
+            self._summarized_upto = len(dropped)
+            lines: List[str] = []
+            used = estimator.count(MEMORY_HEADER)
+            for line in reversed(self._summary_lines):
+                cost = estimator.count(line) + 1
+                if used + cost > self.summary_tokens:
+                    break
+                lines.append(line)
+                used += cost
+            content = "\n".join([MEMORY_HEADER] + lines[::-1])
+        return {"role": "system", "content": content}
+
+    def build(self,
+              messages: List[Dict[str, Any]],
+              token_counts: Optional[List[int]] = None,
+              estimator: TokenEstimator = DEFAULT_ESTIMATOR) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """Return (prompt messages, report) for this history
+
+        ``token_counts`` are per-message estimates if the caller already has
+        them. The report has ``history_tokens``, ``prompt_tokens``,
+        ``saved_tokens``, ``dropped_messages`` and ``token_budget``.
+        """
+        counts = token_counts if token_counts is not None else [estimator.count_message(m) for m in messages]
+        history_tokens = sum(counts)
+        report = {
+            "history_tokens": history_tokens,
+            "prompt_tokens": history_tokens,
+            "saved_tokens": 0,
+            "dropped_messages": 0,
+            "token_budget": self.token_budget
+        }
+        if history_tokens <= self.token_budget or len(messages) <= 2:
+            return messages, report
+
+        pinned = 1 if messages[0].get("role") == "system" else 0
+        reserved = sum(counts[:pinned]) + (self.summary_tokens if self.summarize else 0)
+        available = self.token_budget - reserved
+
+        # Walk back from the newest message; the latest one is always kept
+        start = len(messages) - 1
+        used = counts[start]
+        while start - 1 >= pinned and used + counts[start - 1] <= available:
+            start -= 1
+            used += counts[start]
+        # Don't open the window on an orphaned assistant reply
+        while start < len(messages) - 1 and messages[start].get("role") != "user":
+            start += 1
+
+        dropped = messages[pinned:start]
+        prompt = list(messages[:pinned])
+        memory = self._memory_message(dropped, estimator) if self.summarize else None
+        if memory is not None:
+            prompt.append(memory)
+        prompt.extend(messages[start:])
+
+        prompt_tokens = sum(counts[:pinned]) + sum(counts[start:])
+        if memory is not None:
+            prompt_tokens += estimator.count_message(memory)
+        report.update({
+            "prompt_tokens": prompt_tokens,
+            "saved_tokens": max(history_tokens - prompt_tokens, 0),
+            "dropped_messages": len(dropped)
+        })
+        return prompt, report
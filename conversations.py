@@ -0,0 +1,141 @@
+"""Durable, append-only store of dashboard conversation turns.
+
+Each turn is written once, as a JSON snapshot taken when it finished, and is
+never updated afterwards. Turns are indexed by session, agent and time and
+read back a page at a time, so a long session costs disk rather than memory.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sqlite_connections import ThreadLocalConnections
+
+DEFAULT_CONVERSATIONS_PATH = ".conversations.sqlite3"
+DEFAULT_PAGE_SIZE = 20
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+class ConversationStore:
+    """Conversation turns in SQLite (WAL mode), shared safely across threads and processes
+
+    A turn is a dict with a ``mode`` ("single" or "collective") and, for
+    single-agent turns, the ``agent`` it was sent to. Reads return fresh
+    copies with the turn's ``id`` and ``created_at`` added.
+    """
+
+    def __init__(self, path: str = DEFAULT_CONVERSATIONS_PATH):
+        self.path = path
+        self._connections = ThreadLocalConnections(path)
+        conn = self._connection()
+        conn.execute("""CREATE TABLE IF NOT EXISTS turns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            agent TEXT,
+            created_at REAL NOT NULL,
+            data TEXT NOT NULL
+        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS turns_session_agent ON turns (session_id, agent, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS turns_session_created_at ON turns (session_id, created_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def append(self, session_id: str, turn: Dict[str, Any]) -> int:
+        """Store a snapshot of ``turn``; returns its id"""
+        cursor = self._connection().execute(
+            "INSERT INTO turns (session_id, mode, agent, created_at, data) VALUES (?, ?, ?, ?, ?)",
+            (session_id, turn["mode"], turn.get("agent"), time.time(), json.dumps(turn, default=str))
+        )
+        return cursor.lastrowid
+
+    @staticmethod
+    def _filters(session_id: str,
+                 agent: Optional[str],
+                 since: Optional[float],
+                 until: Optional[float],
+                 before: Optional[int] = None) -> tuple:
+        clauses = ["session_id = ?"]
+        params: List[Any] = [session_id]
+        if before is not None:
+            clauses.append("id < ?")
+            params.append(before)
+        if agent is not None:
+            clauses.append("agent = ?")
+            params.append(agent)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        return " AND ".join(clauses), params
+
+    @staticmethod
+    def _turn(row: tuple) -> Dict[str, Any]:
+        turn_id, created_at, data = row
+        return {**json.loads(data), "id": turn_id, "created_at": created_at}
+
+    def page(self,
+             session_id: str,
+             limit: int = DEFAULT_PAGE_SIZE,
+             before: Optional[int] = None,
+             agent: Optional[str] = None,
+             since: Optional[float] = None,
+             until: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Up to ``limit`` turns of a session, oldest first
+
+        Returns the newest matching turns with an id below ``before``; pass the
+        first id of a page as ``before`` to get the page preceding it.
+        """
+        where, params = self._filters(session_id, agent, since, until, before)
+        rows = self._connection().execute(
+            f"SELECT id, created_at, data FROM turns WHERE {where} ORDER BY id DESC LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+        return [self._turn(row) for row in reversed(rows)]
+
+    def get(self, turn_id: int) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT id, created_at, data FROM turns WHERE id = ?", (turn_id,)
+        ).fetchone()
+        return self._turn(row) if row is not None else None
+
+    def count(self,
+              session_id: str,
+              agent: Optional[str] = None,
+              since: Optional[float] = None,
+              until: Optional[float] = None,
+              before: Optional[int] = None) -> int:
+        where, params = self._filters(session_id, agent, since, until, before)
+        return self._connection().execute(f"SELECT COUNT(*) FROM turns WHERE {where}", params).fetchone()[0]
+
+    def sessions(self, limit: int = DEFAULT_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """The most recently active sessions with their turn counts, newest first"""
+        rows = self._connection().execute(
+            "SELECT session_id, COUNT(*), MIN(created_at), MAX(created_at) FROM turns "
+            "GROUP BY session_id ORDER BY MAX(created_at) DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [
+            {"session_id": session_id, "turns": turns, "started_at": started_at, "last_at": last_at}
+            for session_id, turns, started_at, last_at in rows
+        ]
+
+_conversation_stores: Dict[str, ConversationStore] = {}
+_conversation_stores_lock = threading.Lock()
+
+def get_conversation_store(path: Optional[str] = None) -> ConversationStore:
+    """Return the process-wide ConversationStore for this file (default: CONVERSATION_STORE_PATH)"""
+    path = os.path.abspath(path or os.getenv("CONVERSATION_STORE_PATH", DEFAULT_CONVERSATIONS_PATH))
+    with _conversation_stores_lock:
+        store = _conversation_stores.get(path)
+        if store is None:
+            store = ConversationStore(path)
+            _conversation_stores[path] = store
+        return store
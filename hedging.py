@@ -0,0 +1,230 @@
+"""Hedged completions and model fallback for tail latency.
+
+A HedgePolicy is attached to an agent role. When a call to that role's model
+runs longer than the model's observed p95, a second request is fired, either
+to the same model or to the policy's fallback model. Whichever answers first
+wins; the other is cancelled (async) or abandoned (sync, where a blocking
+request can't be interrupted). A call that fails fails over to the fallback.
+
+Observed latencies are kept per model in a process-wide LatencyTracker, so
+every AgentGroup learns from the same traffic.
+"""
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from histogram import LatencyHistogram
+
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_HEDGE_POLICIES_PATH = ".hedge_policies.json"
+# Threads for sync hedged calls, shared by every AgentGroup in the process
+HEDGE_POOL_SIZE = 64
+
+class LatencyTracker:
+    """Per-model latency histograms for choosing hedge delays"""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(model)
+            if histogram is None:
+                histogram = self._histograms[model] = LatencyHistogram()
+            histogram.add(seconds)
+
+    def percentile(self, model: str, q: float, min_samples: int = DEFAULT_MIN_SAMPLES) -> Optional[float]:
+        """Latency at percentile ``q``, or None with fewer than ``min_samples`` samples"""
+        with self._lock:
+            histogram = self._histograms.get(model)
+            if histogram is None or histogram.total < min_samples:
+                return None
+            return histogram.percentile(q)
+
+_tracker = LatencyTracker()
+
+def get_latency_tracker() -> LatencyTracker:
+    return _tracker
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """The pool sync hedged calls run on; threads start on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+        return _executor
+
+class HedgePolicy:
+    """When and where to hedge calls for one agent role
+
+    ``fallback_model`` receives the hedge and failed-over calls; without one
+    the hedge is a duplicate request to the same model. Until a model has
+    ``min_samples`` observed latencies, ``initial_delay`` is used (None: don't
+    hedge yet). ``hedge=False`` keeps only the failover on errors.
+    """
+
+    def __init__(self,
+                 fallback_model: Optional[str] = None,
+                 percentile: float = 95,
+                 min_samples: int = DEFAULT_MIN_SAMPLES,
+                 initial_delay: Optional[float] = None,
+                 min_delay: float = 0.0,
+                 hedge: bool = True,
+                 failover: bool = True):
+        self.fallback_model = fallback_model
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.hedge = hedge
+        self.failover = failover
+
+    def hedge_delay(self, model: str, tracker: LatencyTracker) -> Optional[float]:
+        """Seconds to wait before hedging a call to ``model``, or None to not hedge"""
+        if not self.hedge:
+            return None
+        delay = tracker.percentile(model, self.percentile, self.min_samples)
+        if delay is None:
+            delay = self.initial_delay
+        return None if delay is None else max(self.min_delay, delay)
+
+def load_hedge_policies(path: str = DEFAULT_HEDGE_POLICIES_PATH) -> Dict[str, HedgePolicy]:
+    """Per-role policies from a JSON object of HedgePolicy options keyed by role
+
+    A missing file means no hedging, e.g.
+    {"coder": {"fallback_model": "some/other-model:free", "percentile": 95}}
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return {role: HedgePolicy(**options) for role, options in json.load(f).items()}
+
+class HedgeStats:
+    """Per-role counters: calls, hedges fired, hedge wins and failovers"""
+
+    def __init__(self):
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, role: str, outcome: Dict[str, Any]):
+        with self._lock:
+            counts = self.counts.setdefault(role, {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0})
+            counts["calls"] += 1
+            counts["hedged"] += int(outcome.get("hedged", False))
+            counts["hedge_wins"] += int(outcome.get("hedge_won", False))
+            counts["failovers"] += int(outcome.get("failover", False))
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Counts per role plus hedge rate (hedged/calls) and win rate (wins/hedged)"""
+        with self._lock:
+            return {
+                role: {
+                    **counts,
+                    "hedge_rate": counts["hedged"] / counts["calls"] if counts["calls"] else 0.0,
+                    "hedge_win_rate": counts["hedge_wins"] / counts["hedged"] if counts["hedged"] else 0.0
+                }
+                for role, counts in self.counts.items()
+            }
+
+def hedged_call(primary: Callable[[], Dict[str, Any]],
+                backup: Callable[[], Dict[str, Any]],
+                delay: Optional[float],
+                failover: bool,
+                executor: Optional[ThreadPoolExecutor] = None) -> Dict[str, Any]:
+    """Run ``primary``, starting ``backup`` after ``delay`` seconds or on failure
+
+    ``delay`` is measured from when ``primary`` starts running on the pool.
+    Returns the first successful result (or the last failure) with ``hedged``,
+    ``hedge_won`` and ``failover`` flags. The losing call is left to finish on
+    its own; its result is discarded.
+    """
+    if delay is None:
+        result = primary()
+        if result["success"] or not failover:
+            return {**result, "hedged": False, "hedge_won": False, "failover": False}
+        return {**backup(), "hedged": False, "hedge_won": False, "failover": True}
+
+    executor = executor or get_hedge_executor()
+    started = threading.Event()
+
+    def run_primary() -> Dict[str, Any]:
+        started.set()
+        return primary()
+
+    first = executor.submit(run_primary)
+    # With the pool busy the primary can sit in its queue; the delay counts from
+    # when it starts, not from submission, or queueing alone would trigger hedges
+    started.wait()
+    done, _ = wait([first], timeout=delay)
+    if done:
+        result = first.result()
+        if result["success"] or not failover:
+            return {**result, "hedged": False, "hedge_won": False, "failover": False}
+        return {**backup(), "hedged": False, "hedge_won": False, "failover": True}
+
+    second = executor.submit(backup)
+    pending = {first, second}
+    result: Dict[str, Any] = {}
+    winner: Optional[Future] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result = future.result()
+            winner = future
+            if result["success"]:
+                pending = set()
+                break
+    for future in (first, second):
+        future.cancel()
+    return {**result, "hedged": True, "hedge_won": winner is second, "failover": False}
+
+async def ahedged_call(primary: Callable[[], Awaitable[Dict[str, Any]]],
+                       backup: Callable[[], Awaitable[Dict[str, Any]]],
+                       delay: Optional[float],
+                       failover: bool) -> Dict[str, Any]:
+    """Async counterpart of hedged_call; the losing request is cancelled
+
+    So is every request it started if the caller is cancelled.
+    """
+    first = asyncio.ensure_future(primary())
+    tasks = [first]
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait([first], timeout=delay)
+        else:
+            await asyncio.wait([first])
+            done = {first}
+        if done:
+            result = first.result()
+            if result["success"] or not failover:
+                return {**result, "hedged": False, "hedge_won": False, "failover": False}
+            second = asyncio.ensure_future(backup())
+            tasks.append(second)
+            return {**(await second), "hedged": False, "hedge_won": False, "failover": True}
+
+        second = asyncio.ensure_future(backup())
+        tasks.append(second)
+        pending = {first, second}
+        result: Dict[str, Any] = {}
+        winner = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                winner = task
+                if result["success"]:
+                    pending = set()
+                    break
+        return {**result, "hedged": True, "hedge_won": winner is second, "failover": False}
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Let the loser unwind, so its connection and scheduler slot are released before returning
+        await asyncio.gather(*tasks, return_exceptions=True)
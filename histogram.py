@@ -0,0 +1,43 @@
+"""Streaming latency histogram in plain Python.
+
+Log-spaced buckets give every percentile a bounded relative error with fixed
+memory. Kept free of numpy so that hedging (and so a headless ``import
+agents``) can track latencies without loading it.
+"""
+import math
+from typing import List, Optional
+
+# Log-spaced buckets from 1ms to 10 minutes, ~2.5% wide
+HISTOGRAM_MIN = 0.001
+HISTOGRAM_MAX = 600.0
+HISTOGRAM_BUCKETS = 540
+
+_LOG_STEP = math.log(HISTOGRAM_MAX / HISTOGRAM_MIN) / HISTOGRAM_BUCKETS
+
+def _midpoint(index: int) -> float:
+    """A bucket's geometric midpoint, which reports it"""
+    return HISTOGRAM_MIN * math.exp((index + 0.5) * _LOG_STEP)
+
+class LatencyHistogram:
+    """Streaming latency histogram with bounded relative error"""
+
+    def __init__(self):
+        self.counts: List[int] = [0] * HISTOGRAM_BUCKETS
+        self.total = 0
+
+    def add(self, seconds: float):
+        index = int(math.log(max(seconds, HISTOGRAM_MIN) / HISTOGRAM_MIN) / _LOG_STEP)
+        self.counts[min(index, HISTOGRAM_BUCKETS - 1)] += 1
+        self.total += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency in seconds at percentile ``q`` (0-100), or None if empty"""
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(self.total * q / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return _midpoint(index)
+        return _midpoint(HISTOGRAM_BUCKETS - 1)
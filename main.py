@@ -1,11 +1,17 @@
 import streamlit as st
 import json
-from config import DEFAULT_AGENT_ROLES, init_session_state
-from api import OpenRouterAPI
-from agents import Agent, CoordinatorAgent, AgentGroup
-from utils import format_conversation, create_metrics_charts, update_metrics
+from config import init_session_state
+from api import OpenRouterAPI, load_environment
+from agents import AgentGroup
+from catalog import get_model_catalog
+from conversations import get_conversation_store, new_session_id
+from hedging import load_hedge_policies
+from request_logging import configure_logging
+from roster import DEFAULT_SELECTIONS_PATH, build_agent_group, load_model_selections
+from tracing import InMemoryExporter, configure_tracing_from_env, get_tracer
+from utils import (create_metrics_charts, render_conversation_history, update_collective_metrics,
+                   update_metrics)
 import os
-from dotenv import load_dotenv
 
 # Page configuration
 st.set_page_config(
@@ -25,8 +31,12 @@ def handle_error(func):
             return None
     return wrapper
 
-# Load environment variables
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+# Load environment variables (only the first run of the process reads .env)
+load_environment()
+configure_logging()
+# The tracer is process-wide, so only build it on the first run
+if not get_tracer().enabled:
+    configure_tracing_from_env(in_memory=True)
 
 # Initialize session state
 if 'messages' not in st.session_state:
@@ -42,37 +52,33 @@ with st.sidebar:
         st.session_state.api_key = api_key
         api = OpenRouterAPI(api_key)
 
-        # Fetch available models
+        # Fetch available models from the shared catalog cache; only the very
+        # first load waits on the network, later refreshes run in the background
         @handle_error
         def fetch_models():
-            models_response = api.get_models()
-            if models_response["success"]:
-                available_models = {
-                    model["id"]: model["id"]
-                    for model in models_response["models"]
-                }
-                st.session_state.available_models = available_models
+            snapshot = get_model_catalog().get(api)
+            if snapshot is not None:
+                st.session_state.available_models = snapshot.available
+                st.session_state.model_catalog = snapshot
                 return True
             return False
 
         # Load model selections
         @handle_error
-        def load_model_selections():
-            with open('.model_selections.json', 'r') as f:
-                saved_models = json.load(f)
-                st.session_state.selected_models = saved_models
+        def load_saved_selections():
+            st.session_state.selected_models = load_model_selections()
 
         # Save model selections
         @handle_error
         def save_model_selections():
-            with open('.model_selections.json', 'w') as f:
+            with open(DEFAULT_SELECTIONS_PATH, 'w') as f:
                 json.dump(st.session_state.selected_models, f)
 
         # Fetch available models
         if fetch_models():
             # Load saved model selections if they exist
             try:
-                load_model_selections()
+                load_saved_selections()
             except FileNotFoundError:
                 if 'selected_models' not in st.session_state:
                     st.session_state.selected_models = {
@@ -87,61 +93,51 @@ with st.sidebar:
 
         # Initialize AgentGroup if not exists
         if 'agent_group' not in st.session_state:
-            st.session_state.agent_group = AgentGroup(api)
+            st.session_state.agent_group = AgentGroup(api, hedge_policies=load_hedge_policies())
 
         if st.session_state.available_models:
+            model_catalog = st.session_state.model_catalog
+
             # Coordinator Agent Setup
             st.subheader("1. Coordinator")
-            default_coordinator_model = st.session_state.selected_models.get('coordinator')
-            default_index = 0
-            if default_coordinator_model in st.session_state.available_models:
-                default_index = list(st.session_state.available_models.keys()).index(default_coordinator_model)
+            default_index = model_catalog.index_of(st.session_state.selected_models.get('coordinator'))
 
             coordinator_model = st.selectbox(
                 "Select Model",
-                list(st.session_state.available_models.keys()),
+                model_catalog.ids,
                 key="coordinator_model",
                 index=default_index
             )
 
             # Human Assistant Setup
             st.subheader("2. Human Assistant")
-            default_model = st.session_state.selected_models.get('user_proxy')
-            default_index = 0
-            if default_model in st.session_state.available_models:
-                default_index = list(st.session_state.available_models.keys()).index(default_model)
+            default_index = model_catalog.index_of(st.session_state.selected_models.get('user_proxy'))
 
             human_model = st.selectbox(
                 "Select Model",
-                list(st.session_state.available_models.keys()),
+                model_catalog.ids,
                 key="human_model",
                 index=default_index
             )
 
             # Code Assistant Setup
             st.subheader("3. Code Assistant")
-            default_model = st.session_state.selected_models.get('coder')
-            default_index = 0
-            if default_model in st.session_state.available_models:
-                default_index = list(st.session_state.available_models.keys()).index(default_model)
+            default_index = model_catalog.index_of(st.session_state.selected_models.get('coder'))
 
             code_model = st.selectbox(
                 "Select Model",
-                list(st.session_state.available_models.keys()),
+                model_catalog.ids,
                 key="code_model",
                 index=default_index
             )
 
             # Critic Assistant Setup
             st.subheader("4. Critic Assistant")
-            default_model = st.session_state.selected_models.get('critic')
-            default_index = 0
-            if default_model in st.session_state.available_models:
-                default_index = list(st.session_state.available_models.keys()).index(default_model)
+            default_index = model_catalog.index_of(st.session_state.selected_models.get('critic'))
 
             critic_model = st.selectbox(
                 "Select Model",
-                list(st.session_state.available_models.keys()),
+                model_catalog.ids,
                 key="critic_model",
                 index=default_index
             )
@@ -149,54 +145,26 @@ with st.sidebar:
             # Setup button for all agents
             st.markdown("---")
             if st.button("🚀 Setup All Agents"):
-                # Setup Coordinator
-                coordinator = CoordinatorAgent(
-                    name="Coordinator",
-                    model=st.session_state.available_models[coordinator_model],
-                    system_message=DEFAULT_AGENT_ROLES["coordinator"]["system_message"]
-                )
-                st.session_state.agent_group.add_agent(coordinator)
-                st.session_state.coordinator = coordinator
-                st.session_state.selected_models['coordinator'] = coordinator_model
-
-                # Setup Human Assistant
-                role_config = DEFAULT_AGENT_ROLES["user_proxy"]
-                human_assistant = Agent(
-                    name=role_config["name"],
-                    role="user_proxy",
-                    model=st.session_state.available_models[human_model],
-                    system_message=role_config["system_message"]
-                )
-                st.session_state.agent_group.add_agent(human_assistant)
-                if role_config["name"] not in st.session_state.current_agents:
-                    st.session_state.current_agents.append(role_config["name"])
-                st.session_state.selected_models['user_proxy'] = human_model
-
-                # Setup Code Assistant
-                role_config = DEFAULT_AGENT_ROLES["coder"]
-                code_assistant = Agent(
-                    name=role_config["name"],
-                    role="coder",
-                    model=st.session_state.available_models[code_model],
-                    system_message=role_config["system_message"]
-                )
-                st.session_state.agent_group.add_agent(code_assistant)
-                if role_config["name"] not in st.session_state.current_agents:
-                    st.session_state.current_agents.append(role_config["name"])
-                st.session_state.selected_models['coder'] = code_model
-
-                # Setup Critic Assistant
-                role_config = DEFAULT_AGENT_ROLES["critic"]
-                critic_assistant = Agent(
-                    name=role_config["name"],
-                    role="critic",
-                    model=st.session_state.available_models[critic_model],
-                    system_message=role_config["system_message"]
+                selections = {
+                    'coordinator': coordinator_model,
+                    'user_proxy': human_model,
+                    'coder': code_model,
+                    'critic': critic_model
+                }
+                st.session_state.selected_models.update(selections)
+                # A fresh group from the shared roster; cached replies, hedging and its stats carry over
+                previous_group = st.session_state.agent_group
+                agent_group = build_agent_group(
+                    api,
+                    {role: st.session_state.available_models[model] for role, model in selections.items()},
+                    model_catalog,
+                    response_cache=previous_group.response_cache,
+                    hedge_policies=previous_group.hedge_policies,
+                    hedge_stats=previous_group.hedge_stats
                 )
-                st.session_state.agent_group.add_agent(critic_assistant)
-                if role_config["name"] not in st.session_state.current_agents:
-                    st.session_state.current_agents.append(role_config["name"])
-                st.session_state.selected_models['critic'] = critic_model
+                st.session_state.agent_group = agent_group
+                st.session_state.coordinator = agent_group.coordinator
+                st.session_state.current_agents = list(agent_group.get_agents())
 
                 # Save all selections
                 save_model_selections()
@@ -205,6 +173,327 @@ with st.sidebar:
         else:
             st.warning("No models available. Please check your API key.")
 
+# Seconds between refreshes of the metrics tab
+METRICS_REFRESH_SECONDS = 10
+
+@st.fragment
+def render_chat(agents):
+    """Chat controls, the running turn and the history
+
+    A fragment: sending a message or changing a chat widget reruns only this
+    part of the page, not the sidebar or the metrics tab.
+    """
+    # Chat mode selection and Reset Chat button in the same row
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        chat_mode = st.radio(
+            "Chat Mode",
+            ["Single Agent", "Collective (Coordinated)"],
+            horizontal=True
+        )
+    with col2:
+        if st.button("🔄 Reset Chat", help="Start a new chat while keeping agent configurations"):
+            # Start a new conversation; earlier turns stay in the store
+            st.session_state.conversation_session = new_session_id()
+
+            # Reset all agent and coordinator messages to their initial system messages;
+            # an agent still answering a cut-off collective turn is reset once it finishes
+            st.session_state.agent_group.reset_histories()
+
+            # Clear any active user inputs
+            if 'user_input' in st.session_state:
+                del st.session_state.user_input
+            # The rest of the chat below is drawn from the reset state, so no rerun is needed
+
+    # Display available agents
+    st.subheader("Available Agents")
+
+    # First display coordinator if exists
+    if st.session_state.coordinator:
+        st.write(f"• **{st.session_state.coordinator.name}** ({st.session_state.coordinator.model})")
+
+    # Then display other agents
+    for agent_name, agent in agents.items():
+        st.write(f"• **{agent_name}** ({agent.model})")
+
+    # Message input
+    user_input = st.text_area("Your message")
+    stream_responses = st.toggle("Stream responses", value=True)
+
+    if chat_mode == "Single Agent":
+        selected_agent = st.selectbox(
+            "Select agent to respond",
+            list(agents.keys())
+        )
+
+        if st.button("Send"):
+            if user_input:
+                # The group queues this behind any turn the agent is still finishing
+                if stream_responses:
+                    # Render the partial reply as tokens arrive
+                    live_placeholder = st.empty()
+                    partial = ""
+
+                    def show_delta(delta: str):
+                        nonlocal partial
+                        partial += delta
+                        live_placeholder.markdown(partial + "▌")
+
+                    response, _ = st.session_state.agent_group.run_agent_turn(
+                        selected_agent, user_input, show_delta
+                    )
+                    live_placeholder.empty()
+                else:
+                    response, _ = st.session_state.agent_group.run_agent_turn(selected_agent, user_input)
+
+                # Update metrics (failures count towards the error rate)
+                update_metrics(
+                    st.session_state.metrics,
+                    response,
+                    response.get("model", agents[selected_agent].model),
+                    agents[selected_agent].role
+                )
+
+                if response["success"]:
+                    saved_tokens = response.get("context", {}).get("saved_tokens", 0)
+                    if saved_tokens:
+                        st.caption(f"Context trimmed: {saved_tokens} prompt tokens saved this turn")
+
+                    if response.get("retries"):
+                        st.caption(
+                            f"Retried {response['retries']}x after rate limits or errors · "
+                            f"{response['throttled_time']:.1f}s throttled"
+                        )
+
+                    if response.get("ttft") is not None:
+                        st.caption(
+                            f"Time to first token: {response['ttft']:.2f}s · "
+                            f"Total: {response['time']:.2f}s"
+                        )
+
+                    # Save this turn
+                    get_conversation_store().append(st.session_state.conversation_session, {
+                        "mode": "single",
+                        "agent": selected_agent,
+                        "messages": [
+                            {"role": "user", "content": user_input},
+                            {"role": "assistant", "content": response["response"]}
+                        ]
+                    })
+                else:
+                    st.error(f"Error: {response['error']}")
+
+    else:  # Collective mode
+        if not st.session_state.coordinator:
+            st.warning("Please set up a coordinator agent first.")
+        else:
+            if st.button("Send to All"):
+                if user_input:
+                    # Create a main container for all progress indicators
+                    main_container = st.container()
+
+                    # Overall progress
+                    progress_placeholder = st.empty()
+                    progress_bar = st.progress(0)
+
+                    # Individual agent progress indicators
+                    agent_progress = {}
+                    for agent_name in st.session_state.agent_group.get_agents().keys():
+                        agent_progress[agent_name] = st.empty()
+
+                    # Create placeholders for responses
+                    coordinator_analysis_placeholder = st.empty()
+                    agent_responses_container = st.container()
+                    partial_agent_text = {}
+                    final_placeholder = st.empty()
+                    partial_final_text = ""
+
+                    with main_container:
+                        try:
+                            # Initialize metrics
+                            total_tokens = 0
+
+                            # Get collective response generator
+                            response_generator = st.session_state.agent_group.get_collective_response(
+                                user_input, stream=stream_responses
+                            )
+
+                            for response in response_generator:
+                                if not response["success"]:
+                                    st.error(f"Error: {response.get('error', 'Unknown error')}")
+                                    progress_bar.empty()
+                                    break
+
+                                if response["phase"] == "coordinator":
+                                    # Step 1: Coordinator Analysis (0-40%)
+                                    progress_placeholder.write("🔄 Analyzing input...")
+                                    progress_bar.progress(30)
+
+                                    with coordinator_analysis_placeholder:
+                                        with st.expander("🔍 Detailed Analysis", expanded=False):
+                                            st.markdown(response["analysis"])
+                                    progress_bar.progress(40)
+
+                                    # Only the selected agents will respond
+                                    selected_agents = response["selected_agents"]
+                                    for agent_name in response["skipped_agents"]:
+                                        if agent_name in agent_progress:
+                                            agent_progress[agent_name].caption(
+                                                f"⏭️ {agent_name} skipped by the coordinator"
+                                            )
+
+                                elif response["phase"] == "agent_delta":
+                                    # Show the tail of each agent's reply as it streams in
+                                    current_agent = response["current_agent"]
+                                    partial_agent_text[current_agent] = (
+                                        partial_agent_text.get(current_agent, "") + response["delta"]
+                                    )
+                                    if current_agent in agent_progress:
+                                        agent_progress[current_agent].caption(
+                                            f"✍️ {current_agent}: …{partial_agent_text[current_agent][-200:]}"
+                                        )
+
+                                elif response["phase"] == "final_delta":
+                                    progress_placeholder.write("✨ Synthesizing final answer...")
+                                    partial_final_text += response["delta"]
+                                    final_placeholder.markdown(partial_final_text + "▌")
+
+                                elif response["phase"] == "agent_response":
+                                    # Update progress based on completed responses
+                                    total_agents = len(selected_agents)
+                                    completed_agents = len(response["responses"])
+                                    progress = 40 + (completed_agents / total_agents * 50)
+
+                                    # Update progress message
+                                    progress_placeholder.write(f"🤖 Getting agent responses... ({completed_agents}/{total_agents})")
+
+                                    # Update progress bar
+                                    progress_bar.progress(int(progress))
+
+                                    # Mark the agent that just finished
+                                    current_agent = response["current_agent"]
+                                    if current_agent in agent_progress:
+                                        agent_progress[current_agent].write(
+                                            f"✅ {current_agent} responded in {response['agent_response']['time']:.2f}s"
+                                        )
+
+                                elif response["phase"] == "complete":
+                                    # Final Processing (90-100%)
+                                    progress_placeholder.write("✨ Finalizing...")
+                                    progress_bar.progress(95)
+
+                                    # Agents cut off by a quorum or deadline are still answering
+                                    for agent_name in response.get("straggler_agents", []):
+                                        if agent_name in agent_progress:
+                                            agent_progress[agent_name].caption(
+                                                f"⏱️ {agent_name} missed the {response['cutoff']} cut"
+                                            )
+
+                                    # Show coordinator's final evaluation first
+                                    final_placeholder.empty()
+                                    st.success("✅ Process completed!")
+                                    st.write("**Coordinator's Final Evaluation:**")
+                                    st.write(response["final_evaluation"])
+
+                                    # Show detailed responses in collapsed expander
+                                    with st.expander("🔍 Detailed Agent Responses", expanded=False):
+                                        for resp in response["responses"]:
+                                            st.write(f"\n**{resp['agent']}** response:")
+                                            st.write(resp["response"])
+
+                                    # Show metrics in collapsed expander
+                                    with st.expander("📊 Performance Metrics", expanded=False):
+                                        st.write(f"Total tokens: {response['tokens']}")
+                                        st.write(f"Total time: {response['time']:.2f} seconds")
+                                        if response.get("prompt_tokens_saved"):
+                                            st.write(f"Prompt tokens saved by context trimming: {response['prompt_tokens_saved']}")
+                                        if response.get("final_ttft") is not None:
+                                            st.write(f"Final synthesis time to first token: {response['final_ttft']:.2f} seconds")
+                                        for agent_name, ttft in response.get("agent_ttft", {}).items():
+                                            st.write(
+                                                f"{agent_name}: first token {ttft:.2f}s, "
+                                                f"total {response['agent_times'][agent_name]:.2f}s"
+                                            )
+                                        if response.get("final_time") is not None:
+                                            st.write(f"Final synthesis time: {response['final_time']:.2f} seconds")
+                                        trace_exporter = next(
+                                            (e for e in get_tracer().exporters if isinstance(e, InMemoryExporter)), None
+                                        )
+                                        if trace_exporter and response.get("trace_id"):
+                                            st.write("**Span breakdown:**")
+                                            st.dataframe([
+                                                {
+                                                    "span": span["name"],
+                                                    "agent": span["attributes"].get("agent", ""),
+                                                    "ms": span["duration_ms"],
+                                                    "ttfb_ms": span["attributes"].get("ttfb_ms"),
+                                                    "status": span["status"]
+                                                }
+                                                for span in trace_exporter.trace(response["trace_id"])
+                                            ])
+
+                                    progress_bar.progress(100)
+
+                                    # Update metrics
+                                    update_collective_metrics(
+                                        st.session_state.metrics,
+                                        response,
+                                        st.session_state.agent_group.get_agents(),
+                                        st.session_state.agent_group.coordinator
+                                    )
+
+                                    # Save this turn
+                                    get_conversation_store().append(st.session_state.conversation_session, {
+                                        "mode": "collective",
+                                        "user_input": user_input,
+                                        "coordinator_analysis": response["coordinator_analysis"],
+                                        "responses": response["responses"]
+                                    })
+
+                        except Exception as e:
+                            st.error(f"An error occurred: {str(e)}")
+                            progress_bar.empty()
+
+    # Display conversation history
+    st.subheader("Conversation History")
+    render_conversation_history(get_conversation_store(), st.session_state.conversation_session)
+
+@st.fragment(run_every=METRICS_REFRESH_SECONDS)
+def render_metrics():
+    """The metrics tab, refreshed on its own since chat turns no longer rerun the page"""
+    st.subheader("Performance Metrics")
+
+    totals = st.session_state.metrics.total.summary()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Tokens Used", totals['tokens'])
+    with col2:
+        if totals['p50'] is not None:
+            st.metric("p50 Response Time (s)", f"{totals['p50']:.2f}")
+    with col3:
+        if totals['p95'] is not None:
+            st.metric("p95 Response Time (s)", f"{totals['p95']:.2f}")
+    with col4:
+        st.metric("Error Rate", f"{totals['error_rate']:.1%}")
+
+    if 'agent_group' in st.session_state:
+        cache_stats = st.session_state.agent_group.response_cache.stats()
+        st.caption(
+            f"Response cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+            f"{cache_stats['evictions']} evictions · {cache_stats['entries']} entries "
+            f"({cache_stats['bytes'] / 1024:.1f} KiB)"
+        )
+        hedge_report = st.session_state.agent_group.hedge_report()
+        if hedge_report:
+            st.caption(" · ".join(
+                f"{role}: {stats['hedged']}/{stats['calls']} hedged ({stats['hedge_rate']:.0%}), "
+                f"{stats['hedge_wins']} hedge wins, {stats['failovers']} failovers"
+                for role, stats in hedge_report.items()
+            ))
+
+    # Display charts
+    create_metrics_charts(st.session_state.metrics)
+
 # Main content
 st.title("Multi-Agent Dashboard")
 
@@ -222,220 +511,9 @@ else:
             agents = st.session_state.agent_group.get_agents()
 
             if agents:
-                # Chat mode selection and Reset Chat button in the same row
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    chat_mode = st.radio(
-                        "Chat Mode",
-                        ["Single Agent", "Collective (Coordinated)"],
-                        horizontal=True
-                    )
-                with col2:
-                    if st.button("🔄 Reset Chat", help="Start a new chat while keeping agent configurations"):
-                        # Clear conversation history
-                        st.session_state.conversations = []
-
-                        # Reset all agent messages to their initial system messages
-                        for agent_name, agent in st.session_state.agent_group.get_agents().items():
-                            agent.messages = [{"role": "system", "content": agent.system_message}]
-
-                        # Reset coordinator messages if exists
-                        if st.session_state.coordinator:
-                            st.session_state.coordinator.messages = [
-                                {"role": "system", "content": st.session_state.coordinator.system_message}
-                            ]
-
-                        # Clear any active user inputs
-                        if 'user_input' in st.session_state:
-                            del st.session_state.user_input
-
-                        # Force the UI to refresh
-                        st.rerun()
-
-                # Display available agents
-                st.subheader("Available Agents")
-
-                # First display coordinator if exists
-                if st.session_state.coordinator:
-                    st.write(f"• **{st.session_state.coordinator.name}** ({st.session_state.coordinator.model})")
-
-                # Then display other agents
-                for agent_name, agent in agents.items():
-                    st.write(f"• **{agent_name}** ({agent.model})")
-
-                # Message input
-                user_input = st.text_area("Your message")
-
-                if chat_mode == "Single Agent":
-                    selected_agent = st.selectbox(
-                        "Select agent to respond",
-                        list(agents.keys())
-                    )
-
-                    if st.button("Send"):
-                        if user_input:
-                            # Add user message
-                            agents[selected_agent].add_message("user", user_input)
-
-                            # Get agent response
-                            response = st.session_state.agent_group.get_response(
-                                selected_agent
-                            )
-
-                            if response["success"]:
-                                # Add agent response
-                                agents[selected_agent].add_message(
-                                    "assistant",
-                                    response["response"]
-                                )
-
-                                # Update metrics
-                                update_metrics(
-                                    st.session_state.metrics,
-                                    response,
-                                    agents[selected_agent].model
-                                )
-
-                                # Save conversation
-                                st.session_state.conversations.append({
-                                    "mode": "single",
-                                    "agent": selected_agent,
-                                    "messages": agents[selected_agent].get_messages()
-                                })
-                            else:
-                                st.error(f"Error: {response['error']}")
-
-                else:  # Collective mode
-                    if not st.session_state.coordinator:
-                        st.warning("Please set up a coordinator agent first.")
-                    else:
-                        if st.button("Send to All"):
-                            if user_input:
-                                # Create a main container for all progress indicators
-                                main_container = st.container()
-
-                                # Overall progress
-                                progress_placeholder = st.empty()
-                                progress_bar = st.progress(0)
-
-                                # Individual agent progress indicators
-                                agent_progress = {}
-                                for agent_name in st.session_state.agent_group.get_agents().keys():
-                                    agent_progress[agent_name] = st.empty()
-
-                                # Create placeholders for responses
-                                coordinator_analysis_placeholder = st.empty()
-                                agent_responses_container = st.container()
-
-                                with main_container:
-                                    try:
-                                        # Initialize metrics
-                                        total_tokens = 0
-
-                                        # Get collective response generator
-                                        response_generator = st.session_state.agent_group.get_collective_response(user_input)
-
-                                        for response in response_generator:
-                                            if not response["success"]:
-                                                st.error(f"Error: {response.get('error', 'Unknown error')}")
-                                                progress_bar.empty()
-                                                break
-
-                                            if response["phase"] == "coordinator":
-                                                # Step 1: Coordinator Analysis (0-40%)
-                                                progress_placeholder.write("🔄 Analyzing input...")
-                                                progress_bar.progress(30)
-
-                                                with coordinator_analysis_placeholder:
-                                                    with st.expander("🔍 Detailed Analysis", expanded=False):
-                                                        st.markdown(response["analysis"])
-                                                progress_bar.progress(40)
-
-                                            elif response["phase"] == "agent_response":
-                                                # Update progress based on completed responses
-                                                total_agents = len(st.session_state.agent_group.get_agents())
-                                                completed_agents = len(response["responses"])
-                                                progress = 40 + (completed_agents / total_agents * 50)
-
-                                                # Update progress message
-                                                progress_placeholder.write(f"🤖 Getting agent responses... ({completed_agents}/{total_agents})")
-
-                                                # Update progress bar
-                                                progress_bar.progress(int(progress))
-
-                                            elif response["phase"] == "complete":
-                                                # Final Processing (90-100%)
-                                                progress_placeholder.write("✨ Finalizing...")
-                                                progress_bar.progress(95)
-
-                                                # Show coordinator's final evaluation first
-                                                st.success("✅ Process completed!")
-                                                st.write("**Coordinator's Final Evaluation:**")
-                                                st.write(response["final_evaluation"])
-
-                                                # Show detailed responses in collapsed expander
-                                                with st.expander("🔍 Detailed Agent Responses", expanded=False):
-                                                    for resp in response["responses"]:
-                                                        st.write(f"\n**{resp['agent']}** response:")
-                                                        st.write(resp["response"])
-
-                                                # Show metrics in collapsed expander
-                                                with st.expander("📊 Performance Metrics", expanded=False):
-                                                    st.write(f"Total tokens: {response['tokens']}")
-                                                    st.write(f"Total time: {response['time']:.2f} seconds")
-
-                                                progress_bar.progress(100)
-
-                                                # Update metrics
-                                                update_metrics(
-                                                    st.session_state.metrics,
-                                                    {
-                                                        "success": True,
-                                                        "tokens": response["tokens"],
-                                                        "time": response["time"]
-                                                    },
-                                                    "collective"
-                                                )
-
-                                                # Save conversation
-                                                st.session_state.conversations.append({
-                                                    "mode": "collective",
-                                                    "user_input": user_input,
-                                                    "coordinator_analysis": response["coordinator_analysis"],
-                                                    "responses": response["responses"]
-                                                })
-
-                                    except Exception as e:
-                                        st.error(f"An error occurred: {str(e)}")
-                                        progress_bar.empty()
-
-                # Display conversation history
-                st.subheader("Conversation History")
-                for conv in st.session_state.conversations:
-                    if conv["mode"] == "single":
-                        with st.expander(f"Single Agent Conversation with {conv['agent']}"):
-                            st.markdown(format_conversation(conv['messages']))
-                    else:
-                        with st.expander("Collective Conversation"):
-                            st.write("**User**:", conv["user_input"])
-                            st.write("\n**Coordinator Analysis**:", conv["coordinator_analysis"])
-                            for resp in conv["responses"]:
-                                st.write(f"\n**{resp['agent']}**:", resp["response"])
+                render_chat(agents)
             else:
                 st.info("Add agents using the sidebar to start chatting!")
 
     with tab2:
-        # Metrics display
-        st.subheader("Performance Metrics")
-
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric("Total Tokens Used", st.session_state.metrics['total_tokens'])
-        with col2:
-            if st.session_state.metrics['response_times']:
-                avg_time = sum(st.session_state.metrics['response_times']) / \
-                          len(st.session_state.metrics['response_times'])
-                st.metric("Average Response Time (s)", f"{avg_time:.2f}")
-
-        # Display charts
-        create_metrics_charts(st.session_state.metrics)
+        render_metrics()
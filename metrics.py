@@ -0,0 +1,158 @@
+"""Compact, incrementally aggregated request metrics.
+
+Each series (one per model and one per agent role) keeps fixed-size state:
+a log-bucketed latency histogram (histogram.py) for p50/p95/p99 over all
+requests, and a numpy ring buffer of the most recent requests for throughput
+and charts.
+Memory per series is constant however long the session runs.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from histogram import LatencyHistogram
+
+DEFAULT_WINDOW = 1024
+
+class SeriesStats:
+    """Counters, latency histogram and a ring buffer of recent requests"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.histogram = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.tokens = 0
+        self.busy_time = 0.0
+        # Ring buffer of recent requests: timestamp, latency, tokens, success
+        self._timestamps = np.zeros(window, dtype=np.float64)
+        self._latencies = np.zeros(window, dtype=np.float32)
+        self._tokens = np.zeros(window, dtype=np.int32)
+        self._ok = np.zeros(window, dtype=np.bool_)
+        self._next = 0
+
+    def record(self, latency: float, tokens: int, success: bool, timestamp: float):
+        slot = self._next % self.window
+        self._timestamps[slot] = timestamp
+        self._latencies[slot] = latency
+        self._tokens[slot] = tokens
+        self._ok[slot] = success
+        self._next += 1
+
+        self.requests += 1
+        if success:
+            self.histogram.add(latency)
+            self.tokens += tokens
+            self.busy_time += latency
+        else:
+            self.errors += 1
+
+    def _recent(self, values: np.ndarray) -> np.ndarray:
+        """Ring buffer contents, oldest first"""
+        if self._next <= self.window:
+            return values[:self._next]
+        start = self._next % self.window
+        return np.concatenate((values[start:], values[:start]))
+
+    def throughput(self) -> float:
+        """Requests per minute over the recent window
+
+        Measured from the start of the oldest request in the window to the
+        end of the newest.
+        """
+        timestamps = self._recent(self._timestamps)
+        if not len(timestamps):
+            return 0.0
+        span = timestamps[-1] - (timestamps[0] - self._recent(self._latencies)[0])
+        return float(len(timestamps) / span * 60) if span > 0 else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests else 0.0,
+            "tokens": self.tokens,
+            "tokens_per_second": self.tokens / self.busy_time if self.busy_time else 0.0,
+            "requests_per_minute": self.throughput(),
+            "p50": self.histogram.percentile(50),
+            "p95": self.histogram.percentile(95),
+            "p99": self.histogram.percentile(99)
+        }
+
+    def series(self, points: int = 200) -> Dict[str, List[float]]:
+        """Recent successful latencies, averaged down to at most ``points`` points"""
+        ok = self._recent(self._ok)
+        timestamps = self._recent(self._timestamps)[ok]
+        latencies = self._recent(self._latencies)[ok]
+        if len(latencies) > points:
+            chunks = np.array_split(np.arange(len(latencies)), points)
+            timestamps = np.array([timestamps[chunk[-1]] for chunk in chunks])
+            latencies = np.array([latencies[chunk].mean() for chunk in chunks])
+        return {"timestamp": timestamps.tolist(), "latency": latencies.tolist()}
+
+class MetricsStore:
+    """Per-model and per-role request metrics for a session"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.by_model: Dict[str, SeriesStats] = {}
+        self.by_role: Dict[str, SeriesStats] = {}
+        self.total = SeriesStats(window)
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.total.tokens
+
+    def _series(self, group: Dict[str, SeriesStats], key: str) -> SeriesStats:
+        if key not in group:
+            group[key] = SeriesStats(self.window)
+        return group[key]
+
+    def record(self,
+               model: str,
+               role: Optional[str],
+               latency: float,
+               tokens: int = 0,
+               success: bool = True,
+               timestamp: Optional[float] = None):
+        """Record one request against its model and, if given, its agent role"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self.total.record(latency, tokens, success, timestamp)
+            self._series(self.by_model, model).record(latency, tokens, success, timestamp)
+            if role:
+                self._series(self.by_role, role).record(latency, tokens, success, timestamp)
+
+    def record_collective(self, response: Dict[str, Any], agents: Dict[str, Any], coordinator: Any):
+        """Record each call of a completed collective turn under its own model and role
+
+        An agent's call is charged to the model that answered it, which with
+        hedging or failover may be the fallback rather than the agent's model.
+        """
+        self.record(coordinator.model, coordinator.role, response.get("coordinator_time", 0.0),
+                    response.get("coordinator_tokens", 0))
+        for agent_response in response.get("responses", []):
+            agent = agents[agent_response["agent"]]
+            self.record(agent_response.get("model", agent.model), agent.role, agent_response["time"],
+                        response.get("agent_tokens", {}).get(agent_response["agent"], 0))
+        error_models = response.get("agent_error_models", {})
+        for agent_name in response.get("agent_errors", {}):
+            agent = agents[agent_name]
+            self.record(error_models.get(agent_name, agent.model), agent.role, 0.0, success=False)
+        if response.get("final_time") is not None:
+            self.record(coordinator.model, coordinator.role, response["final_time"], response.get("final_tokens", 0))
+
+    def summary(self, by: str = "model") -> List[Dict[str, Any]]:
+        """One summary row per model (``by="model"``) or per role (``by="role"``)"""
+        group = self.by_model if by == "model" else self.by_role
+        with self._lock:
+            return [{by: key, **stats.summary()} for key, stats in sorted(group.items())]
+
+    def series(self, by: str = "model", points: int = 200) -> Dict[str, Dict[str, List[float]]]:
+        """Downsampled recent latency series per model or role"""
+        group = self.by_model if by == "model" else self.by_role
+        with self._lock:
+            return {key: stats.series(points) for key, stats in group.items()}
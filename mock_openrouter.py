@@ -0,0 +1,319 @@
+"""Local stand-in for the OpenRouter API, used by the benchmarks.
+
+Run standalone with ``python mock_openrouter.py --port 8765`` and point the
+client at it with ``OPENROUTER_BASE_URL=http://127.0.0.1:8765/api/v1``.
+
+Latency can be fixed or drawn from a distribution, replies padded to a given
+number of completion tokens, and a share of requests failed with 500s or
+throttled with 429s (carrying Retry-After), to exercise the client's error
+handling under load.
+
+Like Anthropic's prompt caching, a message prefix ending in a ``cache_control``
+breakpoint is reported as ``prompt_tokens_details.cached_tokens`` once it has
+been seen before. The last request body is kept in ``last_payload``.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+MOCK_MODELS = [
+    "google/gemini-exp-1206:free",
+    "qwen/qwen2.5-vl-72b-instruct:free",
+    "mistralai/mistral-small-24b-instruct-2501:free",
+    "deepseek/deepseek-r1-distill-llama-70b:free",
+]
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+def _content_text(content: Any) -> str:
+    """Text of a message's content, whether a string or a list of content parts"""
+    if isinstance(content, list):
+        return " ".join(str(part.get("text", "")) for part in content if isinstance(part, dict))
+    return str(content or "")
+
+def _message_tokens(message: Dict[str, Any]) -> int:
+    return len(_content_text(message.get("content")).split())
+
+class MockOpenRouterHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so that clients can keep the connection alive between calls
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid Nagle stalls on reused connections
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.endswith("/models"):
+            self.server.record_models_request()
+            body = {"data": [{"id": model, "context_length": 32768} for model in MOCK_MODELS]}
+            etag = '"' + hashlib.sha256(json.dumps(body).encode("utf-8")).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        payload = self._read_json()
+        self.server.last_payload = payload
+        latency = self.server.sample_latency()
+        if latency:
+            time.sleep(latency)
+        self.server.record_request()
+
+        fault = self.server.sample_fault()
+        if fault == "rate_limited":
+            data = json.dumps({"error": {"code": 429, "message": "Rate limit exceeded"}}).encode("utf-8")
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Retry-After", f"{self.server.retry_after:g}")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if fault == "error":
+            self._send_json(500, {"error": {"code": 500, "message": "Mock upstream error"}})
+            return
+
+        content = f"Mock response from {payload.get('model', 'unknown')}"
+        if (payload.get("response_format") or {}).get("type") == "json_object":
+            # Coordinator analysis: select every role listed in the prompt
+            prompt = _content_text(payload.get("messages", [{}])[-1].get("content"))
+            roles = re.findall(r"^\s*- ([\w-]+): ", prompt, re.MULTILINE)
+            content = json.dumps({"selected_roles": roles, "reasoning": "Mock analysis"})
+        elif self.server.completion_tokens:
+            # Pad the reply to the configured length, one token per word
+            filler = " ".join(f"token{i}" for i in range(self.server.completion_tokens))
+            content = " ".join((content + " " + filler).split()[:self.server.completion_tokens])
+        messages = payload.get("messages", [])
+        prompt_tokens = sum(_message_tokens(m) for m in messages)
+        completion_tokens = len(content.split())
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        cached_tokens = self.server.cached_prefix_tokens(messages)
+        if cached_tokens is not None:
+            usage["prompt_tokens_details"] = {"cached_tokens": cached_tokens}
+        if payload.get("stream"):
+            self._send_stream(payload.get("model"), content, usage)
+            return
+        self._send_json(200, {
+            "id": f"mock-{self.server.request_count}",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+    def _send_stream(self, model: str, content: str, usage: Dict[str, int]):
+        """Send the completion as OpenAI-style server-sent events, one word per chunk"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._write_chunk(b": OPENROUTER PROCESSING\n\n")
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = word if i == 0 else " " + word
+            chunk = {"model": model, "choices": [{"index": 0, "delta": {"content": delta}}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay)
+        final = {"model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+        self._write_chunk(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+class MockOpenRouterServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load
+    request_queue_size = 128
+
+    def __init__(self,
+                 address: Tuple[str, int],
+                 latency: float = 0.0,
+                 token_delay: float = 0.0,
+                 latency_distribution: str = "fixed",
+                 latency_spread: float = 0.5,
+                 completion_tokens: int = 0,
+                 error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0,
+                 retry_after: float = 1.0,
+                 seed: Optional[int] = None):
+        """
+        ``latency`` is the mean completion latency in seconds. With a
+        ``latency_distribution`` other than "fixed" it is drawn per request:
+        uniform over latency * (1 ± spread), exponential with that mean, or
+        lognormal with that median and sigma ``latency_spread``.
+        ``completion_tokens`` pads replies to that many tokens (0 keeps the
+        short default reply). ``error_rate`` and ``rate_limit_rate`` are the
+        fractions of completions answered with a 500 or a 429.
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+        super().__init__(address, MockOpenRouterHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.latency_distribution = latency_distribution
+        self.latency_spread = latency_spread
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.models_request_count = 0
+        self.error_count = 0
+        self.rate_limited_count = 0
+        self.last_payload: Optional[Dict[str, Any]] = None
+        self._cached_prefixes = set()
+        self._random = random.Random(seed)
+        self._count_lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        if not self.latency or self.latency_distribution == "fixed":
+            return self.latency
+        with self._count_lock:
+            if self.latency_distribution == "uniform":
+                return max(0.0, self._random.uniform(self.latency * (1 - self.latency_spread),
+                                                     self.latency * (1 + self.latency_spread)))
+            if self.latency_distribution == "exponential":
+                return self._random.expovariate(1 / self.latency)
+            return self._random.lognormvariate(math.log(self.latency), self.latency_spread)
+
+    def sample_fault(self) -> Optional[str]:
+        """Decide whether this completion fails: "rate_limited", "error" or None"""
+        if not self.error_rate and not self.rate_limit_rate:
+            return None
+        with self._count_lock:
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                self.rate_limited_count += 1
+                return "rate_limited"
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.error_count += 1
+                return "error"
+        return None
+
+    def cached_prefix_tokens(self, messages: List[Dict[str, Any]]) -> Optional[int]:
+        """Tokens of the longest prefix cached by an earlier request; None without breakpoints
+
+        As with Anthropic, the prefix ending at each breakpoint is written to
+        the cache, and a later request hits on any message boundary up to its
+        last breakpoint whatever its own markers are.
+        """
+        breakpoints = {
+            i for i, m in enumerate(messages)
+            if isinstance(m.get("content"), list)
+            and any(isinstance(part, dict) and "cache_control" in part for part in m["content"])
+        }
+        if not breakpoints:
+            return None
+        cached = 0
+        tokens = 0
+        digest = hashlib.sha256()
+        with self._count_lock:
+            for i, message in enumerate(messages[:max(breakpoints) + 1]):
+                digest.update(json.dumps([message.get("role"), _content_text(message.get("content"))]).encode("utf-8"))
+                tokens += _message_tokens(message)
+                prefix = digest.hexdigest()
+                if prefix in self._cached_prefixes:
+                    cached = tokens
+                if i in breakpoints:
+                    self._cached_prefixes.add(prefix)
+        return cached
+
+    def record_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    def record_models_request(self):
+        with self._count_lock:
+            self.models_request_count += 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **options) -> MockOpenRouterServer:
+    """Start the mock server on a background thread and return it"""
+    server = MockOpenRouterServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """Add the mock server's tuning flags to a command line parser"""
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean seconds to wait before each completion")
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-spread", type=float, default=0.5,
+                        help="Relative spread for uniform, sigma for lognormal latency")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens")
+    parser.add_argument("--completion-tokens", type=int, default=0, help="Pad replies to this many tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of completions failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of completions failing with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=None)
+
+def server_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "latency": args.latency,
+        "latency_distribution": args.latency_distribution,
+        "latency_spread": args.latency_spread,
+        "token_delay": args.token_delay,
+        "completion_tokens": args.completion_tokens,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "retry_after": args.retry_after,
+        "seed": args.seed
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenRouter stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    server = MockOpenRouterServer((args.host, args.port), **server_options(args))
+    print(f"Mock OpenRouter listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
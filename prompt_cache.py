@@ -0,0 +1,58 @@
+"""Provider prompt caching for stable message prefixes.
+
+Every turn re-sends an agent's system message and a history that only grows
+at the end. Anthropic and Gemini models on OpenRouter can bill such a prefix
+at the cached rate, but only if the request marks where the prefix ends with
+a ``cache_control`` breakpoint on a content part. Other providers cache
+automatically or not at all, so their messages are sent unchanged.
+
+Breakpoints go on the first system message (the role prompt, which never
+changes) and on the last message, so the next turn, which extends this one,
+reads the whole prompt back from the cache.
+"""
+from typing import Any, Dict, List, Optional
+
+# Model id prefixes whose providers honor cache_control breakpoints
+CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/gemini")
+CACHE_CONTROL = {"type": "ephemeral"}
+
+def supports_cache_control(model: str) -> bool:
+    return model.startswith(CACHE_CONTROL_MODEL_PREFIXES)
+
+def _with_breakpoint(message: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of ``message`` whose last content part carries the cache breakpoint"""
+    content = message.get("content")
+    if isinstance(content, str):
+        parts = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content:
+        parts = [dict(part) for part in content]
+    else:
+        return message
+    parts[-1]["cache_control"] = CACHE_CONTROL
+    return {**message, "content": parts}
+
+def add_cache_breakpoints(model: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The messages to send to ``model``, with breakpoints if its provider supports them
+
+    Returns ``messages`` itself for other models; the caller's list and
+    message dicts are never modified.
+    """
+    if not messages or not supports_cache_control(model):
+        return messages
+    marked = list(messages)
+    if marked[0].get("role") == "system":
+        marked[0] = _with_breakpoint(marked[0])
+    if len(marked) > 1:
+        marked[-1] = _with_breakpoint(marked[-1])
+    return marked
+
+def prompt_cache_usage(usage: Dict[str, Any]) -> Dict[str, int]:
+    """Cached and uncached prompt tokens from a usage block; {} when it has no prompt count"""
+    prompt_tokens: Optional[int] = usage.get("prompt_tokens")
+    if prompt_tokens is None:
+        return {}
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    return {
+        "cached_prompt_tokens": cached,
+        "uncached_prompt_tokens": max(0, prompt_tokens - cached)
+    }
@@ -0,0 +1,56 @@
+"""Structured, leveled logging for OpenRouter requests.
+
+INFO: one compact JSON record per completion (model, tokens, status,
+latency, retries). DEBUG: request/response bodies as well, for a sampled
+fraction of requests (LOG_PAYLOAD_SAMPLE_RATE), with secrets redacted and
+bodies truncated (LOG_PAYLOAD_MAX_CHARS). Nothing is formatted unless the
+level is enabled.
+"""
+import json
+import logging
+import os
+import random
+import re
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("autogen_assistant.api")
+
+PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))
+PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "2000"))
+
+_SECRET_PATTERNS = [
+    re.compile(r"(Bearer\s+)[A-Za-z0-9._\-]+"),
+    re.compile(r"()sk-[A-Za-z0-9_\-]{8,}"),
+]
+
+def configure_logging(level: Optional[str] = None):
+    """Set up root logging once, at LOG_LEVEL (default INFO)"""
+    logging.basicConfig(
+        level=(level or os.getenv("LOG_LEVEL", "INFO")).upper(),
+        format="%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+
+def redact(text: str) -> str:
+    """Mask bearer tokens and API keys"""
+    for pattern in _SECRET_PATTERNS:
+        text = pattern.sub(lambda m: f"{m.group(1)}***", text)
+    return text
+
+def completion_logging_enabled() -> bool:
+    return logger.isEnabledFor(logging.INFO)
+
+def should_log_payload() -> bool:
+    """Decide once per request whether its bodies are logged"""
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < PAYLOAD_SAMPLE_RATE
+
+def log_payload(kind: str, url: str, body: Any, headers: Optional[Dict[str, str]] = None):
+    text = body if isinstance(body, str) else json.dumps(body, default=str)
+    if len(text) > PAYLOAD_MAX_CHARS:
+        text = f"{text[:PAYLOAD_MAX_CHARS]}... [{len(text) - PAYLOAD_MAX_CHARS} chars truncated]"
+    record = {"event": kind, "url": url, "body": redact(text)}
+    if headers is not None:
+        record["headers"] = {key: redact(value) for key, value in headers.items()}
+    logger.debug(json.dumps(record, separators=(",", ":")))
+
+def log_completion(record: Dict[str, Any]):
+    logger.info(json.dumps(record, separators=(",", ":"), default=str))
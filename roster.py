@@ -0,0 +1,64 @@
+"""Build the coordinator/specialist roster outside the Streamlit UI.
+
+Uses the same role definitions (DEFAULT_AGENT_ROLES) and saved per-role model
+choices (.model_selections.json) as the dashboard's "Setup All Agents" button.
+"""
+import json
+from typing import Dict, Optional
+
+from agents import Agent, AgentGroup, CoordinatorAgent
+from api import OpenRouterAPI
+from cache import ResponseCache
+from catalog import CatalogSnapshot
+from config import DEFAULT_AGENT_ROLES
+from hedging import HedgePolicy, HedgeStats
+
+DEFAULT_SELECTIONS_PATH = ".model_selections.json"
+
+def load_model_selections(path: str = DEFAULT_SELECTIONS_PATH) -> Dict[str, Optional[str]]:
+    """Per-role model ids saved by the dashboard"""
+    with open(path, "r") as f:
+        return json.load(f)
+
+def build_agent_group(api: OpenRouterAPI,
+                      selected_models: Dict[str, Optional[str]],
+                      catalog: Optional[CatalogSnapshot] = None,
+                      response_cache: Optional[ResponseCache] = None,
+                      max_concurrency: Optional[int] = None,
+                      hedge_policies: Optional[Dict[str, HedgePolicy]] = None,
+                      hedge_stats: Optional[HedgeStats] = None) -> AgentGroup:
+    """Create an AgentGroup with one agent per role in DEFAULT_AGENT_ROLES
+
+    Raises ValueError if a role has no model selected.
+    """
+    missing = [role for role in DEFAULT_AGENT_ROLES if not selected_models.get(role)]
+    if missing:
+        raise ValueError(f"No model selected for: {', '.join(missing)}")
+
+    options = {"response_cache": response_cache, "hedge_policies": hedge_policies, "hedge_stats": hedge_stats}
+    if max_concurrency:
+        options["max_concurrency"] = max_concurrency
+    group = AgentGroup(api, **options)
+
+    for role, role_config in DEFAULT_AGENT_ROLES.items():
+        model = selected_models[role]
+        context_length = catalog.by_id.get(model, {}).get("context_length") if catalog else None
+        if role == "coordinator":
+            agent = CoordinatorAgent(
+                name=role_config["name"],
+                model=model,
+                system_message=role_config["system_message"],
+                cache_completions=role_config.get("cache_completions", True),
+                context_length=context_length
+            )
+        else:
+            agent = Agent(
+                name=role_config["name"],
+                role=role,
+                model=model,
+                system_message=role_config["system_message"],
+                cache_completions=role_config.get("cache_completions", True),
+                context_length=context_length
+            )
+        group.add_agent(agent)
+    return group
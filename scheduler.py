@@ -0,0 +1,268 @@
+"""Client-side request scheduling: retries, rate limits and per-model concurrency.
+
+OpenRouter's free models answer bursts with 429s and transient 5xx errors.
+Every completion goes through a RequestScheduler, which
+
+- retries 408/429/5xx and connection errors with exponential backoff and full
+  jitter, waiting at least as long as the server's Retry-After;
+- pauses all callers of a model until a 429's Retry-After has passed, so one
+  throttled request doesn't send the rest into the same wall;
+- limits each model with a token bucket and a concurrency cap. A 429 that
+  comes without a Retry-After cuts the rate to half the measured send rate
+  and halves the cap; both then recover additively on successes.
+
+The default scheduler is shared by every OpenRouterAPI in the process, since
+upstream limits apply per key and model rather than per client object.
+"""
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_MODEL_CONCURRENCY = 8
+# Poll interval while a model is at its concurrency cap
+SLOT_POLL_INTERVAL = 0.02
+# Minimum seconds between two multiplicative decreases of a model's limits
+DECREASE_INTERVAL = 1.0
+# Lowest rate (requests per second) a 429 can cut a model to
+DEFAULT_MIN_RATE = 0.5
+# Seconds of sends the send rate is measured over
+SEND_RATE_WINDOW = 10.0
+# Seconds for a cut rate to climb back, linearly, to the send rate it was cut from
+RATE_RECOVERY_SECONDS = 10.0
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    def __init__(self,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = 0.5,
+                 max_delay: float = 20.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number ``attempt + 1``
+
+        Full jitter over an exponentially growing window; a Retry-After sets
+        the floor, with up to as much again in jitter (at most ``base_delay``)
+        so waiting clients don't retry in step.
+        """
+        if retry_after is not None:
+            retry_after = min(self.max_delay, retry_after)
+            return retry_after + random.uniform(0, min(self.base_delay, retry_after))
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+class ModelLimiter:
+    """Token bucket plus adaptive concurrency cap for one model
+
+    ``rate`` is requests per second (None: unlimited until a 429 without a
+    Retry-After). A 429 with a Retry-After only pauses the model for that
+    long. One without cuts the rate to half the rate requests were actually
+    sent at and halves the concurrency cap, at most once a second. Each
+    success then adds 1/cap to the cap, and the rate climbs linearly back to
+    where it was cut from over RATE_RECOVERY_SECONDS, and on at the same
+    pace up to the configured limit.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = DEFAULT_MODEL_CONCURRENCY,
+                 rate: Optional[float] = None,
+                 min_rate: float = DEFAULT_MIN_RATE):
+        self.max_concurrency = max_concurrency
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.concurrency_limit = float(max_concurrency)
+        self.rate = rate
+        self.tokens = 1.0
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.throttled_count = 0
+        self._last_refill = time.monotonic()
+        self._last_decrease = float("-inf")
+        # Requests per second the rate regains per second after a cut
+        self._recovery_step = 0.0
+        self._last_increase = self._last_refill
+        self._sent: "deque[float]" = deque(maxlen=1024)
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            # Allow a burst of up to one second's worth of requests
+            burst = max(1.0, self.rate)
+            self.tokens = min(burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def reserve(self) -> float:
+        """Take a slot and a token; returns 0.0 on success, else seconds to wait first"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.concurrency_limit):
+                return SLOT_POLL_INTERVAL
+            self._refill(now)
+            if self.rate is not None:
+                if self.tokens < 1.0:
+                    return (1.0 - self.tokens) / self.rate
+                self.tokens -= 1.0
+            self.in_flight += 1
+            self._sent.append(now)
+            return 0.0
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _send_rate(self, now: float) -> Optional[float]:
+        """Requests sent per second over the last SEND_RATE_WINDOW; None with too few to tell"""
+        while self._sent and self._sent[0] <= now - SEND_RATE_WINDOW:
+            self._sent.popleft()
+        if len(self._sent) < 2:
+            return None
+        return len(self._sent) / max(now - self._sent[0], 1.0)
+
+    def observe(self, status: Optional[int], retry_after: Optional[float] = None):
+        """Adapt the limits to a response status"""
+        with self._lock:
+            now = time.monotonic()
+            if status == 429:
+                self.throttled_count += 1
+                if retry_after is not None:
+                    # The server said when to come back; waiting that long is enough
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+                    return
+                # Requests already in flight when the limit was hit will see 429s
+                # too; back off once per burst rather than once per response
+                if now - self._last_decrease < DECREASE_INTERVAL:
+                    return
+                self._last_decrease = now
+                self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                send_rate = self._send_rate(now)
+                if send_rate is None:
+                    # Too few requests to measure; the halved cap and the retry backoff have to do
+                    return
+                self._refill(now)
+                self.rate = max(self.min_rate, min(self.rate or send_rate, send_rate) / 2)
+                self.tokens = min(self.tokens, 1.0)
+                self._recovery_step = max(self.min_rate, send_rate - self.rate) / RATE_RECOVERY_SECONDS
+                self._last_increase = now
+            elif status is not None and status < 400:
+                self.concurrency_limit = min(float(self.max_concurrency),
+                                             self.concurrency_limit + 1 / self.concurrency_limit)
+                if self.rate is not None and self.rate != self.max_rate:
+                    self._refill(now)
+                    # Linear in time, however many requests succeed
+                    self.rate += self._recovery_step * (now - self._last_increase)
+                    self._last_increase = now
+                    if self.max_rate is not None and self.rate >= self.max_rate:
+                        self.rate = self.max_rate
+                    elif self.max_rate is None:
+                        send_rate = self._send_rate(now)
+                        if send_rate is not None and self.rate >= send_rate * 4:
+                            # Comfortably above what we actually send: lift the limit again
+                            self.rate = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "concurrency_limit": int(self.concurrency_limit),
+                "rate": self.rate,
+                "throttled": self.throttled_count
+            }
+
+class RequestScheduler:
+    """Per-model limiters plus the retry policy shared by all clients"""
+
+    def __init__(self,
+                 policy: Optional[RetryPolicy] = None,
+                 max_concurrency: int = DEFAULT_MODEL_CONCURRENCY,
+                 rate: Optional[float] = None):
+        self.policy = policy or RetryPolicy()
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, model: str) -> ModelLimiter:
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                limiter = ModelLimiter(self.max_concurrency, self.rate)
+                self._limiters[model] = limiter
+            return limiter
+
+    def acquire(self, model: str) -> float:
+        """Block until a request to ``model`` may start; returns seconds waited"""
+        limiter = self.limiter(model)
+        start = time.monotonic()
+        wait = limiter.reserve()
+        while wait > 0:
+            time.sleep(wait)
+            wait = limiter.reserve()
+        return time.monotonic() - start
+
+    async def aacquire(self, model: str) -> float:
+        """Async counterpart of acquire"""
+        limiter = self.limiter(model)
+        start = time.monotonic()
+        wait = limiter.reserve()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = limiter.reserve()
+        return time.monotonic() - start
+
+    def observe(self, model: str, status: Optional[int], retry_after: Optional[float] = None):
+        self.limiter(model).observe(status, retry_after)
+
+    def release(self, model: str):
+        self.limiter(model).release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {model: limiter.stats() for model, limiter in limiters.items()}
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> RequestScheduler:
+    """The process-wide scheduler, configured from the environment on first use
+
+    API_MAX_RETRIES, MODEL_MAX_CONCURRENCY and MODEL_RATE_LIMIT (requests per
+    second per model; unset means no limit until a 429 is seen).
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            rate = os.getenv("MODEL_RATE_LIMIT")
+            _scheduler = RequestScheduler(
+                RetryPolicy(max_retries=int(os.getenv("API_MAX_RETRIES", str(DEFAULT_MAX_RETRIES)))),
+                max_concurrency=int(os.getenv("MODEL_MAX_CONCURRENCY", str(DEFAULT_MODEL_CONCURRENCY))),
+                rate=float(rate) if rate else None
+            )
+        return _scheduler
+
+def set_scheduler(scheduler: RequestScheduler):
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
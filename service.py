@@ -0,0 +1,326 @@
+"""Async multi-tenant HTTP service exposing the agent pipeline.
+
+Endpoints (JSON in, JSON or NDJSON out):
+
+- POST /v1/collective  {"prompt", "conversation_id"?, "stream"?, "deadline"?, "quorum"?, "follow_up"?}
+- POST /v1/single      {"prompt", "agent"?, "conversation_id"?, "stream"?}
+- GET / DELETE /v1/conversations/{conversation_id}
+- GET /healthz
+
+With "stream": true the response is NDJSON, one event per line, using the
+same phases as AgentGroup (coordinator, agent_response, complete); otherwise
+only the final event is returned. Omitting conversation_id starts a new
+conversation whose id is returned in every event. "deadline" (seconds) and
+"quorum" (agents) let synthesis start without the slowest agents; with
+"follow_up" their late replies are still waited for and reported.
+
+Tenants are identified by the X-Tenant-Id header and only see their own
+conversations. The OpenRouter connection pool, the response and completion
+caches and the admission limits are shared by all tenants. Conversations
+live in process memory, so run one process per core behind a load balancer
+with sticky routing on conversation_id.
+
+Usage: python service.py [--port 8080] [--selections .model_selections.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from aiohttp import web
+
+from agents import AgentGroup
+from api import OpenRouterAPI, load_environment
+from cache import ResponseCache
+from catalog import CatalogSnapshot, get_model_catalog
+from hedging import DEFAULT_HEDGE_POLICIES_PATH, HedgePolicy, HedgeStats, load_hedge_policies
+from roster import DEFAULT_SELECTIONS_PATH, build_agent_group, load_model_selections
+
+DEFAULT_MAX_CONVERSATIONS = 10000
+DEFAULT_CONVERSATION_TTL = 3600.0
+DEFAULT_MAX_INFLIGHT = 256
+DEFAULT_MAX_TENANT_INFLIGHT = 32
+
+class Conversation:
+    """An AgentGroup plus a lock that keeps its turns in order"""
+
+    def __init__(self, group: AgentGroup):
+        self.group = group
+        self.lock = asyncio.Lock()
+        self.last_used = time.time()
+
+class ConversationStore:
+    """In-memory LRU of conversations keyed by (tenant, conversation_id)
+
+    Conversations idle for longer than ``ttl`` seconds or beyond
+    ``max_conversations`` are dropped, oldest first.
+    """
+
+    def __init__(self,
+                 factory: Callable[[], AgentGroup],
+                 max_conversations: int = DEFAULT_MAX_CONVERSATIONS,
+                 ttl: float = DEFAULT_CONVERSATION_TTL):
+        self.factory = factory
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._conversations: "OrderedDict[Tuple[str, str], Conversation]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl
+        while self._conversations:
+            key, conversation = next(iter(self._conversations.items()))
+            if len(self._conversations) <= self.max_conversations and conversation.last_used >= cutoff:
+                break
+            del self._conversations[key]
+
+    def get(self, tenant: str, conversation_id: str) -> Optional[Conversation]:
+        conversation = self._conversations.get((tenant, conversation_id))
+        if conversation is None or conversation.last_used < time.time() - self.ttl:
+            return None
+        conversation.last_used = time.time()
+        self._conversations.move_to_end((tenant, conversation_id))
+        return conversation
+
+    def create(self, tenant: str) -> Tuple[str, Conversation]:
+        conversation_id = uuid.uuid4().hex
+        conversation = Conversation(self.factory())
+        self._conversations[(tenant, conversation_id)] = conversation
+        self._evict()
+        return conversation_id, conversation
+
+    def delete(self, tenant: str, conversation_id: str) -> bool:
+        return self._conversations.pop((tenant, conversation_id), None) is not None
+
+class AdmissionControl:
+    """Shared limits on turns in flight: globally (queued) and per tenant (rejected)"""
+
+    def __init__(self,
+                 max_inflight: int = DEFAULT_MAX_INFLIGHT,
+                 max_tenant_inflight: int = DEFAULT_MAX_TENANT_INFLIGHT):
+        self.max_tenant_inflight = max_tenant_inflight
+        self.semaphore = asyncio.Semaphore(max_inflight)
+        self.tenant_inflight: Dict[str, int] = {}
+        self.rejected = 0
+
+    def try_enter(self, tenant: str) -> bool:
+        if self.tenant_inflight.get(tenant, 0) >= self.max_tenant_inflight:
+            self.rejected += 1
+            return False
+        self.tenant_inflight[tenant] = self.tenant_inflight.get(tenant, 0) + 1
+        return True
+
+    def leave(self, tenant: str):
+        self.tenant_inflight[tenant] -= 1
+        if not self.tenant_inflight[tenant]:
+            del self.tenant_inflight[tenant]
+
+API_KEY = web.AppKey("api", OpenRouterAPI)
+STORE_KEY = web.AppKey("store", ConversationStore)
+ADMISSION_KEY = web.AppKey("admission", AdmissionControl)
+HEDGE_STATS_KEY = web.AppKey("hedge_stats", HedgeStats)
+
+def _tenant(request: web.Request) -> str:
+    return request.headers.get("X-Tenant-Id", "default")
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"success": False, "error": message}, status=status)
+
+async def _read_turn(request: web.Request) -> Dict[str, Any]:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text=json.dumps({"success": False, "error": "Body must be JSON"}),
+                                 content_type="application/json")
+    if not isinstance(body, dict) or not isinstance(body.get("prompt"), str) or not body["prompt"].strip():
+        raise web.HTTPBadRequest(text=json.dumps({"success": False, "error": "\"prompt\" is required"}),
+                                 content_type="application/json")
+    return body
+
+async def _collective_events(conversation: Conversation, body: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    deadline, quorum = body.get("deadline"), body.get("quorum")
+    if deadline is not None and (not isinstance(deadline, (int, float)) or deadline <= 0):
+        yield {"phase": "complete", "success": False, "error": "\"deadline\" must be a positive number of seconds"}
+        return
+    if quorum is not None and (not isinstance(quorum, int) or quorum < 1):
+        yield {"phase": "complete", "success": False, "error": "\"quorum\" must be a positive integer"}
+        return
+    async for event in conversation.group.aget_collective_response(
+        body["prompt"],
+        deadline=deadline,
+        quorum=quorum,
+        follow_up=bool(body.get("follow_up"))
+    ):
+        yield event
+
+async def _single_events(conversation: Conversation, body: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    group = conversation.group
+    wanted = body.get("agent", "coder")
+    agent_name = next(
+        (name for name, agent in group.get_agents().items() if wanted in (agent.role, name)),
+        None
+    )
+    if agent_name is None:
+        yield {"phase": "complete", "success": False, "error": f"Unknown agent: {wanted}"}
+        return
+    response, process_time = await group.arun_agent_turn(agent_name, body["prompt"])
+    if not response["success"]:
+        yield {"phase": "complete", "success": False, "agent": agent_name,
+               "error": response.get("error", "Unknown error")}
+        return
+    yield {
+        "phase": "complete",
+        "success": True,
+        "agent": agent_name,
+        "response": response["response"],
+        "tokens": response.get("tokens", 0),
+        "time": process_time
+    }
+
+async def _run_turn(request: web.Request, events: Callable) -> web.StreamResponse:
+    tenant = _tenant(request)
+    body = await _read_turn(request)
+    store = request.app[STORE_KEY]
+    admission = request.app[ADMISSION_KEY]
+
+    if not admission.try_enter(tenant):
+        return _error(429, "Too many turns in flight for this tenant")
+    try:
+        conversation_id = body.get("conversation_id")
+        if conversation_id:
+            conversation = store.get(tenant, conversation_id)
+            if conversation is None:
+                return _error(404, "Conversation not found")
+        else:
+            conversation_id, conversation = store.create(tenant)
+
+        async with admission.semaphore, conversation.lock:
+            if not body.get("stream"):
+                final: Dict[str, Any] = {"success": False, "error": "No events"}
+                async for final in events(conversation, body):
+                    pass
+                return web.json_response({**final, "conversation_id": conversation_id})
+
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            async for event in events(conversation, body):
+                line = json.dumps({**event, "conversation_id": conversation_id}, ensure_ascii=False)
+                await response.write(line.encode("utf-8") + b"\n")
+            await response.write_eof()
+            return response
+    finally:
+        admission.leave(tenant)
+
+async def collective(request: web.Request) -> web.StreamResponse:
+    return await _run_turn(request, _collective_events)
+
+async def single(request: web.Request) -> web.StreamResponse:
+    return await _run_turn(request, _single_events)
+
+async def get_conversation(request: web.Request) -> web.Response:
+    conversation = request.app[STORE_KEY].get(_tenant(request), request.match_info["conversation_id"])
+    if conversation is None:
+        return _error(404, "Conversation not found")
+    group = conversation.group
+    agents = dict(group.get_agents())
+    if group.coordinator:
+        agents[group.coordinator.name] = group.coordinator
+    return web.json_response({
+        "success": True,
+        "conversation_id": request.match_info["conversation_id"],
+        "agents": {name: {"model": agent.model, "messages": agent.get_messages()} for name, agent in agents.items()}
+    })
+
+async def delete_conversation(request: web.Request) -> web.Response:
+    if not request.app[STORE_KEY].delete(_tenant(request), request.match_info["conversation_id"]):
+        return _error(404, "Conversation not found")
+    return web.json_response({"success": True})
+
+async def healthz(request: web.Request) -> web.Response:
+    admission = request.app[ADMISSION_KEY]
+    return web.json_response({
+        "success": True,
+        "conversations": len(request.app[STORE_KEY]),
+        "inflight": sum(admission.tenant_inflight.values()),
+        "rejected": admission.rejected,
+        "hedging": request.app[HEDGE_STATS_KEY].report()
+    })
+
+def create_app(api: OpenRouterAPI,
+               selected_models: Dict[str, Optional[str]],
+               catalog: Optional[CatalogSnapshot] = None,
+               max_conversations: int = DEFAULT_MAX_CONVERSATIONS,
+               conversation_ttl: float = DEFAULT_CONVERSATION_TTL,
+               max_inflight: int = DEFAULT_MAX_INFLIGHT,
+               max_tenant_inflight: int = DEFAULT_MAX_TENANT_INFLIGHT,
+               hedge_policies: Optional[Dict[str, HedgePolicy]] = None) -> web.Application:
+    """Build the service; every conversation shares ``api`` and one response cache"""
+    response_cache = ResponseCache()
+    hedge_stats = HedgeStats()
+    # Fail at startup rather than on the first request if a role has no model
+    build_agent_group(api, selected_models, catalog, response_cache, hedge_policies=hedge_policies)
+
+    app = web.Application()
+    app[API_KEY] = api
+    app[STORE_KEY] = ConversationStore(
+        lambda: build_agent_group(api, selected_models, catalog, response_cache,
+                                  hedge_policies=hedge_policies, hedge_stats=hedge_stats),
+        max_conversations,
+        conversation_ttl
+    )
+    app[ADMISSION_KEY] = AdmissionControl(max_inflight, max_tenant_inflight)
+    app[HEDGE_STATS_KEY] = hedge_stats
+
+    async def on_cleanup(app: web.Application):
+        await app[API_KEY].aclose()
+
+    app.on_cleanup.append(on_cleanup)
+    app.add_routes([
+        web.post("/v1/collective", collective),
+        web.post("/v1/single", single),
+        web.get("/v1/conversations/{conversation_id}", get_conversation),
+        web.delete("/v1/conversations/{conversation_id}", delete_conversation),
+        web.get("/healthz", healthz)
+    ])
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-tenant HTTP service for the agent pipeline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--selections", default=DEFAULT_SELECTIONS_PATH, help="Per-role model selections JSON")
+    parser.add_argument("--max-conversations", type=int, default=DEFAULT_MAX_CONVERSATIONS)
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT,
+                        help="Turns processed at once across all tenants; more are queued")
+    parser.add_argument("--max-tenant-inflight", type=int, default=DEFAULT_MAX_TENANT_INFLIGHT,
+                        help="Turns in flight per tenant; more are rejected with 429")
+    parser.add_argument("--hedge-policies", default=DEFAULT_HEDGE_POLICIES_PATH,
+                        help="Per-role hedging/fallback policies JSON (optional)")
+    parser.add_argument("--no-catalog", action="store_true",
+                        help="Skip the model catalog; agents then use the default context window")
+    args = parser.parse_args(argv)
+
+    load_environment()
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        parser.error("OPENROUTER_API_KEY is not set")
+    api = OpenRouterAPI(api_key)
+    app = create_app(
+        api,
+        load_model_selections(args.selections),
+        None if args.no_catalog else get_model_catalog().get(api),
+        max_conversations=args.max_conversations,
+        max_inflight=args.max_inflight,
+        max_tenant_inflight=args.max_tenant_inflight,
+        hedge_policies=load_hedge_policies(args.hedge_policies)
+    )
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Coalescing of identical in-flight calls.
+
+When several callers ask for the same completion at the same moment, only the
+first (the leader) sends a request; the others wait for it and share its
+result. Unlike the response and completion caches, nothing is kept once the
+call has finished, so this only ever merges calls that overlap in time.
+
+A failed call fails every caller waiting on it: a returned error result is
+shared like any other result, and an exception raised by the leader is
+re-raised in each waiter. Async callers can be cancelled individually; the
+shared request is only cancelled once every caller waiting on it has gone.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Thread-safe coalescing of blocking calls by key"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.coalesced_count = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run ``fn`` unless a call with ``key`` is already in flight
+
+        Returns (result, shared); ``shared`` is True when the result came from
+        another caller's call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced_count += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+class _AsyncCall:
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+class AsyncSingleFlight:
+    """Coalescing of coroutine calls by key, separately for each event loop
+
+    The shared call runs as its own task, so cancelling one caller doesn't
+    cancel the request the others are waiting on.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], _AsyncCall] = {}
+        # Loops in other threads may use the same instance
+        self._lock = threading.Lock()
+        self.coalesced_count = 0
+
+    def _forget(self, entry: Tuple[asyncio.AbstractEventLoop, Hashable], call: _AsyncCall):
+        with self._lock:
+            if self._calls.get(entry) is call:
+                del self._calls[entry]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async counterpart of SingleFlight.do"""
+        entry = (asyncio.get_running_loop(), key)
+        with self._lock:
+            call = self._calls.get(entry)
+            shared = call is not None
+            if shared:
+                self.coalesced_count += 1
+            else:
+                call = self._calls[entry] = _AsyncCall(asyncio.ensure_future(fn()))
+                call.task.add_done_callback(lambda _: self._forget(entry, call))
+            call.waiters += 1
+
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # Every caller has been cancelled: drop the shared call too, and
+                # make sure nobody new joins a task that is being cancelled
+                self._forget(entry, call)
+                call.task.cancel()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+_single_flight = SingleFlight()
+_async_single_flight = AsyncSingleFlight()
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight
+
+def get_async_single_flight() -> AsyncSingleFlight:
+    return _async_single_flight
@@ -0,0 +1,27 @@
+"""Per-thread SQLite connections for the on-disk stores.
+
+The completion cache and the conversation store are both single SQLite files
+in WAL mode, read and written from many threads and processes at once.
+"""
+import sqlite3
+import threading
+
+# Seconds a connection waits on another writer's lock before failing
+BUSY_TIMEOUT = 30.0
+
+class ThreadLocalConnections:
+    """One WAL-mode connection to ``path`` per thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
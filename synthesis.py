@@ -0,0 +1,134 @@
+"""Compact prompts for the coordinator's final evaluation.
+
+Agents answering the same question overlap heavily: the same code block, the
+same caveat paragraph. The synthesis prompt carries each agent's reply as
+plain text (no JSON, no timing fields), drops blocks another agent already
+said, and caps each agent at an excerpt budget. Once the synthesis is done the
+coordinator's history keeps a short summary instead of the full prompt, so
+later turns don't re-send every past reply.
+"""
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from tokens import DEFAULT_ESTIMATOR, TokenEstimator
+
+DEFAULT_EXCERPT_TOKENS = 1500
+SUMMARY_REPLY_CHARS = 600
+SUMMARY_INPUT_CHARS = 200
+
+_CODE_BLOCK = re.compile(r"(```.*?(?:```|\Z))", re.DOTALL)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+SYNTHESIS_INSTRUCTIONS = """Please provide a final evaluation and synthesis of these responses.
+If the user is requesting code, you MUST include the final, optimized code implementation after your analysis.
+Your response should follow this format:
+
+1. Analysis: A clear, concise summary of the different approaches and their pros/cons
+2. Final Implementation: If code was requested, provide the complete, optimized code that combines the best aspects of all responses
+
+Make sure to include actual code, not just descriptions of what the code should do."""
+
+def split_blocks(text: str) -> List[str]:
+    """Paragraphs and fenced code blocks of a reply, in order; code blocks are kept whole"""
+    blocks = []
+    for i, part in enumerate(_CODE_BLOCK.split(text)):
+        if i % 2:
+            blocks.append(part.strip())
+        else:
+            blocks.extend(p.strip() for p in _PARAGRAPH_BREAK.split(part) if p.strip())
+    return blocks
+
+def _normalize(block: str) -> str:
+    return re.sub(r"\s+", " ", block).strip().lower()
+
+def _truncate(block: str, tokens: int, estimator: TokenEstimator) -> str:
+    """The start of ``block``, cut at a line or word boundary to about ``tokens`` tokens"""
+    cost = estimator.count(block)
+    if cost <= tokens:
+        return block
+    cut = block[:max(1, int(len(block) * tokens / cost))]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary]
+    if block.startswith("```"):
+        cut += "\n```"
+    return cut.rstrip() + " …"
+
+def compact_responses(responses: List[Dict[str, Any]],
+                      excerpt_tokens: int = DEFAULT_EXCERPT_TOKENS,
+                      estimator: TokenEstimator = DEFAULT_ESTIMATOR) -> List[Dict[str, str]]:
+    """Each agent's reply with repeated blocks replaced by a reference and capped at ``excerpt_tokens``
+
+    A block is repeated when an earlier excerpt already carries the same text
+    (ignoring whitespace and case) or a block containing it in full; blocks
+    truncated or omitted for budget don't count.
+    """
+    seen: Dict[str, str] = {}
+    seen_texts: List[Tuple[str, str]] = []
+    compacted = []
+    for response in responses:
+        agent = response["agent"]
+        parts: List[str] = []
+        used = 0
+        omitted = 0
+        repeats: Set[str] = set()
+        for block in split_blocks(response["response"]):
+            key = _normalize(block)
+            source = seen.get(key)
+            if source is None and len(key) > 40:
+                source = next((owner for text, owner in seen_texts if key in text), None)
+            if source is not None:
+                if source != agent:
+                    repeats.add(source)
+                continue
+            cost = estimator.count(block)
+            if omitted or used + cost > excerpt_tokens:
+                remaining = excerpt_tokens - used
+                # Cut into a block only if a useful part of it fits
+                if not omitted and remaining >= 50:
+                    parts.append(_truncate(block, remaining, estimator))
+                    used = excerpt_tokens
+                    cost -= remaining
+                omitted += cost
+                continue
+            parts.append(block)
+            used += cost
+            # Only a block sent in full counts as said; one cut for budget may still come from another agent
+            seen.setdefault(key, agent)
+            seen_texts.append((key, agent))
+        if repeats:
+            parts.append(f"[Also repeats points made by {', '.join(sorted(repeats))}]")
+        if omitted:
+            parts.append(f"[… about {omitted} more tokens omitted]")
+        compacted.append({"agent": agent, "response": "\n\n".join(parts)})
+    return compacted
+
+def build_synthesis_prompt(user_input: str,
+                           responses: List[Dict[str, Any]],
+                           excerpt_tokens: int = DEFAULT_EXCERPT_TOKENS,
+                           estimator: TokenEstimator = DEFAULT_ESTIMATOR) -> str:
+    """The final-evaluation prompt: the user input, compacted replies and the instructions"""
+    sections = [
+        f"### {response['agent']}\n{response['response']}"
+        for response in compact_responses(responses, excerpt_tokens, estimator)
+    ]
+    return (f"Here are all agent responses for the user input: {user_input}\n\n"
+            + "\n\n".join(sections)
+            + "\n\n" + SYNTHESIS_INSTRUCTIONS)
+
+def _excerpt(text: str, chars: int) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    return text if len(text) <= chars else text[:chars - 1] + "…"
+
+def synthesis_summary(user_input: str,
+                      responses: List[Dict[str, Any]],
+                      final_evaluation: Optional[str]) -> List[Dict[str, str]]:
+    """The messages the coordinator keeps in its history for a finished synthesis"""
+    agents = ", ".join(response["agent"] for response in responses) or "no agents"
+    summary = [{
+        "role": "user",
+        "content": f"Synthesize the replies from {agents} to: {_excerpt(user_input, SUMMARY_INPUT_CHARS)}"
+    }]
+    if final_evaluation:
+        summary.append({"role": "assistant", "content": _excerpt(final_evaluation, SUMMARY_REPLY_CHARS)})
+    return summary
@@ -0,0 +1,71 @@
+"""Eviction and expiry in the response cache; eviction and access-time write-back on disk
+
+Run with ``python -m pytest test_cache.py``.
+"""
+import json
+import sqlite3
+
+import cache
+from cache import CompletionCache, ResponseCache
+
+def _value(i: int) -> dict:
+    return {"success": True, "response": f"reply {i} " + "x" * 100, "tokens": 1}
+
+def test_entry_cap_evicts_least_recently_used():
+    responses = ResponseCache(max_entries=2)
+    responses.put("a", _value(1))
+    responses.put("b", _value(2))
+    # Reading "a" makes "b" the least recently used
+    assert responses.get("a") is not None
+    responses.put("c", _value(3))
+    assert "a" in responses and "c" in responses
+    assert "b" not in responses
+    assert len(responses) == 2
+    assert responses.stats()["evictions"] == 1
+
+def test_byte_cap_evicts_oldest():
+    size = len(json.dumps(_value(1)))
+    responses = ResponseCache(max_bytes=size * 2 + 10)
+    for i in range(3):
+        responses.put(f"k{i}", _value(i))
+    assert "k0" not in responses
+    assert responses.stats()["bytes"] <= size * 2 + 10
+    # A value bigger than the whole cap is not stored at all
+    responses.put("huge", {"response": "x" * size * 3})
+    assert "huge" not in responses
+    assert len(responses) == 2
+
+def test_expired_entry_is_a_miss(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    responses = ResponseCache(ttl=60)
+    responses.put("a", _value(1))
+    now[0] += 59
+    assert responses.get("a") is not None
+    now[0] += 2
+    assert responses.get("a") is None
+    assert "a" not in responses
+    assert responses.stats()["expirations"] == 1
+
+def test_size_stays_within_budget(tmp_path):
+    cache = CompletionCache(str(tmp_path / "cache.sqlite3"), max_bytes=2000)
+    for i in range(100):
+        cache.put(f"k{i}", "m", _value(i))
+    assert cache.stats()["bytes"] <= 2000
+    assert cache.evictions > 0
+    # The running total matches the table after replacing a row
+    cache.put("k99", "m", _value(99))
+    assert cache._bytes == cache.stats()["bytes"]
+
+def test_memory_hits_keep_rows_recently_used(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = CompletionCache(path, max_bytes=2000, memory=ResponseCache(ttl=None))
+    for i in range(10):
+        cache.put(f"k{i}", "m", _value(i))
+    # Served from memory, but must still count as used when evicting from disk
+    assert cache.get("k0") is not None
+    for i in range(10, 20):
+        cache.put(f"k{i}", "m", _value(i))
+    keys = {row[0] for row in sqlite3.connect(path).execute("SELECT key FROM completions")}
+    assert "k0" in keys
+    assert "k1" not in keys
@@ -0,0 +1,21 @@
+"""What the on-disk model catalog keeps across base URLs
+
+Run with ``python -m pytest test_catalog.py``.
+"""
+import json
+import time
+
+from api import DEFAULT_BASE_URL
+from catalog import CatalogSnapshot, ModelCatalog
+
+def _save(path, base_url):
+    ModelCatalog(path)._save(CatalogSnapshot([{"id": "m"}], time.time(), base_url=base_url))
+
+def test_file_keeps_openrouter_and_latest_endpoint(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    _save(path, DEFAULT_BASE_URL)
+    for port in range(40000, 40005):
+        _save(path, f"http://127.0.0.1:{port}/v1")
+    with open(path) as f:
+        assert list(json.load(f)["catalogs"]) == [DEFAULT_BASE_URL, "http://127.0.0.1:40004/v1"]
+    assert ModelCatalog(path).snapshot(DEFAULT_BASE_URL) is not None
@@ -0,0 +1,42 @@
+"""Trimming an agent's history to its context budget
+
+Run with ``python -m pytest test_context.py``.
+"""
+from context import MEMORY_HEADER, ContextPolicy
+
+def _history(turns: int):
+    messages = [{"role": "system", "content": "You are a coder."}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"Question {i} " + "word " * 40})
+        messages.append({"role": "assistant", "content": f"Answer {i} " + "word " * 40})
+    messages.append({"role": "user", "content": "Latest question"})
+    return messages
+
+def test_history_within_budget_is_sent_unchanged():
+    messages = _history(2)
+    prompt, report = ContextPolicy(token_budget=10000).build(messages)
+    assert prompt == messages
+    assert report["saved_tokens"] == 0 and report["dropped_messages"] == 0
+
+def test_history_over_budget_keeps_system_summary_and_newest_turns():
+    messages = _history(20)
+    policy = ContextPolicy(token_budget=600, summary_tokens=150)
+    prompt, report = policy.build(messages)
+    assert prompt[0] == messages[0]
+    assert prompt[1]["role"] == "system" and prompt[1]["content"].startswith(MEMORY_HEADER)
+    assert prompt[-1] == messages[-1]
+    # The window opens on a user turn, never on an orphaned reply
+    assert prompt[2]["role"] == "user"
+    assert report["dropped_messages"] > 0
+    assert report["prompt_tokens"] <= 600
+    assert report["saved_tokens"] == report["history_tokens"] - report["prompt_tokens"]
+    # The kept turns are the newest ones, in order
+    assert prompt[2:] == messages[-len(prompt[2:]):]
+
+def test_history_over_budget_without_summary_is_a_sliding_window():
+    messages = _history(20)
+    prompt, report = ContextPolicy(token_budget=600, summarize=False).build(messages)
+    assert prompt[0] == messages[0]
+    assert not any(message["content"].startswith(MEMORY_HEADER) for message in prompt)
+    assert prompt[1:] == messages[-len(prompt[1:]):]
+    assert report["prompt_tokens"] <= 600
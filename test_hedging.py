@@ -0,0 +1,72 @@
+"""Hedge timing and the headless import footprint
+
+Run with ``python -m pytest test_hedging.py``.
+"""
+import asyncio
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hedging import ahedged_call, hedged_call
+
+def _reply(seconds: float, text: str):
+    def call():
+        time.sleep(seconds)
+        return {"success": True, "response": text}
+    return call
+
+def test_queued_primary_is_not_hedged():
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        # The only worker is busy, so the primary queues longer than the hedge delay
+        executor.submit(time.sleep, 0.2)
+        result = hedged_call(_reply(0.02, "primary"), _reply(0.02, "backup"), delay=0.1,
+                             failover=True, executor=executor)
+    finally:
+        executor.shutdown()
+    assert result["response"] == "primary"
+    assert not result["hedged"]
+
+def test_slow_primary_is_hedged():
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        result = hedged_call(_reply(0.5, "primary"), _reply(0.02, "backup"), delay=0.05,
+                             failover=True, executor=executor)
+    finally:
+        executor.shutdown()
+    assert result["hedged"] and result["hedge_won"]
+    assert result["response"] == "backup"
+
+@pytest.mark.parametrize("delay", [1.0, None])
+def test_cancelled_caller_cancels_primary(delay):
+    cancelled = []
+
+    async def primary():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {"success": True, "response": "primary"}
+
+    async def backup():
+        return {"success": True, "response": "backup"}
+
+    async def main():
+        call = asyncio.ensure_future(ahedged_call(primary, backup, delay=delay, failover=True))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        # Cancelled by the time the call returns, not when the loop shuts down
+        assert cancelled == [True]
+
+    asyncio.run(main())
+
+def test_agents_import_does_not_load_numpy():
+    code = "import sys, agents; print('numpy' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
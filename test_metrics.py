@@ -0,0 +1,41 @@
+"""Collective-turn metrics charged to the model that answered
+
+Run with ``python -m pytest test_metrics.py``.
+"""
+from agents import Agent, AgentGroup, CoordinatorAgent
+from hedging import HedgePolicy
+from metrics import MetricsStore
+from test_turn_order import FakeAPI
+
+class FailingAPI(FakeAPI):
+    """The "slow" and "broken" models fail; the others answer as in FakeAPI"""
+
+    def generate_completion(self, model, *args, **kwargs):
+        if model in ("slow", "broken"):
+            return {"success": False, "error": f"{model} is down"}
+        return super().generate_completion(model, *args, **kwargs)
+
+def _group(slow_fallback):
+    group = AgentGroup(FailingAPI())
+    group.add_agent(CoordinatorAgent("Coordinator", "coordinator", "Coordinate."))
+    group.add_agent(Agent("Fast", "fast", "fast", "Be quick."))
+    group.add_agent(Agent("Slow", "slow", "slow", "Take your time."))
+    group.set_hedge_policy("slow", HedgePolicy(fallback_model=slow_fallback, hedge=False))
+    return group
+
+def _requests(metrics):
+    return {row["model"]: (row["requests"], row["errors"]) for row in metrics.summary("model")}
+
+def test_failover_reply_is_charged_to_fallback_model():
+    group = _group("fast")
+    complete = list(group.get_collective_response("Q1"))[-1]
+    metrics = MetricsStore()
+    metrics.record_collective(complete, group.agents, group.coordinator)
+    assert _requests(metrics) == {"coordinator": (2, 0), "fast": (2, 0)}
+
+def test_failover_error_is_charged_to_fallback_model():
+    group = _group("broken")
+    complete = list(group.get_collective_response("Q1"))[-1]
+    metrics = MetricsStore()
+    metrics.record_collective(complete, group.agents, group.coordinator)
+    assert _requests(metrics) == {"coordinator": (2, 0), "fast": (1, 0), "broken": (1, 1)}
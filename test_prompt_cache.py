@@ -0,0 +1,119 @@
+"""Prompt-cache breakpoints as sent to the local OpenRouter stub (mock_openrouter.py)
+
+Run with ``python -m pytest test_prompt_cache.py``.
+"""
+import asyncio
+import copy
+
+import pytest
+
+from api import OpenRouterAPI
+from mock_openrouter import start_mock_server
+from prompt_cache import CACHE_CONTROL, add_cache_breakpoints, prompt_cache_usage
+from singleflight import AsyncSingleFlight, SingleFlight
+
+CACHING_MODEL = "anthropic/claude-3.5-sonnet"
+OTHER_MODEL = "mistralai/mistral-small-24b-instruct-2501:free"
+
+SYSTEM = {"role": "system", "content": "You are a coder. Write clean, efficient code."}
+HISTORY = [
+    SYSTEM,
+    {"role": "user", "content": "Write a function that reverses a string"},
+    {"role": "assistant", "content": "def reverse(s): return s[::-1]"},
+    {"role": "user", "content": "Now make it handle None"}
+]
+
+@pytest.fixture(scope="module")
+def server():
+    server = start_mock_server()
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def api(server):
+    return OpenRouterAPI("test-key", base_url=server.base_url,
+                         single_flight=SingleFlight(), async_single_flight=AsyncSingleFlight())
+
+def _text_part(text):
+    return [{"type": "text", "text": text, "cache_control": CACHE_CONTROL}]
+
+def test_unsupported_model_payload_unchanged(server, api):
+    result = api.generate_completion(OTHER_MODEL, HISTORY, cache=False)
+    assert result["success"]
+    assert server.last_payload["messages"] == HISTORY
+    assert result["cached_prompt_tokens"] == 0
+    assert result["uncached_prompt_tokens"] == result["usage"]["prompt_tokens"]
+
+def test_breakpoints_on_system_and_last_message(server, api):
+    sent = copy.deepcopy(HISTORY)
+    result = api.generate_completion(CACHING_MODEL, sent, cache=False)
+    assert result["success"]
+    assert server.last_payload["messages"] == [
+        {"role": "system", "content": _text_part(SYSTEM["content"])},
+        HISTORY[1],
+        HISTORY[2],
+        {"role": "user", "content": _text_part(HISTORY[3]["content"])}
+    ]
+    # The caller's history is left as plain strings
+    assert sent == HISTORY
+
+def test_single_message_without_system(server, api):
+    messages = [{"role": "user", "content": "Hello there"}]
+    api.generate_completion(CACHING_MODEL, messages, cache=False)
+    assert server.last_payload["messages"] == messages
+
+def test_content_parts_keep_their_shape():
+    image = {"type": "image_url", "image_url": {"url": "https://example.com/a.png"}}
+    messages = [SYSTEM, {"role": "user", "content": [{"type": "text", "text": "What is this?"}, image]}]
+    marked = add_cache_breakpoints("google/gemini-2.0-flash-001", messages)
+    assert marked[1]["content"] == [{"type": "text", "text": "What is this?"},
+                                    {**image, "cache_control": CACHE_CONTROL}]
+    assert "cache_control" not in image
+
+def test_prompt_caching_disabled(server):
+    api = OpenRouterAPI("test-key", base_url=server.base_url, prompt_caching=False,
+                        single_flight=SingleFlight())
+    api.generate_completion(CACHING_MODEL, HISTORY, cache=False)
+    assert server.last_payload["messages"] == HISTORY
+
+def test_next_turn_reports_cached_prefix(api):
+    turn = [SYSTEM, {"role": "user", "content": "Explain binary search in one paragraph"}]
+    first = api.generate_completion(CACHING_MODEL, turn, cache=False)
+    assert first["success"]
+    next_turn = turn + [
+        {"role": "assistant", "content": first["response"]},
+        {"role": "user", "content": "And its complexity?"}
+    ]
+    second = api.generate_completion(CACHING_MODEL, next_turn, cache=False)
+    prompt_tokens = second["usage"]["prompt_tokens"]
+    # Everything but the new assistant and user messages came from the cache
+    assert second["cached_prompt_tokens"] == prompt_tokens - len(first["response"].split()) - 3
+    assert second["uncached_prompt_tokens"] == prompt_tokens - second["cached_prompt_tokens"]
+
+def test_stream_payload_and_usage(server, api):
+    chunks = list(api.generate_completion(CACHING_MODEL, HISTORY, stream=True, cache=False))
+    final = chunks[-1]
+    assert final["success"] and final["done"]
+    assert server.last_payload["stream"] is True
+    assert server.last_payload["messages"][0]["content"] == _text_part(SYSTEM["content"])
+    assert server.last_payload["messages"][-1]["content"] == _text_part(HISTORY[3]["content"])
+    assert final["cached_prompt_tokens"] + final["uncached_prompt_tokens"] == final["usage"]["prompt_tokens"]
+
+def test_async_payload(server, api):
+    async def run():
+        try:
+            return await api.agenerate_completion(CACHING_MODEL, HISTORY, cache=False)
+        finally:
+            await api.aclose()
+
+    result = asyncio.run(run())
+    assert result["success"]
+    assert server.last_payload["messages"][0]["content"] == _text_part(SYSTEM["content"])
+    assert server.last_payload["messages"][1:3] == HISTORY[1:3]
+
+def test_usage_without_details():
+    assert prompt_cache_usage({"prompt_tokens": 12, "completion_tokens": 3}) == {
+        "cached_prompt_tokens": 0,
+        "uncached_prompt_tokens": 12
+    }
+    assert prompt_cache_usage({}) == {}
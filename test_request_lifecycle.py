@@ -0,0 +1,58 @@
+"""Spans of requests the caller abandons, against mock_openrouter.py
+
+Run with ``python -m pytest test_request_lifecycle.py``.
+"""
+import asyncio
+
+import pytest
+
+from api import OpenRouterAPI
+from mock_openrouter import start_mock_server
+from singleflight import AsyncSingleFlight, SingleFlight
+from tracing import InMemoryExporter, Tracer, get_tracer, set_tracer
+
+MODEL = "mistralai/mistral-small-24b-instruct-2501:free"
+MESSAGES = [{"role": "user", "content": "Count to fifty"}]
+
+@pytest.fixture(scope="module")
+def server():
+    server = start_mock_server(latency=0.3, completion_tokens=50)
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def spans():
+    exporter = InMemoryExporter()
+    previous = get_tracer()
+    set_tracer(Tracer([exporter]))
+    yield exporter.spans
+    set_tracer(previous)
+
+@pytest.fixture
+def api(server):
+    return OpenRouterAPI("test-key", base_url=server.base_url,
+                         single_flight=SingleFlight(), async_single_flight=AsyncSingleFlight())
+
+def _completion_spans(spans):
+    return [span for span in spans if span["name"] == "http.completion"]
+
+def test_stream_closed_mid_reply_ends_span(api, spans):
+    stream = api.stream_completion(MODEL, MESSAGES, cache=False)
+    assert not next(stream)["done"]
+    stream.close()
+    [span] = _completion_spans(spans)
+    assert span["attributes"]["cancelled"] is True
+    assert span["status"] == "error"
+
+def test_cancelled_async_request_ends_span(api, spans):
+    async def run():
+        request = asyncio.ensure_future(api.agenerate_completion(MODEL, MESSAGES, cache=False))
+        await asyncio.sleep(0.1)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        await api.aclose()
+
+    asyncio.run(run())
+    [span] = _completion_spans(spans)
+    assert span["attributes"]["cancelled"] is True
@@ -0,0 +1,47 @@
+"""Parsing the coordinator's role selection and routing to agents
+
+Run with ``python -m pytest test_routing.py``.
+"""
+from agents import Agent, AgentGroup, CoordinatorAgent, parse_analysis
+from test_turn_order import FakeAPI
+
+def _group(api=None):
+    group = AgentGroup(api or FakeAPI())
+    group.add_agent(CoordinatorAgent("Coordinator", "coordinator", "Coordinate."))
+    group.add_agent(Agent("Code Assistant", "coder", "fast", "Write code."))
+    group.add_agent(Agent("Critic Assistant", "critic", "fast", "Review."))
+    return group
+
+def test_parses_json_inside_prose_and_fences():
+    text = 'Sure.\n```json\n{"selected_roles": "coder", "reasoning": "code task"}\n```\nDone.'
+    assert parse_analysis(text) == {"selected_roles": ["coder"], "reasoning": "code task"}
+
+def test_malformed_reply_is_not_parsed():
+    assert parse_analysis("I think the coder should answer.") is None
+    assert parse_analysis('{"selected_roles": [1, 2]}') is None
+    assert parse_analysis('{"selected_roles": ["coder"') is None
+
+def test_roles_match_role_or_name_loosely():
+    selected, skipped, fallback = _group().select_agents(["CODER", "critic-assistant"])
+    assert selected == ["Code Assistant", "Critic Assistant"]
+    assert skipped == [] and not fallback
+
+def test_unknown_role_falls_back_to_every_agent():
+    assert _group().select_agents(["translator"]) == (["Code Assistant", "Critic Assistant"], [], True)
+    assert _group().select_agents(None) == (["Code Assistant", "Critic Assistant"], [], True)
+
+class ProseCoordinatorAPI(FakeAPI):
+    """The coordinator answers in prose instead of the requested JSON"""
+
+    def _reply(self, model, messages, response_format):
+        if response_format:
+            return "Both the coder and the critic should weigh in."
+        return super()._reply(model, messages, response_format)
+
+def test_collective_turn_with_malformed_coordinator_reply_uses_every_agent():
+    complete = list(_group(ProseCoordinatorAPI()).get_collective_response("Q1"))[-1]
+    assert complete["success"]
+    assert complete["routing_fallback"]
+    assert sorted(response["agent"] for response in complete["responses"]) == [
+        "Code Assistant", "Critic Assistant"
+    ]
@@ -0,0 +1,110 @@
+"""Retries, Retry-After and adaptive per-model limits
+
+Run with ``python -m pytest test_scheduler.py``.
+"""
+import time
+
+import pytest
+
+import scheduler
+from api import OpenRouterAPI
+from mock_openrouter import start_mock_server
+from scheduler import ModelLimiter, RequestScheduler, RetryPolicy
+from singleflight import AsyncSingleFlight, SingleFlight
+
+MODEL = "mistralai/mistral-small-24b-instruct-2501:free"
+MESSAGES = [{"role": "user", "content": "Say hello"}]
+
+@pytest.fixture
+def server_factory():
+    servers = []
+
+    def start(**options):
+        servers.append(start_mock_server(**options))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+def _api(server, request_scheduler=None):
+    return OpenRouterAPI("test-key", base_url=server.base_url, scheduler=request_scheduler,
+                         single_flight=SingleFlight(), async_single_flight=AsyncSingleFlight())
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_retry_after_is_honoured(server_factory):
+    server = server_factory(rate_limit_rate=1.0, retry_after=0.2)
+    request_scheduler = RequestScheduler(RetryPolicy(max_retries=2, base_delay=0.01))
+    start = time.monotonic()
+    result = _api(server, request_scheduler).generate_completion(MODEL, MESSAGES, cache=False, coalesce=False)
+    elapsed = time.monotonic() - start
+    assert not result["success"]
+    assert result["retries"] == 2
+    # Each retry waited out the Retry-After, and nothing more than its jitter
+    assert 0.4 <= elapsed < 1.0
+    assert result["throttled_time"] >= 0.4
+    # A 429 with Retry-After pauses the model without cutting its limits
+    limits = request_scheduler.stats()[MODEL]
+    assert limits["concurrency_limit"] == scheduler.DEFAULT_MODEL_CONCURRENCY
+    assert limits["rate"] is None
+
+def test_gives_up_after_api_max_retries(server_factory, monkeypatch):
+    server = server_factory(error_rate=1.0)
+    monkeypatch.setenv("API_MAX_RETRIES", "1")
+    # Rebuilt from the environment on first use; the original is put back afterwards
+    monkeypatch.setattr(scheduler, "_scheduler", None)
+    result = _api(server).generate_completion(MODEL, MESSAGES, cache=False, coalesce=False)
+    assert not result["success"]
+    assert result["retries"] == 1
+    assert server.request_count == 2
+
+def test_limits_shrink_on_429_and_recover(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler.time, "monotonic", clock)
+    limiter = ModelLimiter(max_concurrency=8)
+    # Ten requests in one second: a measured send rate of 10/s
+    for _ in range(10):
+        assert limiter.reserve() == 0.0
+        limiter.release()
+        clock.now += 0.1
+
+    limiter.observe(429)
+    assert limiter.concurrency_limit == 4
+    assert limiter.rate == pytest.approx(5.0)
+    # More 429s from the same burst don't cut again
+    limiter.observe(429)
+    assert limiter.concurrency_limit == 4
+
+    clock.now += 0.2
+    assert limiter.reserve() == 0.0
+    limiter.release()
+    limiter.observe(200)
+    assert limiter.concurrency_limit == pytest.approx(4.25)
+    # Traffic keeps flowing at the cut rate while the rate climbs back linearly in time
+    for _ in range(24):
+        clock.now += 0.2
+        assert limiter.reserve() == 0.0
+        limiter.release()
+        limiter.observe(200)
+    # Five seconds in: halfway back to the send rate it was cut from
+    assert limiter.rate == pytest.approx(7.5)
+    assert limiter.concurrency_limit == 8
+
+def test_cut_rate_has_a_floor(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler.time, "monotonic", clock)
+    limiter = ModelLimiter(max_concurrency=1)
+    for _ in range(2):
+        limiter.reserve()
+        limiter.release()
+    for _ in range(10):
+        clock.now += scheduler.DECREASE_INTERVAL
+        limiter.observe(429)
+    assert limiter.rate == scheduler.DEFAULT_MIN_RATE
+    assert limiter.concurrency_limit == 1
@@ -0,0 +1,103 @@
+"""Errors and cancellation of coalesced calls
+
+Run with ``python -m pytest test_singleflight.py``.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+WAITERS = 4
+
+def test_leader_exception_reaches_every_sync_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait()
+        raise RuntimeError("upstream down")
+
+    def call(_):
+        try:
+            flight.do("key", fail)
+        except RuntimeError as e:
+            return str(e)
+        return None
+
+    with ThreadPoolExecutor(max_workers=WAITERS) as executor:
+        futures = [executor.submit(call, i) for i in range(WAITERS)]
+        while flight.coalesced_count < WAITERS - 1:
+            time.sleep(0.01)
+        release.set()
+        assert [future.result() for future in futures] == ["upstream down"] * WAITERS
+    assert flight.in_flight() == 0
+
+def test_leader_exception_reaches_every_async_waiter():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(WAITERS)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.in_flight() == 0
+
+def test_cancelling_one_waiter_leaves_shared_call_running():
+    flight = AsyncSingleFlight()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(0.1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "reply"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("key", slow))
+        second = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == ("reply", True)
+    assert not cancelled
+
+def test_cancelling_every_waiter_cancels_shared_call():
+    flight = AsyncSingleFlight()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "reply"
+
+    async def run():
+        waiters = [asyncio.ensure_future(flight.do("key", slow)) for _ in range(WAITERS)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        # Let the shared task see its cancellation
+        await asyncio.sleep(0)
+        assert cancelled == [True]
+        assert flight.in_flight() == 0
+
+    asyncio.run(run())
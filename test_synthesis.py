@@ -0,0 +1,36 @@
+"""Repeated-block handling in the compact synthesis prompt
+
+Run with ``python -m pytest test_synthesis.py``.
+"""
+from synthesis import compact_responses
+
+MUTEX = "Guard the shared counter with a mutex so that concurrent increments are never lost."
+FILLER = " ".join(f"word{i}" for i in range(200))
+
+def test_repeated_block_becomes_reference():
+    compacted = compact_responses([
+        {"agent": "A", "response": f"Intro from A.\n\n{MUTEX}"},
+        {"agent": "B", "response": f"Intro from B.\n\n{MUTEX}"}
+    ])
+    assert MUTEX in compacted[0]["response"]
+    assert MUTEX not in compacted[1]["response"]
+    assert "[Also repeats points made by A]" in compacted[1]["response"]
+
+def test_block_cut_for_budget_is_not_treated_as_said():
+    compacted = compact_responses([
+        {"agent": "A", "response": f"{FILLER}\n\n{MUTEX}"},
+        {"agent": "B", "response": MUTEX}
+    ], excerpt_tokens=100)
+    assert "mutex" not in compacted[0]["response"]
+    assert "omitted" in compacted[0]["response"]
+    # B's copy is the only one that reaches the coordinator
+    assert compacted[1]["response"] == MUTEX
+
+def test_truncated_block_is_not_treated_as_said():
+    # A's only block contains B's, but is cut before it gets there
+    compacted = compact_responses([
+        {"agent": "A", "response": f"{FILLER} {MUTEX}"},
+        {"agent": "B", "response": MUTEX}
+    ], excerpt_tokens=120)
+    assert "mutex" not in compacted[0]["response"]
+    assert compacted[1]["response"] == MUTEX
@@ -0,0 +1,123 @@
+"""Turn ordering of an agent's history around quorum/deadline stragglers
+
+Run with ``python -m pytest test_turn_order.py``.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from agents import Agent, AgentGroup, CoordinatorAgent
+
+SLOW_SECONDS = 0.3
+# Long enough for the slow agent to start, so it is left running rather than dropped
+FAST_SECONDS = 0.05
+
+class FakeAPI:
+    """The "slow" and "fast" models wait before answering; replies echo the last user message"""
+
+    def __init__(self):
+        self.slow_started = threading.Event()
+
+    def _reply(self, model, messages, response_format):
+        if response_format:
+            return json.dumps({"selected_roles": ["fast", "slow"], "reasoning": "both"})
+        return f"{model}: {messages[-1]['content']}"
+
+    def generate_completion(self, model, messages, temperature=0.7, cache=True, response_format=None,
+                            coalesce=True, stream=False):
+        if model == "slow":
+            self.slow_started.set()
+            time.sleep(SLOW_SECONDS)
+        elif model == "fast":
+            time.sleep(FAST_SECONDS)
+        return {"success": True, "response": self._reply(model, messages, response_format), "tokens": 1, "time": 0.0}
+
+    async def agenerate_completion(self, model, messages, temperature=0.7, cache=True, response_format=None,
+                                   coalesce=True):
+        if model == "slow":
+            self.slow_started.set()
+            await asyncio.sleep(SLOW_SECONDS)
+        elif model == "fast":
+            await asyncio.sleep(FAST_SECONDS)
+        return {"success": True, "response": self._reply(model, messages, response_format), "tokens": 1, "time": 0.0}
+
+def _group(api):
+    group = AgentGroup(api)
+    group.add_agent(CoordinatorAgent("Coordinator", "coordinator", "Coordinate."))
+    group.add_agent(Agent("Fast", "fast", "fast", "Be quick."))
+    group.add_agent(Agent("Slow", "slow", "slow", "Take your time."))
+    return group
+
+def _history(group, agent_name):
+    return [(message["role"], message["content"]) for message in group.agents[agent_name].messages[1:]]
+
+def test_sync_turn_waits_for_straggler():
+    group = _group(FakeAPI())
+    complete = list(group.get_collective_response("Q1", quorum=1))[-1]
+    assert complete["straggler_agents"] == ["Slow"]
+
+    response, _ = group.run_agent_turn("Slow", "Q2")
+    assert response["success"]
+    assert _history(group, "Slow") == [
+        ("user", "Q1"), ("assistant", "slow: Q1"),
+        ("user", "Q2"), ("assistant", "slow: Q2")
+    ]
+
+def test_async_turn_waits_for_straggler():
+    group = _group(FakeAPI())
+
+    async def run():
+        events = [event async for event in group.aget_collective_response("Q1", quorum=1)]
+        assert events[-1]["straggler_agents"] == ["Slow"]
+        return await group.arun_agent_turn("Slow", "Q2")
+
+    response, _ = asyncio.run(run())
+    assert response["success"]
+    assert _history(group, "Slow") == [
+        ("user", "Q1"), ("assistant", "slow: Q1"),
+        ("user", "Q2"), ("assistant", "slow: Q2")
+    ]
+
+def test_reset_is_not_undone_by_straggler():
+    api = FakeAPI()
+    group = _group(api)
+    list(group.get_collective_response("Q1", quorum=1))
+    assert api.slow_started.wait(1)
+    group.reset_histories()
+
+    # Sent after the reset, so it waits for the straggler and the reset
+    group.run_agent_turn("Slow", "Q2")
+    assert _history(group, "Slow") == [("user", "Q2"), ("assistant", "slow: Q2")]
+    assert _history(group, "Fast") == []
+    assert len(group.coordinator.messages) == 1
+
+def test_unknown_agent():
+    response, process_time = _group(FakeAPI()).run_agent_turn("Nobody", "Q")
+    assert response == {"success": False, "error": "Agent not found"}
+    assert process_time == 0.0
+
+class RaisingAPI(FakeAPI):
+    """The "slow" model raises instead of answering"""
+
+    def generate_completion(self, model, *args, **kwargs):
+        if model == "slow":
+            raise RuntimeError("connection reset")
+        return super().generate_completion(model, *args, **kwargs)
+
+    async def agenerate_completion(self, model, *args, **kwargs):
+        if model == "slow":
+            raise RuntimeError("connection reset")
+        return await super().agenerate_completion(model, *args, **kwargs)
+
+def test_agent_exception_is_an_agent_error():
+    # Both paths report the failing agent and still synthesize the others' replies
+    sync_complete = list(_group(RaisingAPI()).get_collective_response("Q1"))[-1]
+
+    async def run():
+        return [event async for event in _group(RaisingAPI()).aget_collective_response("Q1")][-1]
+
+    for complete in (sync_complete, asyncio.run(run())):
+        assert complete["success"]
+        assert "connection reset" in complete["agent_errors"]["Slow"]
+        assert [response["agent"] for response in complete["responses"]] == ["Fast"]
@@ -0,0 +1,88 @@
+"""Offline token estimation for pre-flight prompt sizing.
+
+Estimates are heuristic (no tokenizer downloads) and tuned per model family;
+register a better estimator for a family with ``register_estimator``.
+"""
+import re
+import threading
+from typing import Any, Dict, List
+
+# Rough chat-format overhead per message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_PIECES = re.compile(r"(\w+)|([^\w\s]+)|(\n+)")
+
+class TokenEstimator:
+    """Approximates BPE tokenizers from word, punctuation and newline runs
+
+    ASCII word runs cost about ``len / chars_per_token`` tokens (at least one),
+    other characters (CJK, accented letters) ``non_ascii_chars_per_token``,
+    punctuation runs about one token per two characters and each run of
+    newlines one token.
+    """
+
+    def __init__(self,
+                 chars_per_token: float = 4.0,
+                 non_ascii_chars_per_token: float = 1.0,
+                 message_overhead: int = MESSAGE_OVERHEAD_TOKENS):
+        self.chars_per_token = chars_per_token
+        self.non_ascii_chars_per_token = non_ascii_chars_per_token
+        self.message_overhead = message_overhead
+
+    def count(self, text: str) -> int:
+        total = 0.0
+        for word, punct, newlines in _PIECES.findall(text):
+            if word:
+                if word.isascii():
+                    total += max(1.0, len(word) / self.chars_per_token)
+                else:
+                    non_ascii = sum(1 for ch in word if ord(ch) > 127)
+                    total += max(1.0, (len(word) - non_ascii) / self.chars_per_token
+                                 + non_ascii / self.non_ascii_chars_per_token)
+            elif punct:
+                total += (len(punct) + 1) // 2
+            else:
+                total += 1
+        return int(total + 0.5)
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        return self.count(str(message.get("content", ""))) + self.message_overhead
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        return sum(self.count_message(message) for message in messages)
+
+DEFAULT_ESTIMATOR = TokenEstimator()
+
+# Model id prefix -> estimator; the longest matching prefix wins
+ESTIMATORS: Dict[str, TokenEstimator] = {
+    "openai/": TokenEstimator(chars_per_token=4.0),
+    "anthropic/": TokenEstimator(chars_per_token=3.5),
+    "google/": TokenEstimator(chars_per_token=4.0),
+    "meta-llama/": TokenEstimator(chars_per_token=3.8),
+    "mistralai/": TokenEstimator(chars_per_token=3.6),
+    "deepseek/": TokenEstimator(chars_per_token=3.8, non_ascii_chars_per_token=1.4),
+    "qwen/": TokenEstimator(chars_per_token=3.8, non_ascii_chars_per_token=1.5),
+}
+
+_resolved: Dict[str, TokenEstimator] = {}
+_registry_lock = threading.Lock()
+
+def register_estimator(prefix: str, estimator: TokenEstimator):
+    """Use ``estimator`` for every model id starting with ``prefix``"""
+    with _registry_lock:
+        ESTIMATORS[prefix] = estimator
+        _resolved.clear()
+
+def get_estimator(model: str) -> TokenEstimator:
+    estimator = _resolved.get(model)
+    if estimator is None:
+        matches = [prefix for prefix in ESTIMATORS if model.startswith(prefix)]
+        estimator = ESTIMATORS[max(matches, key=len)] if matches else DEFAULT_ESTIMATOR
+        _resolved[model] = estimator
+    return estimator
+
+def estimate_tokens(text: str, model: str = "") -> int:
+    return get_estimator(model).count(text)
+
+def estimate_message_tokens(message: Dict[str, Any], model: str = "") -> int:
+    return get_estimator(model).count_message(message)
@@ -0,0 +1,317 @@
+"""Lightweight spans for timing the agent pipeline.
+
+Spans are handed to pluggable exporters when they end: InMemoryExporter
+(bounded, for the dashboard), JsonlExporter (one JSON object per line) and
+OTLPJsonExporter (OpenTelemetry OTLP/JSON, to a file or an OTLP/HTTP
+collector). With no exporters the tracer hands out no-op spans.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import requests
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    def __init__(self,
+                 tracer: "Tracer",
+                 name: str,
+                 trace_id: str,
+                 parent_id: Optional[str],
+                 attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self.status = "ok"
+
+    @property
+    def duration(self) -> float:
+        return (self.end_time or time.time()) - self.start_time
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, error: str):
+        self.status = "error"
+        self.attributes["error"] = error
+
+    def end(self):
+        if self.end_time is None:
+            self.end_time = time.time()
+            self.tracer._export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+class NoopSpan:
+    """Stand-in returned when tracing is disabled"""
+    trace_id = None
+    span_id = None
+    duration = 0.0
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_error(self, error: str):
+        pass
+
+    def end(self):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+class Tracer:
+    def __init__(self, exporters: Optional[List[Any]] = None):
+        self.exporters = list(exporters or [])
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """Start a span without making it current; the caller must end() it
+
+        The parent defaults to the current span of this context.
+        """
+        if not self.exporters:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, Span):
+            return Span(self, name, parent.trace_id, parent.span_id, attributes)
+        return Span(self, name, os.urandom(16).hex(), None, attributes)
+
+    @contextlib.contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes) -> Iterator[Span]:
+        """Start a span, make it current for the block and end it afterwards"""
+        span = self.start_span(name, parent, **attributes)
+        if span is NOOP_SPAN:
+            yield span
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set_error(str(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    @contextlib.contextmanager
+    def use_span(self, span: Span) -> Iterator[Span]:
+        """Make an already started span current for the block without ending it"""
+        if span is NOOP_SPAN:
+            yield span
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    def iterate_in(self, span: Span, iterable: Iterable[Any]) -> Iterator[Any]:
+        """Iterate with ``span`` current only while the underlying iterator runs
+
+        Keeps a span current inside a generator without leaking it into the
+        consumer's context between items.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.use_span(span):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def _export(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                # Tracing must never break a request
+                pass
+
+    def flush(self):
+        for exporter in self.exporters:
+            if hasattr(exporter, "flush"):
+                exporter.flush()
+
+class InMemoryExporter:
+    """Keeps the most recent spans in memory"""
+
+    def __init__(self, max_spans: int = 2000):
+        self.spans: "deque[Dict[str, Any]]" = deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        self.spans.append(span.to_dict())
+
+    def trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Spans of one trace, in start order"""
+        return sorted((s for s in list(self.spans) if s["trace_id"] == trace_id), key=lambda s: s["start_time"])
+
+class JsonlExporter:
+    """Appends each finished span as one JSON line
+
+    Lines are written by a background thread, so a span ending on the event
+    loop never waits on the disk; ``flush`` waits until they are all written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lines: "queue.Queue[str]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        self._lines.put(json.dumps(span.to_dict(), default=str))
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_lines, daemon=True)
+                    self._writer.start()
+
+    def _write_lines(self):
+        while True:
+            lines = [self._lines.get()]
+            # Append whatever else queued up meanwhile in the same write
+            while True:
+                try:
+                    lines.append(self._lines.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a") as f:
+                    f.write("".join(line + "\n" for line in lines))
+            except OSError:
+                pass
+            finally:
+                for _ in lines:
+                    self._lines.task_done()
+
+    def flush(self):
+        self._lines.join()
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class OTLPJsonExporter:
+    """Batches spans as OpenTelemetry OTLP/JSON
+
+    Posts to an OTLP/HTTP collector (``endpoint``, e.g.
+    http://localhost:4318/v1/traces) and/or appends one ExportTraceServiceRequest
+    per line to ``path``.
+    """
+
+    def __init__(self,
+                 endpoint: Optional[str] = None,
+                 path: Optional[str] = None,
+                 service_name: str = "autogen-assistant",
+                 batch_size: int = 64):
+        self.endpoint = endpoint
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self._batch: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _otlp_span(span: Span) -> Dict[str, Any]:
+        otlp = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(int(span.start_time * 1e9)),
+            "endTimeUnixNano": str(int((span.end_time or span.start_time) * 1e9)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2 if span.status == "error" else 1}
+        }
+        if span.parent_id:
+            otlp["parentSpanId"] = span.parent_id
+        return otlp
+
+    def export(self, span: Span):
+        with self._lock:
+            self._batch.append(self._otlp_span(span))
+            if len(self._batch) < self.batch_size:
+                return
+            batch, self._batch = self._batch, []
+        # Don't make the request that ended the span wait on the collector
+        threading.Thread(target=self._send, args=(batch,), daemon=True).start()
+
+    def flush(self):
+        with self._lock:
+            batch, self._batch = self._batch, []
+        if batch:
+            self._send(batch)
+
+    def _send(self, spans: List[Dict[str, Any]]):
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "autogen_assistant"}, "spans": spans}]
+            }]
+        }
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(body) + "\n")
+        if self.endpoint:
+            try:
+                requests.post(self.endpoint, json=body, timeout=5)
+            except requests.RequestException:
+                pass
+
+_tracer = Tracer()
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    _tracer = tracer
+
+def configure_tracing_from_env(in_memory: bool = False) -> Tracer:
+    """Build the global tracer from TRACE_JSONL_PATH and OTEL_EXPORTER_OTLP_ENDPOINT"""
+    exporters: List[Any] = []
+    if in_memory:
+        exporters.append(InMemoryExporter())
+    if os.getenv("TRACE_JSONL_PATH"):
+        exporters.append(JsonlExporter(os.getenv("TRACE_JSONL_PATH")))
+    if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        exporters.append(OTLPJsonExporter(endpoint=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT").rstrip("/") + "/v1/traces"))
+    tracer = Tracer(exporters)
+    set_tracer(tracer)
+    return tracer
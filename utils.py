@@ -1,39 +1,129 @@
-import pandas as pd
-import plotly.express as px
 import streamlit as st
+from typing import Any, Dict, Optional
+
+from conversations import DEFAULT_PAGE_SIZE, ConversationStore
+from metrics import MetricsStore
+
+# Turns per page of the conversation history
+HISTORY_PAGE_SIZE = DEFAULT_PAGE_SIZE
 
 def format_conversation(messages: list) -> str:
     """Format conversation for display"""
-    formatted = ""
-    for msg in messages:
-        role = msg["role"].capitalize()
-        content = msg["content"]
-        formatted += f"**{role}**: {content}\n\n"
-    return formatted
-
-def create_metrics_charts(metrics: dict):
-    """Create visualization charts for metrics"""
-    # Response time chart
-    if metrics['response_times']:
-        df_times = pd.DataFrame({
-            'Response Time (s)': metrics['response_times']
+    return "".join(f"**{msg['role'].capitalize()}**: {msg['content']}\n\n" for msg in messages)
+
+def render_turn(conv: Dict[str, Any]):
+    """Draw one stored conversation turn"""
+    if conv["mode"] == "single":
+        with st.expander(f"Single Agent Conversation with {conv['agent']}"):
+            st.markdown(format_conversation(conv['messages']))
+    else:
+        with st.expander("Collective Conversation"):
+            st.write("**User**:", conv["user_input"])
+            st.write("\n**Coordinator Analysis**:", conv["coordinator_analysis"])
+            for resp in conv["responses"]:
+                st.write(f"\n**{resp['agent']}**:", resp["response"])
+
+@st.fragment
+def render_conversation_history(store: ConversationStore, session_id: str, page_size: Optional[int] = None):
+    """One page of a session's turns, starting at the newest
+
+    Only the page on screen is read and drawn, so a rerun costs the same at
+    turn 10 and turn 1000. Paging reruns just this fragment.
+    """
+    # Stack of page cursors (the first turn id of each newer page); empty shows the newest page
+    cursors = st.session_state.setdefault("history_cursors", {}).setdefault(session_id, [])
+    turns = store.page(session_id, limit=page_size or HISTORY_PAGE_SIZE, before=cursors[-1] if cursors else None)
+    if not turns:
+        return
+    older = store.count(session_id, before=turns[0]["id"])
+    if older or cursors:
+        total = store.count(session_id)
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            st.caption(f"Turns {older + 1}–{older + len(turns)} of {total}")
+        # Callbacks run before the fragment reruns, so the new page is drawn right away
+        with col2:
+            st.button("⬅️ Older", disabled=not older, use_container_width=True,
+                      on_click=cursors.append, args=(turns[0]["id"],))
+        with col3:
+            st.button("Newer ➡️", disabled=not cursors, use_container_width=True, on_click=cursors.pop)
+    for conv in turns:
+        render_turn(conv)
+
+def create_metrics_charts(metrics: MetricsStore):
+    """Create visualization charts for metrics
+
+    The tables and figures are rebuilt only after new requests were recorded;
+    refreshes in between redraw the ones built last time.
+    """
+    version = (id(metrics), metrics.total.requests)
+    charts = st.session_state.get("metrics_charts")
+    if charts is None or charts["version"] != version:
+        charts = st.session_state["metrics_charts"] = {"version": version, "elements": _build_metrics_charts(metrics)}
+    for kind, title, value in charts["elements"]:
+        if kind == "table":
+            st.write(f"**{title}**")
+            st.dataframe(value, hide_index=True)
+        else:
+            st.plotly_chart(value)
+
+def _build_metrics_charts(metrics: MetricsStore) -> list:
+    """The metrics tab's tables and figures as (kind, title, value) tuples"""
+    # pandas and plotly take longer to import than the rest of the app; only load them once there is data to chart
+    if not metrics.total.requests:
+        return []
+    import pandas as pd
+    import plotly.express as px
+
+    elements = []
+    # Percentile tables per model and per role
+    for by, title in (("model", "By Model"), ("role", "By Agent Role")):
+        rows = metrics.summary(by)
+        if rows:
+            df_summary = pd.DataFrame(rows)
+            for column in ("p50", "p95", "p99"):
+                df_summary[column] = df_summary[column] * 1000
+            elements.append(("table", title, df_summary.rename(columns={
+                "p50": "p50 (ms)", "p95": "p95 (ms)", "p99": "p99 (ms)"
+            })))
+
+    # Response time chart, downsampled per model
+    series = metrics.series("model")
+    frames = [
+        pd.DataFrame({
+            "Time": pd.to_datetime(points["timestamp"], unit="s"),
+            "Response Time (s)": points["latency"],
+            "Model": model
         })
-        fig_times = px.line(df_times, title='Response Times')
-        st.plotly_chart(fig_times)
+        for model, points in series.items() if points["latency"]
+    ]
+    if frames:
+        fig_times = px.line(pd.concat(frames), x="Time", y="Response Time (s)", color="Model",
+                            title="Response Times")
+        elements.append(("chart", "Response Times", fig_times))
 
     # Model usage chart
-    if metrics['model_usage']:
+    rows = metrics.summary("model")
+    if rows:
         df_usage = pd.DataFrame({
-            'Model': list(metrics['model_usage'].keys()),
-            'Usage Count': list(metrics['model_usage'].values())
+            'Model': [row["model"] for row in rows],
+            'Usage Count': [row["requests"] for row in rows]
         })
         fig_usage = px.bar(df_usage, x='Model', y='Usage Count', 
                           title='Model Usage Distribution')
-        st.plotly_chart(fig_usage)
+        elements.append(("chart", "Model Usage Distribution", fig_usage))
+    return elements
 
-def update_metrics(metrics: dict, response: dict, model: str):
+def update_metrics(metrics: MetricsStore, response: dict, model: str, role: Optional[str] = None):
     """Update metrics with new response data"""
-    if response['success']:
-        metrics['total_tokens'] += response['tokens']
-        metrics['response_times'].append(response['time'])
-        metrics['model_usage'][model] = metrics['model_usage'].get(model, 0) + 1
+    metrics.record(
+        model,
+        role,
+        response.get("time", 0.0),
+        response.get("tokens", 0),
+        response["success"]
+    )
+
+def update_collective_metrics(metrics: MetricsStore, response: dict, agents: dict, coordinator):
+    """Record each call of a completed collective turn under its own model and role"""
+    metrics.record_collective(response, agents, coordinator)